@@ -0,0 +1,142 @@
+import hashlib
+import json
+import os
+import re
+import tempfile
+from fastapi import HTTPException
+from fastapi.staticfiles import StaticFiles
+from starlette.concurrency import run_in_threadpool
+from configuracion import MAX_TAMANO_IMAGEN, TAMANO_BLOQUE_SUBIDA
+
+# Archivos cuyo nombre es el sha256 de su contenido (y sus variantes "<hash>-<ancho>.<ext>")
+NOMBRE_POR_CONTENIDO = re.compile(r"^[0-9a-f]{64}(-\d+)?\.[a-z0-9]+$")
+# Lo que un formulario multipart puede traer ademas de la imagen (campos y separadores)
+MARGEN_FORMULARIO = 64 * 1024
+
+
+def _cerrar(destino):
+    destino.flush()
+    os.fsync(destino.fileno())
+    destino.close()
+
+def _descartar(destino, ruta_temporal):
+    destino.close()
+    if os.path.exists(ruta_temporal):
+        os.remove(ruta_temporal)
+
+def _publicar(ruta_temporal, ruta_destino):
+    # Si ya existe un archivo con el mismo hash es el mismo contenido: se reutiliza.
+    # Se actualiza su fecha para que la recoleccion de huerfanos respete el periodo de gracia.
+    if os.path.exists(ruta_destino):
+        os.remove(ruta_temporal)
+        os.utime(ruta_destino)
+    else:
+        os.replace(ruta_temporal, ruta_destino)
+
+def extension(nombre_archivo):
+    ext = os.path.splitext(nombre_archivo or "")[1].lower()
+    return ext if re.fullmatch(r"\.[a-z0-9]{1,5}", ext) else ""
+
+
+async def guardar_subida(archivo, directorio, limite=MAX_TAMANO_IMAGEN):
+    """Guarda `archivo` (UploadFile) en `directorio` con el sha256 de su contenido como nombre.
+
+    La copia se hace por bloques en el threadpool sobre un temporal que se
+    renombra al final, asi nunca queda un archivo a medias en la ruta publica.
+    Si se supera `limite` bytes se corta la copia y se responde 413 (el
+    cuerpo completo ya lo acota MiddlewareLimiteSubida). Devuelve el nombre
+    final del archivo.
+    """
+    await run_in_threadpool(os.makedirs, directorio, exist_ok=True)
+    descriptor, ruta_temporal = await run_in_threadpool(tempfile.mkstemp, dir=directorio, suffix=".parcial")
+    destino = os.fdopen(descriptor, "wb")
+    resumen = hashlib.sha256()
+    escrito = 0
+    try:
+        while True:
+            bloque = await archivo.read(TAMANO_BLOQUE_SUBIDA)
+            if not bloque:
+                break
+            escrito += len(bloque)
+            if escrito > limite:
+                raise HTTPException(status_code=413, detail=f"La imagen supera el tamaño máximo de {limite} bytes")
+            resumen.update(bloque)
+            await run_in_threadpool(destino.write, bloque)
+        await run_in_threadpool(_cerrar, destino)
+        nombre = resumen.hexdigest() + extension(archivo.filename)
+        await run_in_threadpool(_publicar, ruta_temporal, os.path.join(directorio, nombre))
+    except BaseException:
+        await run_in_threadpool(_descartar, destino, ruta_temporal)
+        raise
+    return nombre
+
+
+def _eliminar(ruta):
+    if os.path.exists(ruta):
+        os.remove(ruta)
+
+async def eliminar_archivo(ruta):
+    await run_in_threadpool(_eliminar, ruta)
+
+
+class MiddlewareLimiteSubida:
+    """Corta los formularios multipart que superan `limite` bytes mientras llegan.
+
+    Starlette recibe y guarda todo el cuerpo antes de que la ruta vea el
+    UploadFile, asi que el limite se aplica aqui: con Content-Length se
+    responde 413 sin leer nada y, si no viene (chunked), al pasar el limite.
+    """
+
+    def __init__(self, app, limite=MAX_TAMANO_IMAGEN + MARGEN_FORMULARIO):
+        self.app = app
+        self.limite = limite
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        cabeceras = dict(scope["headers"])
+        if not cabeceras.get(b"content-type", b"").startswith(b"multipart/form-data"):
+            await self.app(scope, receive, send)
+            return
+        largo = cabeceras.get(b"content-length")
+        if largo is not None and largo.isdigit() and int(largo) > self.limite:
+            await _demasiado_grande(send, self.limite)
+            return
+
+        recibido = 0
+
+        async def recibir():
+            nonlocal recibido
+            mensaje = await receive()
+            if mensaje["type"] == "http.request":
+                recibido += len(mensaje.get("body", b""))
+                if recibido > self.limite:
+                    # FastAPI deja pasar las HTTPException del parser del formulario
+                    raise HTTPException(status_code=413, detail=_detalle_limite(self.limite))
+            return mensaje
+
+        await self.app(scope, recibir, send)
+
+def _detalle_limite(limite):
+    return f"La solicitud supera el tamaño máximo de {limite} bytes"
+
+async def _demasiado_grande(send, limite):
+    await send({"type": "http.response.start", "status": 413, "headers": [(b"content-type", b"application/json"), (b"connection", b"close")]})
+    await send({"type": "http.response.body", "body": json.dumps({"detail": _detalle_limite(limite)}).encode("utf-8")})
+
+
+class ArchivosEstaticos(StaticFiles):
+    """StaticFiles que marca como inmutables los archivos nombrados por su contenido.
+
+    El resto (imagenes antiguas con nombre libre) se revalida siempre con
+    ETag/If-None-Match, que StaticFiles ya responde con 304.
+    """
+
+    def file_response(self, full_path, stat_result, scope, status_code=200):
+        respuesta = super().file_response(full_path, stat_result, scope, status_code)
+        if NOMBRE_POR_CONTENIDO.match(os.path.basename(full_path)):
+            respuesta.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+        else:
+            respuesta.headers["Cache-Control"] = "no-cache"
+        return respuesta
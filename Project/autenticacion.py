@@ -0,0 +1,120 @@
+import asyncio
+import base64
+import hashlib
+import hmac
+import json
+import logging
+import secrets
+import time
+from datetime import datetime, timezone
+from fastapi import Depends, HTTPException
+from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from sqlalchemy import select, delete
+from configuracion import TOKEN_SECRETO, TOKEN_DURACION, REVOCACION_INTERVALO
+from conexion import AsyncSessionLocal
+from modelo import TokenRevocado
+
+logger = logging.getLogger("ventrix.autenticacion")
+
+if not TOKEN_SECRETO:
+    logger.warning("TOKEN_SECRETO no esta definido: los tokens dejaran de valer al reiniciar y no sirven entre workers")
+_secreto = (TOKEN_SECRETO or secrets.token_urlsafe(32)).encode("utf-8")
+
+_CABECERA = base64.urlsafe_b64encode(json.dumps({"alg": "HS256", "typ": "JWT"}, separators=(",", ":")).encode()).rstrip(b"=")
+
+# jti -> expiracion (epoch) de los tokens revocados que aun no vencen
+_revocados = {}
+
+
+def _b64(datos):
+    return base64.urlsafe_b64encode(datos).rstrip(b"=")
+
+def _desde_b64(texto):
+    return base64.urlsafe_b64decode(texto + b"=" * (-len(texto) % 4))
+
+def _firmar(contenido):
+    return _b64(hmac.new(_secreto, contenido, hashlib.sha256).digest())
+
+
+def emitir_token(contexto):
+    """JWT HS256 con documento, rol, sucursal y restaurante del usuario."""
+    ahora = int(time.time())
+    rol = contexto["rol"]
+    datos = {
+        "sub": contexto["documento"],
+        "rol": getattr(rol, "value", rol),
+        "sucursal": contexto.get("sucursal"),
+        "restaurante": contexto.get("restaurante"),
+        "iat": ahora,
+        "exp": ahora + TOKEN_DURACION,
+        "jti": secrets.token_hex(16),
+    }
+    contenido = _CABECERA + b"." + _b64(json.dumps(datos, separators=(",", ":")).encode())
+    return (contenido + b"." + _firmar(contenido)).decode("ascii")
+
+
+def verificar_token(token):
+    """Valida firma, vencimiento y revocacion sin consultar la base de datos."""
+    try:
+        cabecera, cuerpo, firma = token.encode("ascii").split(b".")
+        if not hmac.compare_digest(firma, _firmar(cabecera + b"." + cuerpo)):
+            raise ValueError("firma")
+        datos = json.loads(_desde_b64(cuerpo))
+    except (ValueError, UnicodeEncodeError):
+        raise HTTPException(status_code=401, detail="Token inválido", headers={"WWW-Authenticate": "Bearer"})
+    if datos.get("exp", 0) < time.time():
+        raise HTTPException(status_code=401, detail="Token vencido", headers={"WWW-Authenticate": "Bearer"})
+    if datos.get("jti") in _revocados:
+        raise HTTPException(status_code=401, detail="Token revocado", headers={"WWW-Authenticate": "Bearer"})
+    return datos
+
+
+_bearer = HTTPBearer(auto_error=False)
+
+async def usuario_actual(credenciales: HTTPAuthorizationCredentials = Depends(_bearer)):
+    if credenciales is None:
+        raise HTTPException(status_code=401, detail="Se requiere un token", headers={"WWW-Authenticate": "Bearer"})
+    return verificar_token(credenciales.credentials)
+
+def requiere_rol(*roles):
+    """Dependencia que solo deja pasar tokens con alguno de los RolUsuario dados."""
+    permitidos = {rol.value for rol in roles}
+
+    async def verificar_rol(sesion: dict = Depends(usuario_actual)):
+        if sesion["rol"] not in permitidos:
+            raise HTTPException(status_code=403, detail="No tiene permisos para esta operación")
+        return sesion
+    return verificar_rol
+
+
+#//////////////////////////////////REVOCACION///////////////////////////////
+
+
+def _fecha(epoch):
+    # Las fechas se guardan en UTC sin zona horaria
+    return datetime.fromtimestamp(epoch, timezone.utc).replace(tzinfo=None)
+
+async def revocar(db, datos):
+    db.add(TokenRevocado(jti=datos["jti"], expira=_fecha(datos["exp"])))
+    await db.commit()
+    _revocados[datos["jti"]] = datos["exp"]
+
+async def refrescar_revocados():
+    """Recarga la lista de revocados (la comparten todos los workers) y purga los vencidos."""
+    ahora = time.time()
+    async with AsyncSessionLocal() as db:
+        await db.execute(delete(TokenRevocado).where(TokenRevocado.expira < _fecha(ahora)))
+        filas = (await db.execute(select(TokenRevocado.jti, TokenRevocado.expira))).all()
+        await db.commit()
+    for jti, expira in filas:
+        _revocados[jti] = expira.replace(tzinfo=timezone.utc).timestamp()
+    for jti in [jti for jti, expira in _revocados.items() if expira < ahora]:
+        del _revocados[jti]
+
+async def refrescar_periodicamente():
+    while True:
+        try:
+            await refrescar_revocados()
+        except Exception:
+            logger.exception("No se pudo refrescar la lista de tokens revocados")
+        await asyncio.sleep(REVOCACION_INTERVALO)
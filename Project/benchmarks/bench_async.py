@@ -0,0 +1,81 @@
+"""p99 de GET /usuario/{id} con 200 clientes concurrentes: sesion bloqueante vs AsyncSession.
+
+"antes" es el handler original (async def con la Session sincrona de get_db)
+montado en una ruta aparte; "despues" es la ruta real. --latencia-ms agrega
+a cada sentencia una espera en el hilo del driver, como la ida y vuelta a
+MySQL: con el driver sincrono esa espera bloquea el bucle de eventos.
+"""
+import argparse
+import asyncio
+import time
+import comun
+from comun import resumen
+
+
+def _simular_latencia(motor, segundos):
+    from sqlalchemy import event
+
+    @event.listens_for(motor, "connect")
+    def _al_conectar(conexion, _):
+        # Con aiosqlite la conexion real vive en su hilo; con pysqlite, en el del bucle
+        crudo = getattr(getattr(conexion, "_connection", None), "_conn", conexion)
+        crudo.set_trace_callback(lambda _: time.sleep(segundos))
+
+
+async def _cargar(clientes, peticiones, ruta):
+    import httpx
+    from vista import app
+    muestras = []
+
+    async def cliente(http, numero):
+        for i in range(peticiones):
+            inicio = time.perf_counter()
+            respuesta = await http.get(ruta.format(id=f"bench-{(numero + i) % 100}"))
+            muestras.append(time.perf_counter() - inicio)
+            assert respuesta.status_code == 200, respuesta.text
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as http:
+        await asyncio.gather(*(cliente(http, numero) for numero in range(clientes)))
+    return muestras
+
+
+async def principal(argumentos):
+    from fastapi import Depends, HTTPException
+    from sqlalchemy import insert
+    from sqlalchemy.orm import Session
+    from conexion import AsyncSessionLocal, get_db, crear, crear_async
+    from modelo import Usuario, RolUsuario
+    from vista import app
+
+    if argumentos.latencia_ms:
+        _simular_latencia(crear, argumentos.latencia_ms / 1000)
+        _simular_latencia(crear_async.sync_engine, argumentos.latencia_ms / 1000)
+
+    @app.get("/bench/sync/usuario/{id}")
+    async def obtener_usuario_bloqueante(id: str, db: Session = Depends(get_db)):
+        db_usuario = db.query(Usuario).filter(Usuario.documento == id).first()
+        if not db_usuario:
+            raise HTTPException(status_code=404, detail="Usuario no encontrado")
+        return {"documento": db_usuario.documento, "nombre": db_usuario.nombre}
+
+    async with AsyncSessionLocal() as db:
+        await db.execute(insert(Usuario).values([
+            {"documento": f"bench-{i}", "nombre": "Bench", "correo": f"bench-{i}@x.co",
+             "password": "x", "rol": RolUsuario.MESERO, "sucursal": None}
+            for i in range(100)
+        ]))
+        await db.commit()
+
+    print(f"{argumentos.clientes} clientes x {argumentos.peticiones} peticiones, latencia simulada {argumentos.latencia_ms} ms")
+    resumen("antes (Session sincrona)", await _cargar(argumentos.clientes, argumentos.peticiones, "/bench/sync/usuario/{id}"))
+    resumen("despues (AsyncSession)", await _cargar(argumentos.clientes, argumentos.peticiones, "/usuario/{id}"))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--clientes", type=int, default=200)
+    parser.add_argument("--peticiones", type=int, default=10)
+    parser.add_argument("--latencia-ms", type=float, default=2)
+    argumentos = parser.parse_args()
+    comun.crear_esquema()
+    asyncio.run(principal(argumentos))
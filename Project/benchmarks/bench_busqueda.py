@@ -0,0 +1,96 @@
+"""Busqueda de productos: 50k productos en 500 sucursales.
+
+"antes" es la unica busqueda que habia en la base, llevada a algo util:
+LIKE '%q%' por sucursal en SQL (sin orden por relevancia). "despues" es
+busqueda.Indice, el que usa /producto/buscar desde el menu en memoria:
+prefijos, varias palabras, errores de tipeo y con filtro de disponibles.
+Tambien se mide construir los indices y el cambio incremental de un producto.
+"""
+import argparse
+import random
+import sqlite3
+import time
+import comun
+from comun import resumen
+
+PLATOS = ["pizza", "hamburguesa", "ensalada", "sopa", "arepa", "empanada", "lasaña", "café", "té", "jugo", "limonada", "torta",
+          "pollo", "carne", "pescado", "camarón", "arroz", "pasta", "sándwich", "burrito", "taco", "quesadilla", "helado", "brownie"]
+DETALLES = ["de la casa", "especial", "clásica", "con queso", "picante", "hawaiana", "mixta", "vegetariana", "de maíz", "al ajillo",
+            "grande", "pequeña", "doble", "en salsa", "con tocineta", "de mora", "de mango", "frío", "caliente", "sin azúcar"]
+
+
+def _nombres(azar, cantidad):
+    return [f"{azar.choice(PLATOS).capitalize()} {azar.choice(DETALLES)} {numero}" for numero in range(cantidad)]
+
+
+def _consultas(azar, nombres, cantidad):
+    consultas = []
+    for _ in range(cantidad):
+        nombre = azar.choice(nombres).split()
+        tipo = azar.randrange(3)
+        if tipo == 0:
+            consultas.append(nombre[0][:azar.randint(1, 5)])
+        elif tipo == 1:
+            consultas.append(f"{nombre[0][:4]} {nombre[1][:3]}")
+        else:
+            # Error de tipeo: se cambia una letra
+            palabra = nombre[0].lower()
+            posicion = azar.randrange(len(palabra))
+            consultas.append(palabra[:posicion] + "x" + palabra[posicion + 1:])
+    return consultas
+
+
+def principal(argumentos):
+    import busqueda
+
+    azar = random.Random(1)
+    por_sucursal = argumentos.productos // argumentos.sucursales
+    sucursales = {f"bus-{i}": _nombres(azar, por_sucursal) for i in range(argumentos.sucursales)}
+
+    inicio = time.perf_counter()
+    indices = {}
+    for sucursal, nombres in sucursales.items():
+        indice = indices[sucursal] = busqueda.Indice()
+        for id_producto, nombre in enumerate(nombres):
+            indice.agregar(id_producto, nombre)
+    construccion = time.perf_counter() - inicio
+    print(f"{argumentos.productos} productos en {argumentos.sucursales} sucursales; indices construidos en {construccion * 1000:.0f} ms")
+
+    pruebas = [(sucursal, consulta) for sucursal in azar.sample(list(sucursales), min(50, len(sucursales)))
+               for consulta in _consultas(azar, sucursales[sucursal], argumentos.consultas // 50)]
+
+    conexion = sqlite3.connect(":memory:")
+    conexion.execute("CREATE TABLE producto (id INTEGER PRIMARY KEY, nombre TEXT, id_sucursal TEXT)")
+    conexion.execute("CREATE INDEX ix_producto_id_sucursal ON producto (id_sucursal)")
+    conexion.executemany("INSERT INTO producto (nombre, id_sucursal) VALUES (?, ?)",
+                         [(nombre, sucursal) for sucursal, nombres in sucursales.items() for nombre in nombres])
+    muestras = []
+    for sucursal, consulta in pruebas:
+        inicio = time.perf_counter()
+        conexion.execute("SELECT id, nombre FROM producto WHERE id_sucursal = ? AND nombre LIKE ? LIMIT 10", (sucursal, f"%{consulta}%")).fetchall()
+        muestras.append(time.perf_counter() - inicio)
+    resumen("antes (LIKE en sqlite en memoria)", muestras)
+
+    for nombre, filtro in (("despues (Indice.buscar)", None), ("despues (solo disponibles)", lambda id_producto: id_producto % 3 != 0)):
+        muestras = []
+        for sucursal, consulta in pruebas:
+            inicio = time.perf_counter()
+            indices[sucursal].buscar(consulta, 10, filtro)
+            muestras.append(time.perf_counter() - inicio)
+        resumen(nombre, muestras)
+
+    muestras = []
+    for numero in range(1000):
+        indice = indices[f"bus-{numero % argumentos.sucursales}"]
+        inicio = time.perf_counter()
+        indice.agregar(numero % por_sucursal, f"Producto renombrado {numero}")
+        muestras.append(time.perf_counter() - inicio)
+    resumen("cambio incremental de un producto", muestras)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--productos", type=int, default=50_000)
+    parser.add_argument("--sucursales", type=int, default=500)
+    parser.add_argument("--consultas", type=int, default=5000)
+    principal(parser.parse_args())
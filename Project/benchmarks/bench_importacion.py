@@ -0,0 +1,52 @@
+"""Alta de N usuarios: POST /usuario fila por fila vs /usuario/bulk en NDJSON.
+
+Por defecto BCRYPT_ROUNDS=4 para medir el camino de la base; con el costo
+de produccion (12) ambos flujos quedan dominados por el hash, que /bulk
+reparte en el pool de procesos (HASH_PROCESOS).
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+import comun
+
+
+def _usuario(prefijo, i):
+    return {"documento": f"{prefijo}{i}", "nombre": "Bench", "correo": f"{prefijo}{i}@x.co", "password": "clave", "rol": "MESERO", "fecha_creacion": "2026-01-01"}
+
+
+async def principal(argumentos):
+    import httpx
+    import autenticacion
+    import contrasenas
+    from vista import app
+
+    token = autenticacion.emitir_token({"documento": "bench", "rol": "ADMINISTRADOR", "sucursal": None, "restaurante": None})
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=None) as http:
+        print(f"{argumentos.filas} usuarios, BCRYPT_ROUNDS={contrasenas.BCRYPT_ROUNDS}")
+
+        inicio = time.perf_counter()
+        for i in range(argumentos.filas):
+            respuesta = await http.post("/usuario", json=_usuario("u", i))
+            assert respuesta.status_code == 201, respuesta.text
+        antes = time.perf_counter() - inicio
+        print(f"antes (POST /usuario x {argumentos.filas}):  {antes:8.2f} s  {argumentos.filas / antes:8.0f} filas/s")
+
+        cuerpo = "\n".join(json.dumps(_usuario("b", i)) for i in range(argumentos.filas))
+        inicio = time.perf_counter()
+        respuesta = await http.post("/usuario/bulk", content=cuerpo, headers={"Content-Type": "application/x-ndjson", "Authorization": f"Bearer {token}"})
+        despues = time.perf_counter() - inicio
+        assert respuesta.status_code == 200 and respuesta.json()["insertados"] == argumentos.filas, respuesta.text
+        print(f"despues (/usuario/bulk):          {despues:8.2f} s  {argumentos.filas / despues:8.0f} filas/s")
+    contrasenas.cerrar()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--filas", type=int, default=10000)
+    argumentos = parser.parse_args()
+    comun.crear_esquema()
+    asyncio.run(principal(argumentos))
@@ -0,0 +1,68 @@
+"""Logins por segundo: comparacion en texto plano (antes) vs bcrypt en el pool de procesos (despues).
+
+"antes" es el login original, que filtraba Usuario.password == password en
+SQL, montado en una ruta aparte; "despues" es POST /usuario/login con el
+BCRYPT_ROUNDS del entorno (12 por defecto). Se informa tambien por proceso
+de hash (HASH_PROCESOS), que es lo que escala con los nucleos.
+"""
+import argparse
+import asyncio
+import time
+import comun
+
+
+async def _medir(http, ruta, prefijo, logins, clientes):
+    pendientes = iter(range(logins))
+
+    async def cliente():
+        for i in pendientes:
+            respuesta = await http.post(ruta, json={"correo": f"{prefijo}{i % 100}@x.co", "password": "secreta"})
+            assert respuesta.status_code == 200, respuesta.text
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(cliente() for _ in range(clientes)))
+    return logins / (time.perf_counter() - inicio)
+
+
+async def principal(argumentos):
+    import httpx
+    from fastapi import Depends, HTTPException
+    from sqlalchemy import insert, select
+    import contrasenas
+    from conexion import AsyncSessionLocal, get_async_db
+    from modelo import Usuario, RolUsuario
+    from schemas import UsuarioLoginSchema
+    from vista import app
+
+    @app.post("/bench/login-plano")
+    async def login_plano(usuario: UsuarioLoginSchema, db=Depends(get_async_db)):
+        resultado = await db.execute(select(Usuario).where(Usuario.correo == usuario.correo, Usuario.password == usuario.password))
+        if not resultado.scalars().first():
+            raise HTTPException(status_code=400, detail="Correo o contraseña incorrectos")
+        return {"correo": usuario.correo}
+
+    hash_password = await contrasenas.hashear("secreta")
+    async with AsyncSessionLocal() as db:
+        await db.execute(insert(Usuario).values(
+            [{"documento": f"p{i}", "nombre": "Bench", "correo": f"plano{i}@x.co", "password": "secreta", "rol": RolUsuario.MESERO} for i in range(100)]
+            + [{"documento": f"h{i}", "nombre": "Bench", "correo": f"hash{i}@x.co", "password": hash_password, "rol": RolUsuario.MESERO} for i in range(100)]
+        ))
+        await db.commit()
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as http:
+        antes = await _medir(http, "/bench/login-plano", "plano", argumentos.logins, argumentos.clientes)
+        despues = await _medir(http, "/usuario/login", "hash", argumentos.logins, argumentos.clientes)
+    procesos = contrasenas.HASH_PROCESOS
+    print(f"{argumentos.logins} logins, {argumentos.clientes} clientes, BCRYPT_ROUNDS={contrasenas.BCRYPT_ROUNDS}, HASH_PROCESOS={procesos}")
+    print(f"antes (texto plano):  {antes:8.1f} logins/s")
+    print(f"despues (bcrypt):     {despues:8.1f} logins/s  {despues / procesos:8.1f} por proceso de hash")
+    contrasenas.cerrar()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--clientes", type=int, default=20)
+    argumentos = parser.parse_args()
+    comun.crear_esquema()
+    asyncio.run(principal(argumentos))
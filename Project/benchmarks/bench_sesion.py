@@ -0,0 +1,75 @@
+"""Latencia de login hasta tener el contexto: cascada de 5 llamadas vs /session/bootstrap.
+
+Cada usuario se consulta una sola vez por flujo para que la cache de las
+rutas escalares no favorezca a la cascada. --rtt-ms suma a cada llamada HTTP
+la ida y vuelta de la red del cliente, que es lo que la cascada multiplica.
+"""
+import argparse
+import asyncio
+import time
+import comun
+from comun import resumen
+
+
+async def principal(argumentos):
+    import httpx
+    from datetime import date
+    import contrasenas
+    from conexion import AsyncSessionLocal
+    from modelo import Usuario, RolUsuario, Restaurante, EstadoRestaurante, Sucursal, EstadoSucursal
+    from vista import app
+
+    hash_password = await contrasenas.hashear("secreta")
+    async with AsyncSessionLocal() as db:
+        for flujo in ("cascada", "bootstrap"):
+            for i in range(argumentos.usuarios):
+                db.add(Usuario(documento=f"{flujo[0]}{i}", nombre="Bench", correo=f"{flujo}{i}@x.co", password=hash_password, rol=RolUsuario.ADMINISTRADOR, sucursal=f"s-{flujo}{i}"))
+        await db.flush()
+        for flujo in ("cascada", "bootstrap"):
+            for i in range(argumentos.usuarios):
+                db.add(Restaurante(id=f"r-{flujo}{i}", nombre="R", telefono="1", direccion="d", correo="r@x.co", imagen="", fecha_finalizacion=date(2030, 1, 1), estado=EstadoRestaurante.ACTIVO, id_usuario=f"{flujo[0]}{i}"))
+        await db.flush()
+        for flujo in ("cascada", "bootstrap"):
+            for i in range(argumentos.usuarios):
+                db.add(Sucursal(id=f"s-{flujo}{i}", nombre="S", direccion="d", ciudad="c", telefono="1", estado=EstadoSucursal.ACTIVO, administrador=f"{flujo[0]}{i}", id_restaurante=f"r-{flujo}{i}"))
+        await db.commit()
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as http:
+        async def llamar(metodo, ruta, **opciones):
+            await asyncio.sleep(argumentos.rtt_ms / 1000)
+            respuesta = await http.request(metodo, ruta, **opciones)
+            assert respuesta.status_code == 200, (ruta, respuesta.text)
+            return respuesta.json()
+
+        async def cascada(i):
+            correo = f"cascada{i}@x.co"
+            await llamar("POST", "/usuario/login", json={"correo": correo, "password": "secreta"})
+            documento = await llamar("GET", f"/usuario/correo/{correo}")
+            await llamar("GET", f"/usuario/documento/{correo}")
+            await llamar("GET", f"/usuario/sucursal/{documento}")
+            id_restaurante = await llamar("GET", f"/restaurante/id_usuario/{documento}")
+            await llamar("GET", f"/restaurante/nombre/{id_restaurante}")
+
+        async def bootstrap(i):
+            correo = f"bootstrap{i}@x.co"
+            await llamar("POST", "/usuario/login", json={"correo": correo, "password": "secreta"})
+            await llamar("GET", "/session/bootstrap", params={"correo": correo})
+
+        print(f"{argumentos.usuarios} usuarios, BCRYPT_ROUNDS={contrasenas.BCRYPT_ROUNDS}, rtt {argumentos.rtt_ms} ms")
+        for nombre, flujo in (("antes (login + 5 llamadas)", cascada), ("despues (login + bootstrap)", bootstrap)):
+            muestras = []
+            for i in range(argumentos.usuarios):
+                inicio = time.perf_counter()
+                await flujo(i)
+                muestras.append(time.perf_counter() - inicio)
+            resumen(nombre, muestras)
+    contrasenas.cerrar()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--usuarios", type=int, default=50)
+    parser.add_argument("--rtt-ms", type=float, default=20)
+    argumentos = parser.parse_args()
+    comun.crear_esquema()
+    asyncio.run(principal(argumentos))
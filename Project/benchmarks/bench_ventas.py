@@ -0,0 +1,129 @@
+"""Tablero de ventas sobre una tabla venta sintetica de N filas (10M por defecto).
+
+"antes" son las consultas originales de /mayorproductodia y /productocategoria:
+SUM ... GROUP BY sobre toda la tabla venta. "despues" son las mismas rutas
+leyendo de venta_dia con rango de fechas, para todas las sucursales y para
+una sola. Tambien se mide /ventas por dia y la reconstruccion completa de
+los acumulados (ventas.reconstruir), que es lo que cuesta el backfill.
+"""
+import argparse
+import asyncio
+import random
+import sqlite3
+import time
+from datetime import date, datetime, timedelta
+import comun
+from comun import Cronometro
+
+LOTE = 100000
+
+CONSULTA_ANTES = """
+    SELECT p.id_producto AS id_producto, p.nombre, SUM(v.cantidad) AS cantidad
+    FROM venta v JOIN producto p ON v.id_producto = p.id_producto
+    GROUP BY p.id_producto, p.nombre ORDER BY cantidad DESC LIMIT 5
+"""
+CONSULTA_ANTES_CATEGORIA = """
+    SELECT p.id_producto AS id_producto, p.nombre, SUM(v.cantidad) AS cantidad, c.nombre AS categoria
+    FROM venta v JOIN producto p ON v.id_producto = p.id_producto JOIN categoria c ON p.id_categoria = c.id
+    GROUP BY p.id_producto, p.nombre, c.nombre ORDER BY cantidad DESC LIMIT 5
+"""
+
+
+def _generar(ruta, argumentos):
+    """Llena la base con sqlite3 directamente: por el ORM la carga tardaria mas que la medicion."""
+    conexion = sqlite3.connect(ruta)
+    conexion.execute("PRAGMA journal_mode=OFF")
+    conexion.execute("PRAGMA synchronous=OFF")
+    sucursales = [f"bench-{i}" for i in range(argumentos.sucursales)]
+    conexion.execute("INSERT INTO usuario (documento, nombre, correo, password, rol, fecha_creacion, estado) VALUES ('bench', 'B', 'b@x.co', 'x', 'ADMINISTRADOR', '2026-01-01', 'ACTIVO')")
+    conexion.execute("INSERT INTO restaurante (id, nombre, telefono, direccion, correo, imagen, fecha_creacion, fecha_finalizacion, estado, id_usuario) VALUES ('bench-r', 'R', '1', 'd', 'r@x.co', '', '2026-01-01', '2030-01-01', 'ACTIVO', 'bench')")
+    conexion.executemany(
+        "INSERT INTO sucursal (id, nombre, direccion, ciudad, telefono, fecha_apertura, estado, id_restaurante) VALUES (?, 'S', 'd', 'c', '1', '2026-01-01', 'ACTIVO', 'bench-r')",
+        [(sucursal,) for sucursal in sucursales],
+    )
+    conexion.executemany("INSERT INTO categoria (id, nombre) VALUES (?, ?)", [(i, f"Categoria {i}") for i in range(1, 21)])
+    productos = list(range(1, argumentos.productos + 1))
+    conexion.executemany(
+        "INSERT INTO producto (id_producto, nombre, precio, disponibilidad, id_sucursal, id_categoria) VALUES (?, ?, 10, 1, ?, ?)",
+        [(producto, f"Producto {producto}", sucursales[producto % len(sucursales)], producto % 20 + 1) for producto in productos],
+    )
+    inicio = datetime.combine(argumentos.fin - timedelta(days=argumentos.dias - 1), datetime.min.time())
+    segundos = argumentos.dias * 86400
+    azar = random.Random(1)
+    for desde in range(0, argumentos.filas, LOTE):
+        filas = []
+        for _ in range(min(LOTE, argumentos.filas - desde)):
+            cantidad = azar.randint(1, 4)
+            momento = inicio + timedelta(seconds=azar.randrange(segundos))
+            filas.append((momento.strftime("%Y-%m-%d %H:%M:%S.000000"), cantidad, cantidad * 10.0, azar.choice(productos), azar.choice(sucursales)))
+        conexion.executemany("INSERT INTO venta (fecha_hora, cantidad, total, id_producto, id_sucursal) VALUES (?, ?, ?, ?, ?)", filas)
+    conexion.commit()
+    conexion.close()
+
+
+def _mejor(repeticiones, funcion):
+    mejor = None
+    for _ in range(repeticiones):
+        with Cronometro() as cronometro:
+            funcion()
+        mejor = cronometro.segundos if mejor is None else min(mejor, cronometro.segundos)
+    return mejor * 1000
+
+
+async def _mejor_async(repeticiones, funcion):
+    mejor = None
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        await funcion()
+        duracion = time.perf_counter() - inicio
+        mejor = duracion if mejor is None else min(mejor, duracion)
+    return mejor * 1000
+
+
+async def principal(argumentos):
+    from sqlalchemy import text
+    from conexion import AsyncSessionLocal, crear
+    import ventas
+
+    ruta = crear.url.database
+    with Cronometro() as carga:
+        _generar(ruta, argumentos)
+    print(f"{argumentos.filas} ventas, {argumentos.sucursales} sucursales, {argumentos.productos} productos, {argumentos.dias} dias (carga {carga.segundos:.0f} s)")
+
+    with crear.connect() as conexion:
+        antes = _mejor(argumentos.repeticiones, lambda: conexion.execute(text(CONSULTA_ANTES)).all())
+        antes_categoria = _mejor(argumentos.repeticiones, lambda: conexion.execute(text(CONSULTA_ANTES_CATEGORIA)).all())
+
+    desde_total = argumentos.fin - timedelta(days=argumentos.dias - 1)
+    desde_mes = argumentos.fin - timedelta(days=29)
+    async with AsyncSessionLocal() as db:
+        inicio = time.perf_counter()
+        await ventas.reconstruir(db, desde_total, argumentos.fin)
+        reconstruccion = time.perf_counter() - inicio
+        medidas = {
+            "todo el rango, todas las sucursales": lambda: ventas.productos_mas_vendidos(db, desde_total, argumentos.fin),
+            "30 dias, todas las sucursales": lambda: ventas.productos_mas_vendidos(db, desde_mes, argumentos.fin),
+            "30 dias, una sucursal": lambda: ventas.productos_mas_vendidos(db, desde_mes, argumentos.fin, "bench-0"),
+            "30 dias, una sucursal, por categoria": lambda: ventas.productos_mas_vendidos(db, desde_mes, argumentos.fin, "bench-0", por_categoria=True),
+            "/ventas por dia, 30 dias, todas": lambda: ventas.ventas_por_periodo(db, desde_mes, argumentos.fin),
+        }
+        despues = {nombre: await _mejor_async(argumentos.repeticiones, medida) for nombre, medida in medidas.items()}
+
+    print(f"reconstruccion de venta_hora y venta_dia: {reconstruccion:.1f} s")
+    print(f"antes  /mayorproductodia (toda la tabla venta):   {antes:10.1f} ms")
+    print(f"antes  /productocategoria (toda la tabla venta):  {antes_categoria:10.1f} ms")
+    for nombre, milisegundos in despues.items():
+        print(f"despues {nombre:<42} {milisegundos:10.1f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--filas", type=int, default=10_000_000)
+    parser.add_argument("--sucursales", type=int, default=50)
+    parser.add_argument("--productos", type=int, default=500)
+    parser.add_argument("--dias", type=int, default=365)
+    parser.add_argument("--fin", type=date.fromisoformat, default=date(2026, 9, 30))
+    parser.add_argument("--repeticiones", type=int, default=3)
+    argumentos = parser.parse_args()
+    comun.crear_esquema()
+    asyncio.run(principal(argumentos))
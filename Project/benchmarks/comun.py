@@ -0,0 +1,46 @@
+"""Arranque comun de los benchmarks: base sqlite temporal con el esquema de las migraciones.
+
+Se ejecutan desde Project/, p. ej. `python benchmarks/bench_async.py`. Como en
+tests/conftest.py, la configuracion se fija en el entorno antes de importar
+el proyecto; URL_DB y URL_DB_ASYNC se pueden apuntar a MySQL para medir
+contra la base real.
+"""
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+_directorio = tempfile.mkdtemp(prefix="ventrix-bench-")
+os.environ.setdefault("URL_DB", f"sqlite:///{_directorio}/ventrix.db")
+os.environ.setdefault("URL_DB_ASYNC", f"sqlite+aiosqlite:///{_directorio}/ventrix.db")
+os.environ.setdefault("RECONCILIACION_INTERVALO", "0")
+
+PROYECTO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROYECTO)
+
+
+def crear_esquema():
+    from alembic import command
+    from alembic.config import Config
+    configuracion = Config(os.path.join(PROYECTO, "alembic.ini"))
+    configuracion.set_main_option("script_location", os.path.join(PROYECTO, "migraciones"))
+    command.upgrade(configuracion, "head")
+
+
+def resumen(nombre, muestras):
+    """Imprime p50/p99 (ms) de una lista de duraciones en segundos."""
+    ordenadas = sorted(muestras)
+    p50 = statistics.median(ordenadas) * 1000
+    p99 = ordenadas[min(len(ordenadas) - 1, int(len(ordenadas) * 0.99))] * 1000
+    print(f"{nombre:<40} n={len(ordenadas):<7} p50={p50:9.3f} ms  p99={p99:9.3f} ms")
+    return p50, p99
+
+
+class Cronometro:
+    def __enter__(self):
+        self.inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, *_):
+        self.segundos = time.perf_counter() - self.inicio
@@ -0,0 +1,104 @@
+"""Prueba de resistencia del canal de eventos: N pantallas WebSocket reales contra uvicorn.
+
+Levanta la app en un puerto local, conecta --pantallas clientes repartidos
+en --sucursales y publica eventos durante --segundos a --tasa eventos/s
+por el mismo camino que usan los commits (eventos._publicar). Cada cierto
+tiempo una parte de las pantallas se desconecta y se vuelve a conectar.
+Al final verifica que cada pantalla recibio solo eventos de su sucursal,
+sin huecos mientras estuvo conectada, e informa la latencia de entrega.
+
+Necesita uvicorn y websockets (pip install uvicorn websockets).
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+import comun
+from comun import resumen
+
+
+async def principal(argumentos):
+    import uvicorn
+    import websockets
+    import autenticacion
+    import eventos
+    from vista import app
+
+    servidor = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=argumentos.puerto, log_level="warning"))
+    tarea_servidor = asyncio.create_task(servidor.serve())
+    while not servidor.started:
+        await asyncio.sleep(0.05)
+
+    sucursales = [f"soak-{i}" for i in range(argumentos.sucursales)]
+    latencias = []
+    errores = []
+    recibidos = {}
+    fin = asyncio.Event()
+
+    async def pantalla(numero):
+        sucursal = sucursales[numero % len(sucursales)]
+        token = autenticacion.emitir_token({"documento": f"p{numero}", "rol": "COCINA", "sucursal": sucursal, "restaurante": None})
+        url = f"ws://127.0.0.1:{argumentos.puerto}/ws/sucursal/{sucursal}?token={token}"
+        recibidos[numero] = 0
+        while not fin.is_set():
+            async with websockets.connect(url, max_queue=None) as conexion:
+                anterior = None
+                # Se reconecta a los `vida` segundos para ejercitar la baja y el alta de suscripciones
+                vida = time.monotonic() + random.uniform(argumentos.reconexion, argumentos.reconexion * 2)
+                while not fin.is_set() and time.monotonic() < vida:
+                    try:
+                        evento = json.loads(await asyncio.wait_for(conexion.recv(), 0.5))
+                    except asyncio.TimeoutError:
+                        continue
+                    if evento["tipo"] == "latido":
+                        continue
+                    datos = evento["datos"]
+                    latencias.append(time.time() - datos["enviado"])
+                    recibidos[numero] += 1
+                    if datos["sucursal"] != sucursal:
+                        errores.append(f"pantalla {numero} recibio un evento de {datos['sucursal']}")
+                    if anterior is not None and datos["numero"] != anterior + 1:
+                        errores.append(f"pantalla {numero}: hueco entre {anterior} y {datos['numero']}")
+                    anterior = datos["numero"]
+
+    pantallas = [asyncio.create_task(pantalla(numero)) for numero in range(argumentos.pantallas)]
+    while sum(len(canal) for canal in eventos.difusor._canales.values()) < argumentos.pantallas:
+        await asyncio.sleep(0.1)
+    print(f"{argumentos.pantallas} pantallas conectadas en {argumentos.sucursales} sucursales")
+
+    numeros = dict.fromkeys(sucursales, 0)
+    limite = time.monotonic() + argumentos.segundos
+    publicados = 0
+    while time.monotonic() < limite:
+        sucursal = random.choice(sucursales)
+        numeros[sucursal] += 1
+        await eventos._publicar([(sucursal, "pedido_estado", {"sucursal": sucursal, "numero": numeros[sucursal], "enviado": time.time()})])
+        publicados += 1
+        await asyncio.sleep(1 / argumentos.tasa)
+    await asyncio.sleep(1)
+    fin.set()
+    await asyncio.gather(*pantallas)
+    servidor.should_exit = True
+    await tarea_servidor
+
+    print(f"{publicados} eventos publicados en {argumentos.segundos} s, {sum(recibidos.values())} entregas, {eventos.descartados._valores.get((), 0)} descartados por cola llena")
+    resumen("latencia de entrega", latencias)
+    print(f"suscripciones abiertas al terminar: {sum(len(canal) for canal in eventos.difusor._canales.values())}")
+    for error in errores[:10]:
+        print("ERROR", error)
+    if errores:
+        raise SystemExit(f"{len(errores)} errores")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pantallas", type=int, default=500)
+    parser.add_argument("--sucursales", type=int, default=50)
+    parser.add_argument("--segundos", type=float, default=60)
+    parser.add_argument("--tasa", type=float, default=50, help="eventos por segundo en total")
+    parser.add_argument("--reconexion", type=float, default=20, help="segundos minimos entre reconexiones de cada pantalla")
+    parser.add_argument("--puerto", type=int, default=8765)
+    argumentos = parser.parse_args()
+    comun.crear_esquema()
+    asyncio.run(principal(argumentos))
@@ -0,0 +1,106 @@
+import re
+import unicodedata
+from bisect import bisect_left, insort
+from collections import defaultdict
+
+# Similitud minima (trigramas) para aceptar una coincidencia aproximada
+SIMILITUD_MINIMA = 0.3
+
+
+def normalizar(texto):
+    """Minusculas sin tildes ni signos: "Café Ñoño" -> "cafe nono"."""
+    descompuesto = unicodedata.normalize("NFKD", texto or "")
+    sin_tildes = "".join(caracter for caracter in descompuesto if not unicodedata.combining(caracter))
+    return " ".join(re.findall(r"[a-z0-9]+", sin_tildes.lower()))
+
+def trigramas(texto):
+    trigramas_texto = set()
+    for palabra in texto.split():
+        relleno = f"  {palabra} "
+        trigramas_texto.update(relleno[i:i + 3] for i in range(len(relleno) - 2))
+    return trigramas_texto
+
+
+class Indice:
+    """Indice de nombres de productos de una sucursal.
+
+    Las palabras se guardan ordenadas para buscar por prefijo con bisect y
+    los trigramas permiten encontrar nombres con errores de tipeo. Agregar o
+    quitar un producto solo toca sus propias entradas.
+    """
+
+    def __init__(self):
+        self._nombres = {}
+        self._palabras = []
+        self._trigramas = defaultdict(set)
+
+    def agregar(self, id_producto, nombre):
+        self.quitar(id_producto)
+        normalizado = normalizar(nombre)
+        tri = trigramas(normalizado)
+        self._nombres[id_producto] = (normalizado, tri)
+        for palabra in set(normalizado.split()):
+            insort(self._palabras, (palabra, id_producto))
+        for trigrama in tri:
+            self._trigramas[trigrama].add(id_producto)
+
+    def quitar(self, id_producto):
+        anterior = self._nombres.pop(id_producto, None)
+        if anterior is None:
+            return
+        normalizado, tri = anterior
+        for palabra in set(normalizado.split()):
+            posicion = bisect_left(self._palabras, (palabra, id_producto))
+            if posicion < len(self._palabras) and self._palabras[posicion] == (palabra, id_producto):
+                del self._palabras[posicion]
+        for trigrama in tri:
+            ids = self._trigramas[trigrama]
+            ids.discard(id_producto)
+            if not ids:
+                del self._trigramas[trigrama]
+
+    def _con_prefijo(self, prefijo):
+        ids = set()
+        posicion = bisect_left(self._palabras, (prefijo,))
+        while posicion < len(self._palabras) and self._palabras[posicion][0].startswith(prefijo):
+            ids.add(self._palabras[posicion][1])
+            posicion += 1
+        return ids
+
+    def buscar(self, consulta, limite=10, filtro=None):
+        """Ids de productos ordenados por relevancia.
+
+        Primero los nombres que empiezan por la consulta, luego los que
+        tienen todas sus palabras como prefijo de alguna palabra, y al final
+        los parecidos por trigramas. `filtro` se aplica antes de decidir si
+        hacen falta los parecidos, para no quedar por debajo de `limite`.
+        """
+        normalizada = normalizar(consulta)
+        if not normalizada:
+            return []
+        terminos = normalizada.split()
+
+        puntajes = {}
+        candidatos = self._con_prefijo(terminos[0])
+        for termino in terminos[1:]:
+            candidatos &= self._con_prefijo(termino)
+        for id_producto in candidatos:
+            if filtro is None or filtro(id_producto):
+                puntajes[id_producto] = 0.0 if self._nombres[id_producto][0].startswith(normalizada) else 1.0
+
+        if len(puntajes) < limite:
+            tri_consulta = trigramas(normalizada)
+            compartidos = defaultdict(int)
+            for trigrama in tri_consulta:
+                for id_producto in self._trigramas.get(trigrama, ()):
+                    compartidos[id_producto] += 1
+            for id_producto, comunes in compartidos.items():
+                if id_producto in puntajes or (filtro is not None and not filtro(id_producto)):
+                    continue
+                similitud = comunes / (len(tri_consulta) + len(self._nombres[id_producto][1]) - comunes)
+                if similitud >= SIMILITUD_MINIMA:
+                    puntajes[id_producto] = 3.0 - similitud
+
+        encontrados = list(puntajes)
+        encontrados.sort(key=lambda id_producto: (puntajes[id_producto], len(self._nombres[id_producto][0]), self._nombres[id_producto][0]))
+        return encontrados[:limite]
@@ -0,0 +1,240 @@
+import asyncio
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, object_session
+from configuracion import CACHE_TTL, CACHE_MAX_ENTRADAS, CACHE_REDIS_URL
+from modelo import Usuario, Restaurante, Sucursal
+import metricas
+
+logger = logging.getLogger("ventrix.cache")
+
+
+class CacheTTL:
+    """Cache LRU del proceso con expiracion por entrada."""
+
+    def __init__(self, max_entradas=CACHE_MAX_ENTRADAS, ttl=CACHE_TTL):
+        self.max_entradas = max_entradas
+        self.ttl = ttl
+        self._entradas = OrderedDict()
+        self._lock = threading.Lock()
+
+    def obtener(self, clave):
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada is None:
+                return False, None
+            expira, valor = entrada
+            if expira < time.monotonic():
+                del self._entradas[clave]
+                return False, None
+            self._entradas.move_to_end(clave)
+            return True, valor
+
+    def guardar(self, clave, valor, ttl=None):
+        expira = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._entradas[clave] = (expira, valor)
+            self._entradas.move_to_end(clave)
+            while len(self._entradas) > self.max_entradas:
+                self._entradas.popitem(last=False)
+
+    def eliminar(self, *claves):
+        with self._lock:
+            for clave in claves:
+                self._entradas.pop(clave, None)
+
+    def limpiar(self):
+        with self._lock:
+            self._entradas.clear()
+
+
+class BackendLocal:
+    """CacheTTL del proceso con la misma interfaz asincrona que BackendRedis."""
+
+    def __init__(self, max_entradas=CACHE_MAX_ENTRADAS, ttl=CACHE_TTL):
+        self.cache = CacheTTL(max_entradas, ttl)
+
+    async def obtener(self, clave):
+        return self.cache.obtener(clave)
+
+    async def guardar(self, clave, valor, ttl=None):
+        self.cache.guardar(clave, valor, ttl)
+
+    async def eliminar(self, *claves):
+        self.cache.eliminar(*claves)
+
+    async def limpiar(self):
+        self.cache.limpiar()
+
+
+class RedisFalso:
+    """Cliente en memoria con el subconjunto de la API de redis.asyncio que usa BackendRedis."""
+
+    def __init__(self):
+        self._datos = CacheTTL(max_entradas=CACHE_MAX_ENTRADAS, ttl=float("inf"))
+
+    async def get(self, clave):
+        return self._datos.obtener(clave)[1]
+
+    async def set(self, clave, valor, ex=None, nx=False):
+        if nx and self._datos.obtener(clave)[0]:
+            return None
+        self._datos.guardar(clave, valor, ttl=ex)
+        return True
+
+    async def delete(self, *claves):
+        self._datos.eliminar(*claves)
+
+
+class BackendRedis:
+    """Cache compartida entre workers sobre un cliente compatible con Redis."""
+
+    def __init__(self, cliente, ttl=CACHE_TTL, prefijo="ventrix:"):
+        self.cliente = cliente
+        self.ttl = ttl
+        self.prefijo = prefijo
+
+    async def obtener(self, clave):
+        valor = await self.cliente.get(self.prefijo + clave)
+        if valor is None:
+            return False, None
+        return True, json.loads(valor)
+
+    async def guardar(self, clave, valor, ttl=None):
+        await self.cliente.set(self.prefijo + clave, json.dumps(valor), ex=max(int(self.ttl if ttl is None else ttl), 1))
+
+    async def eliminar(self, *claves):
+        if claves:
+            await self.cliente.delete(*(self.prefijo + clave for clave in claves))
+
+    async def limpiar(self):
+        pass
+
+
+def crear_cliente_redis(url):
+    if url.startswith("memoria://"):
+        return RedisFalso()
+    # Dependencia opcional: solo se necesita con un Redis real. Cliente asincrono
+    # para no bloquear el loop; el timeout corto hace que un Redis lento cuente como fallo.
+    import redis.asyncio
+    return redis.asyncio.Redis.from_url(url, socket_timeout=0.05)
+
+def crear_backend():
+    if CACHE_REDIS_URL:
+        return BackendRedis(crear_cliente_redis(CACHE_REDIS_URL))
+    return BackendLocal()
+
+
+backend = crear_backend()
+
+consultas_cache = metricas.registrar(metricas.Contador("ventrix_cache_consultas_total", "Consultas a la cache por espacio y resultado"))
+
+
+async def consultar(clave, cargador):
+    """Devuelve el valor en cache o lo carga con `cargador` (corutina) y lo guarda.
+
+    Si el cargador lanza una excepcion (p. ej. 404) no se guarda nada. Si la
+    cache falla (Redis caido o lento) se responde con el cargador.
+    """
+    espacio = clave.rsplit(":", 1)[0]
+    try:
+        encontrado, valor = await backend.obtener(clave)
+    except Exception:
+        logger.warning("No se pudo leer %s de la cache", clave, exc_info=True)
+        consultas_cache.incrementar((("espacio", espacio), ("resultado", "error")))
+        return await cargador()
+    if encontrado:
+        consultas_cache.incrementar((("espacio", espacio), ("resultado", "hit")))
+        return valor
+    consultas_cache.incrementar((("espacio", espacio), ("resultado", "miss")))
+    valor = await cargador()
+    try:
+        await backend.guardar(clave, valor)
+    except Exception:
+        logger.warning("No se pudo guardar %s en la cache", clave, exc_info=True)
+    return valor
+
+async def invalidar(*claves):
+    try:
+        await backend.eliminar(*claves)
+    except Exception:
+        # Lo que quede en cache vence con CACHE_TTL
+        logger.warning("No se pudieron invalidar %s", claves, exc_info=True)
+
+
+#//////////////////////////////////CLAVES E INVALIDACION///////////////////////////////
+
+
+# Atributos de cada modelo de los que dependen sus claves
+_ATRIBUTOS = {
+    Usuario: ("documento", "correo"),
+    Restaurante: ("id",),
+    Sucursal: ("administrador",),
+}
+
+def _claves(modelo, valores):
+    if modelo is Usuario:
+        return [f"usuario:nombre:{valores['documento']}", f"usuario:sucursal:{valores['documento']}", f"usuario:rol:{valores['correo']}"]
+    if modelo is Restaurante:
+        return [f"restaurante:nombre:{valores['id']}"]
+    if modelo is Sucursal and valores["administrador"]:
+        return [f"sucursal:administrador:{valores['administrador']}"]
+    return []
+
+def claves_de(objeto):
+    """Claves de cache que dependen de los valores actuales de `objeto`."""
+    modelo = type(objeto)
+    return _claves(modelo, {atributo: getattr(objeto, atributo) for atributo in _ATRIBUTOS.get(modelo, ())})
+
+def _claves_anteriores(objeto):
+    # Durante el flush el historial conserva los valores previos (p. ej. el correo anterior)
+    modelo = type(objeto)
+    estado = inspect(objeto)
+    valores, cambiado = {}, False
+    for atributo in _ATRIBUTOS.get(modelo, ()):
+        borrados = estado.attrs[atributo].history.deleted
+        cambiado = cambiado or bool(borrados)
+        valores[atributo] = borrados[0] if borrados else getattr(objeto, atributo)
+    return _claves(modelo, valores) if cambiado else []
+
+# Las claves se anotan en el flush (cuando aun se conocen los valores anteriores)
+# y se invalidan al confirmar, igual que los eventos de eventos.py.
+_bucle = None
+_tareas = set()
+
+def iniciar():
+    """Se llama al arrancar: las sesiones sync del threadpool invalidan en este bucle."""
+    global _bucle
+    _bucle = asyncio.get_running_loop()
+
+def _anotar_objeto(mapper, connection, objeto):
+    sesion = object_session(objeto)
+    if sesion is not None:
+        sesion.info.setdefault("cache_claves", set()).update(claves_de(objeto), _claves_anteriores(objeto))
+
+for _modelo in (Usuario, Restaurante, Sucursal):
+    event.listen(_modelo, "after_update", _anotar_objeto)
+    event.listen(_modelo, "after_delete", _anotar_objeto)
+
+@event.listens_for(Session, "after_commit")
+def _al_confirmar(sesion):
+    claves = sesion.info.pop("cache_claves", None)
+    if not claves:
+        return
+    try:
+        tarea = asyncio.get_running_loop().create_task(invalidar(*claves))
+    except RuntimeError:
+        # Sesion sync fuera del bucle (tareas en segundo plano)
+        if _bucle is not None:
+            asyncio.run_coroutine_threadsafe(invalidar(*claves), _bucle)
+        return
+    _tareas.add(tarea)
+    tarea.add_done_callback(_tareas.discard)
+
+@event.listens_for(Session, "after_rollback")
+def _al_deshacer(sesion):
+    sesion.info.pop("cache_claves", None)
@@ -0,0 +1,68 @@
+import asyncio
+import hmac
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import bcrypt
+from configuracion import BCRYPT_ROUNDS, HASH_PROCESOS, HASH_COLA_POR_PROCESO
+
+# bcrypt consume CPU a proposito; se ejecuta en procesos aparte para no frenar el loop
+_ejecutor = None
+_cupos = asyncio.Semaphore(HASH_PROCESOS * HASH_COLA_POR_PROCESO)
+
+PREFIJOS_BCRYPT = ("$2a$", "$2b$", "$2y$")
+# bcrypt solo usa los primeros 72 bytes y desde la version 5 rechaza los mas largos
+MAXIMO_BYTES = 72
+
+
+def _obtener_ejecutor():
+    global _ejecutor
+    if _ejecutor is None:
+        # forkserver: un fork del proceso con el loop y sus hilos puede heredar locks tomados
+        _ejecutor = ProcessPoolExecutor(max_workers=HASH_PROCESOS, mp_context=multiprocessing.get_context("forkserver"))
+    return _ejecutor
+
+def _hashear(password, rondas):
+    return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt(rondas)).decode("utf-8")
+
+def _verificar(password, almacenado):
+    return bcrypt.checkpw(password.encode("utf-8"), almacenado.encode("utf-8"))
+
+async def _en_proceso(funcion, *argumentos):
+    async with _cupos:
+        return await asyncio.get_running_loop().run_in_executor(_obtener_ejecutor(), funcion, *argumentos)
+
+
+def demasiado_larga(password):
+    return len(password.encode("utf-8")) > MAXIMO_BYTES
+
+def es_hash(valor):
+    return bool(valor) and valor.startswith(PREFIJOS_BCRYPT)
+
+def necesita_rehash(almacenado):
+    # "$2b$12$..." -> el costo es el tercer campo
+    return int(almacenado.split("$")[2]) != BCRYPT_ROUNDS
+
+async def hashear(password):
+    return await _en_proceso(_hashear, password, BCRYPT_ROUNDS)
+
+async def hashear_varios(passwords):
+    return await asyncio.gather(*(hashear(password) for password in passwords))
+
+async def verificar(password, almacenado):
+    """Comprueba `password` contra lo guardado y devuelve (valido, hash_nuevo).
+
+    `hash_nuevo` viene cuando hay que reemplazar lo guardado: filas antiguas en
+    texto plano o hashes con un costo distinto al configurado.
+    """
+    if es_hash(almacenado):
+        if demasiado_larga(password):
+            return False, None
+        valido = await _en_proceso(_verificar, password, almacenado)
+        return valido, (await hashear(password) if valido and necesita_rehash(almacenado) else None)
+    valido = hmac.compare_digest(almacenado.encode("utf-8"), password.encode("utf-8"))
+    return valido, (await hashear(password) if valido else None)
+
+
+def cerrar():
+    if _ejecutor is not None:
+        _ejecutor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,206 @@
+import asyncio
+import itertools
+import json
+import logging
+from sqlalchemy import event, select, or_
+from sqlalchemy.orm import Session
+from configuracion import EVENTOS_REDIS_URL, EVENTOS_COLA, EVENTOS_LATIDO
+from modelo import Sucursal, RolUsuario
+import metricas
+
+logger = logging.getLogger("ventrix.eventos")
+
+suscriptores = metricas.registrar(metricas.Nivel("ventrix_eventos_suscriptores", "Pantallas conectadas al canal de eventos por via"))
+descartados = metricas.registrar(metricas.Contador("ventrix_eventos_descartados_total", "Eventos descartados porque la pantalla no los consumia a tiempo"))
+
+
+class Suscripcion:
+    """Cola acotada de un cliente. Si se llena se descarta el evento mas viejo."""
+
+    def __init__(self, canal):
+        self.canal = canal
+        self.cola = asyncio.Queue(maxsize=EVENTOS_COLA)
+
+    def entregar(self, mensaje):
+        if self.cola.full():
+            self.cola.get_nowait()
+            descartados.incrementar()
+        self.cola.put_nowait(mensaje)
+
+    async def siguiente(self, espera=EVENTOS_LATIDO):
+        """Proximo mensaje, o None si pasan `espera` segundos sin eventos."""
+        try:
+            return await asyncio.wait_for(self.cola.get(), espera)
+        except asyncio.TimeoutError:
+            return None
+
+
+class Difusor:
+    """Reparte los mensajes de un canal (una sucursal) entre las suscripciones del proceso."""
+
+    def __init__(self):
+        self._canales = {}
+        # Funciones (canal, evento) del propio worker que reciben todo lo que se difunde, ya decodificado
+        self.oyentes = []
+
+    def suscribir(self, canal):
+        suscripcion = Suscripcion(canal)
+        self._canales.setdefault(canal, set()).add(suscripcion)
+        return suscripcion
+
+    def cancelar(self, suscripcion):
+        canal = self._canales.get(suscripcion.canal)
+        if canal is not None:
+            canal.discard(suscripcion)
+            if not canal:
+                del self._canales[suscripcion.canal]
+
+    def difundir(self, canal, mensaje):
+        if self.oyentes:
+            self._avisar(canal, mensaje)
+        for suscripcion in self._canales.get(canal, ()):
+            suscripcion.entregar(mensaje)
+
+    def _avisar(self, canal, mensaje):
+        # Se decodifica una sola vez para todos los oyentes
+        try:
+            evento = json.loads(mensaje)
+        except ValueError:
+            logger.exception("Evento invalido en la sucursal %s", canal)
+            return
+        for oyente in self.oyentes:
+            try:
+                oyente(canal, evento)
+            except Exception:
+                logger.exception("Fallo un oyente de eventos")
+
+
+class TransporteLocal:
+    """Un solo worker: los eventos se reparten directamente en el proceso."""
+
+    def __init__(self, difusor):
+        self.difusor = difusor
+
+    async def publicar(self, canal, mensaje):
+        self.difusor.difundir(canal, mensaje)
+
+    async def escuchar(self):
+        pass
+
+
+class TransporteRedis:
+    """Varios workers: cada uno publica en Redis y reparte lo que recibe de ahi."""
+
+    def __init__(self, difusor, url, prefijo="ventrix:eventos:"):
+        # Dependencia opcional: solo se necesita con varios workers
+        import redis.asyncio
+        self.difusor = difusor
+        self.cliente = redis.asyncio.Redis.from_url(url)
+        self.prefijo = prefijo
+
+    async def publicar(self, canal, mensaje):
+        await self.cliente.publish(self.prefijo + canal, mensaje)
+
+    async def escuchar(self):
+        pubsub = self.cliente.pubsub()
+        await pubsub.psubscribe(self.prefijo + "*")
+        try:
+            async for recibido in pubsub.listen():
+                if recibido["type"] != "pmessage":
+                    continue
+                canal = recibido["channel"].decode()[len(self.prefijo):]
+                self.difusor.difundir(canal, recibido["data"].decode())
+        finally:
+            await pubsub.close()
+
+
+difusor = Difusor()
+transporte = TransporteRedis(difusor, EVENTOS_REDIS_URL) if EVENTOS_REDIS_URL else TransporteLocal(difusor)
+_bucle = None
+_secuencia = itertools.count(1)
+
+
+async def escuchar():
+    """Tarea de fondo del worker: fija el bucle de eventos y atiende el transporte."""
+    global _bucle
+    _bucle = asyncio.get_running_loop()
+    try:
+        await transporte.escuchar()
+        # El transporte local no tiene nada que atender: la tarea sigue hasta que se cancele al cerrar
+        await asyncio.Future()
+    finally:
+        # Con el bucle cerrado no queda a quien publicar
+        _bucle = None
+
+
+#//////////////////////////////////PUBLICACION AL CONFIRMAR///////////////////////////////
+
+
+def encolar(db, sucursal, tipo, datos):
+    """Deja un evento pendiente en la sesion; solo se publica si la transaccion se confirma."""
+    db.info.setdefault("eventos", []).append((sucursal, tipo, datos))
+
+async def _publicar(pendientes):
+    for sucursal, tipo, datos in pendientes:
+        mensaje = json.dumps({"id": next(_secuencia), "tipo": tipo, "datos": datos}, default=str)
+        try:
+            await transporte.publicar(sucursal, mensaje)
+        except Exception:
+            logger.exception("No se pudo publicar el evento %s de la sucursal %s", tipo, sucursal)
+
+@event.listens_for(Session, "after_commit")
+def _al_confirmar(sesion):
+    pendientes = sesion.info.pop("eventos", None)
+    if pendientes and _bucle is not None:
+        # Vale tanto desde el bucle (sesiones async) como desde el threadpool (sesiones sync)
+        asyncio.run_coroutine_threadsafe(_publicar(pendientes), _bucle)
+
+@event.listens_for(Session, "after_rollback")
+def _al_deshacer(sesion):
+    sesion.info.pop("eventos", None)
+
+
+#//////////////////////////////////SUSCRIPCION///////////////////////////////
+
+
+async def puede_ver(db, sesion, sucursal):
+    """La pantalla ve su propia sucursal; el administrador, las de su restaurante."""
+    if sesion.get("sucursal") == sucursal:
+        return True
+    if sesion.get("rol") == RolUsuario.ADMINISTRADOR.value and sesion.get("restaurante"):
+        restaurante = await db.scalar(select(Sucursal.id_restaurante).where(Sucursal.id == sucursal))
+        return restaurante == sesion["restaurante"]
+    return False
+
+def sucursales_visibles(sesion):
+    """SELECT de los ids de sucursal que la sesion puede ver (la misma regla de puede_ver), o None si ninguna."""
+    condiciones = []
+    if sesion.get("sucursal"):
+        condiciones.append(Sucursal.id == sesion["sucursal"])
+    if sesion.get("rol") == RolUsuario.ADMINISTRADOR.value and sesion.get("restaurante"):
+        condiciones.append(Sucursal.id_restaurante == sesion["restaurante"])
+    if not condiciones:
+        return None
+    return select(Sucursal.id).where(or_(*condiciones))
+
+def suscribir(sucursal, via):
+    suscriptores.incrementar((("via", via),))
+    return difusor.suscribir(sucursal)
+
+def cancelar(suscripcion, via):
+    difusor.cancelar(suscripcion)
+    suscriptores.incrementar((("via", via),), -1)
+
+async def flujo_sse(sucursal):
+    """Generador de Server-Sent Events; un comentario cada EVENTOS_LATIDO mantiene viva la conexion."""
+    suscripcion = suscribir(sucursal, "sse")
+    try:
+        yield "retry: 3000\n\n"
+        while True:
+            mensaje = await suscripcion.siguiente()
+            if mensaje is None:
+                yield ": latido\n\n"
+                continue
+            yield f"data: {mensaje}\n\n"
+    finally:
+        cancelar(suscripcion, "sse")
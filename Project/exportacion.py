@@ -0,0 +1,104 @@
+import csv
+import io
+import json
+from fastapi import HTTPException
+from configuracion import EXPORTACION_LOTE
+from conexion import AsyncSessionLocal
+
+# pyarrow es opcional: sin el solo se exporta CSV y NDJSON
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+TIPOS = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+
+def validar_formato(formato):
+    if formato not in TIPOS:
+        raise HTTPException(status_code=400, detail=f"Formato no soportado: use {', '.join(TIPOS)}")
+    if formato == "parquet" and pyarrow is None:
+        raise HTTPException(status_code=501, detail="La exportación a Parquet no está disponible en este servidor")
+    return TIPOS[formato]
+
+
+async def _lotes(consulta):
+    # Cursor del lado del servidor: solo EXPORTACION_LOTE filas en memoria a la vez.
+    # La sesion es propia porque la de la solicitud se cierra antes de que termine el flujo.
+    async with AsyncSessionLocal() as db:
+        resultado = await db.stream(consulta.execution_options(yield_per=EXPORTACION_LOTE))
+        async for lote in resultado.partitions():
+            yield lote
+
+
+async def _csv(consulta, columnas):
+    salida = io.StringIO()
+    escritor = csv.writer(salida)
+    escritor.writerow(columnas)
+    async for lote in _lotes(consulta):
+        escritor.writerows(lote)
+        yield salida.getvalue().encode("utf-8")
+        salida.seek(0)
+        salida.truncate()
+    if salida.tell():
+        yield salida.getvalue().encode("utf-8")
+
+
+async def _ndjson(consulta, columnas):
+    async for lote in _lotes(consulta):
+        yield "".join(json.dumps(dict(zip(columnas, fila)), default=str) + "\n" for fila in lote).encode("utf-8")
+
+
+class _Colector(io.RawIOBase):
+    """Destino de ParquetWriter que acumula lo escrito hasta que el flujo lo recoge."""
+
+    def __init__(self):
+        self._partes = []
+        self._posicion = 0
+
+    def writable(self):
+        return True
+
+    def write(self, datos):
+        self._partes.append(bytes(datos))
+        self._posicion += len(datos)
+        return len(datos)
+
+    def tell(self):
+        return self._posicion
+
+    def recoger(self):
+        datos, self._partes = b"".join(self._partes), []
+        return datos
+
+
+async def _parquet(consulta, columnas, esquema):
+    colector = _Colector()
+    escritor = pyarrow.parquet.ParquetWriter(colector, esquema)
+    try:
+        async for lote in _lotes(consulta):
+            valores = list(zip(*lote))
+            escritor.write_table(pyarrow.Table.from_arrays([pyarrow.array(valores[i], type=esquema.field(i).type) for i in range(len(columnas))], schema=esquema))
+            yield colector.recoger()
+    finally:
+        escritor.close()
+    yield colector.recoger()
+
+
+def exportar(consulta, columnas, formato, esquema_parquet=None):
+    """Generador de bytes con el resultado de `consulta` en el formato pedido.
+
+    `columnas` son los nombres de las columnas del SELECT en orden;
+    `esquema_parquet` es una funcion que devuelve el pyarrow.schema (solo
+    se llama si se pide Parquet).
+    """
+    if formato == "csv":
+        return _csv(consulta, columnas)
+    if formato == "ndjson":
+        return _ndjson(consulta, columnas)
+    return _parquet(consulta, columnas, esquema_parquet())
@@ -0,0 +1,177 @@
+import asyncio
+import base64
+import hashlib
+import json
+import logging
+import time
+from configuracion import IDEMPOTENCIA_TTL, IDEMPOTENCIA_MAX_ENTRADAS, IDEMPOTENCIA_REDIS_URL, IDEMPOTENCIA_ESPERA
+import cache
+import metricas
+
+METODOS = {"POST", "PUT", "PATCH", "DELETE"}
+# Rutas de escritura de pedidos y pagos que aceptan Idempotency-Key
+PREFIJOS = ("/pedidos", "/detalles-pedido", "/registrar_tipo_pago", "/tipo_pago", "/pagos")
+
+
+def _aplica(ruta):
+    # Por segmentos: /pedidos y /pedidos/5 si, /pedidosX o /pagos-historial no
+    return any(ruta == prefijo or ruta.startswith(prefijo + "/") for prefijo in PREFIJOS)
+
+respuestas_idempotentes = metricas.registrar(metricas.Contador("ventrix_idempotencia_total", "Solicitudes con Idempotency-Key por resultado"))
+
+
+def crear_almacen():
+    if IDEMPOTENCIA_REDIS_URL:
+        return cache.BackendRedis(cache.crear_cliente_redis(IDEMPOTENCIA_REDIS_URL), ttl=IDEMPOTENCIA_TTL, prefijo="ventrix:idempotencia:")
+    return cache.BackendLocal(max_entradas=IDEMPOTENCIA_MAX_ENTRADAS, ttl=IDEMPOTENCIA_TTL)
+
+logger = logging.getLogger("ventrix.idempotencia")
+
+almacen = crear_almacen()
+# Claves que este worker esta procesando: los reintentos esperan a la original
+_en_curso = {}
+
+
+async def _reservar_compartida(clave):
+    """Con un almacen compartido, solo un worker puede procesar la clave a la vez."""
+    if not isinstance(almacen, cache.BackendRedis):
+        return True
+    return bool(await almacen.cliente.set(almacen.prefijo + "reserva:" + clave, "1", ex=max(int(IDEMPOTENCIA_ESPERA), 1), nx=True))
+
+async def _soltar_compartida(clave):
+    if not isinstance(almacen, cache.BackendRedis):
+        return
+    try:
+        await almacen.cliente.delete(almacen.prefijo + "reserva:" + clave)
+    except Exception:
+        # La reserva vence sola a los IDEMPOTENCIA_ESPERA segundos
+        logger.warning("No se pudo soltar la reserva de %s", clave, exc_info=True)
+
+async def _guardar(clave, guardada):
+    # La respuesta ya se envio: si no se puede guardar, un reintento volvera a ejecutar la ruta
+    try:
+        await almacen.guardar(clave, guardada)
+    except Exception:
+        logger.warning("No se pudo guardar la respuesta de %s", clave, exc_info=True)
+
+
+async def _responder(send, estado, cabeceras, cuerpo):
+    await send({"type": "http.response.start", "status": estado, "headers": cabeceras})
+    await send({"type": "http.response.body", "body": cuerpo})
+
+async def _error(send, estado, detalle):
+    await _responder(send, estado, [(b"content-type", b"application/json")], json.dumps({"detail": detalle}).encode("utf-8"))
+
+async def _repetir(send, guardada, huella):
+    if guardada["huella"] != huella:
+        respuestas_idempotentes.incrementar((("resultado", "conflicto"),))
+        await _error(send, 422, "La Idempotency-Key ya se usó con otra solicitud")
+        return
+    respuestas_idempotentes.incrementar((("resultado", "repetida"),))
+    cabeceras = [(nombre.encode("latin-1"), valor.encode("latin-1")) for nombre, valor in guardada["cabeceras"]]
+    cabeceras.append((b"idempotent-replayed", b"true"))
+    await _responder(send, guardada["estado"], cabeceras, base64.b64decode(guardada["cuerpo"]))
+
+
+class MiddlewareIdempotencia:
+    """Responde los reintentos con la misma Idempotency-Key desde el almacen, sin volver a ejecutar la ruta.
+
+    Se guarda toda respuesta menor a 500 junto con una huella de la solicitud
+    (metodo, ruta y cuerpo); la misma clave con otra solicitud recibe 422.
+    Si la original sigue en curso, el reintento la espera. Si el almacen no
+    responde, la solicitud pasa a la ruta sin idempotencia en vez de fallar.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in METODOS or not _aplica(scope["path"]):
+            await self.app(scope, receive, send)
+            return
+        cabeceras = dict(scope["headers"])
+        llave = cabeceras.get(b"idempotency-key")
+        if not llave:
+            await self.app(scope, receive, send)
+            return
+        if len(llave) > 255:
+            await _error(send, 400, "La Idempotency-Key no puede superar 255 caracteres")
+            return
+
+        # El cuerpo se lee completo para la huella y luego se le entrega igual a la ruta
+        partes = []
+        while True:
+            mensaje = await receive()
+            partes.append(mensaje.get("body", b""))
+            if not mensaje.get("more_body"):
+                break
+        cuerpo = b"".join(partes)
+        huella = hashlib.sha256(scope["method"].encode() + b" " + scope["path"].encode() + b"\n" + cuerpo).hexdigest()
+        # Las claves son por cliente: el mismo valor enviado con otro token es otra clave
+        cliente = hashlib.sha256(cabeceras.get(b"authorization", b"")).hexdigest()[:16]
+        clave = f"{cliente}:{llave.decode('latin-1')}"
+
+        entregado = False
+
+        async def recibir():
+            nonlocal entregado
+            if not entregado:
+                entregado = True
+                return {"type": "http.request", "body": cuerpo, "more_body": False}
+            return await receive()
+
+        limite = time.monotonic() + IDEMPOTENCIA_ESPERA
+        guardada = reservada = None
+        try:
+            while True:
+                encontrado, guardada = await almacen.obtener(clave)
+                if encontrado:
+                    break
+                guardada = None
+                pendiente = _en_curso.get(clave)
+                if pendiente is not None:
+                    await asyncio.shield(pendiente)
+                    continue
+                reservada = await _reservar_compartida(clave)
+                # Si otro worker la esta procesando, se espera a que guarde su respuesta
+                if reservada or time.monotonic() > limite:
+                    break
+                await asyncio.sleep(0.05)
+        except Exception:
+            logger.warning("No se pudo consultar la Idempotency-Key %s; se atiende sin idempotencia", clave, exc_info=True)
+            respuestas_idempotentes.incrementar((("resultado", "sin_almacen"),))
+            await self.app(scope, recibir, send)
+            return
+        if guardada is not None:
+            await _repetir(send, guardada, huella)
+            return
+        if not reservada:
+            respuestas_idempotentes.incrementar((("resultado", "en_curso"),))
+            await _error(send, 409, "Hay una solicitud en curso con esta Idempotency-Key")
+            return
+
+        pendiente = _en_curso[clave] = asyncio.get_running_loop().create_future()
+        respuesta = {"estado": 500, "cabeceras": [], "cuerpo": []}
+
+        async def enviar(mensaje):
+            if mensaje["type"] == "http.response.start":
+                respuesta["estado"] = mensaje["status"]
+                respuesta["cabeceras"] = [(nombre.decode("latin-1"), valor.decode("latin-1")) for nombre, valor in mensaje.get("headers", [])]
+            elif mensaje["type"] == "http.response.body":
+                respuesta["cuerpo"].append(mensaje.get("body", b""))
+            await send(mensaje)
+
+        try:
+            await self.app(scope, recibir, enviar)
+            if respuesta["estado"] < 500:
+                await _guardar(clave, {
+                    "huella": huella,
+                    "estado": respuesta["estado"],
+                    "cabeceras": respuesta["cabeceras"],
+                    "cuerpo": base64.b64encode(b"".join(respuesta["cuerpo"])).decode("ascii"),
+                })
+            respuestas_idempotentes.incrementar((("resultado", "nueva"),))
+        finally:
+            del _en_curso[clave]
+            await _soltar_compartida(clave)
+            pendiente.set_result(None)
@@ -0,0 +1,159 @@
+import argparse
+import hashlib
+import logging
+import os
+import time
+from sqlalchemy import select, func
+from configuracion import ANCHOS_VARIANTES, FORMATOS_VARIANTES, CALIDAD_VARIANTES, GRACIA_HUERFANOS
+from almacenamiento import NOMBRE_POR_CONTENIDO
+from conexion import SessionLocal
+from modelo import Restaurante, Producto
+
+# Pillow es opcional: sin el, las imagenes se sirven solo en su tamano original
+try:
+    from PIL import Image, ImageOps, features
+except ImportError:
+    Image = None
+
+logger = logging.getLogger("ventrix.imagenes")
+
+DIRECTORIO_RESTAURANTES = os.path.join("imagenes", "restaurantes")
+DIRECTORIO_VARIANTES = os.path.join(DIRECTORIO_RESTAURANTES, "variantes")
+URL_VARIANTES = "/imagenes/restaurantes/variantes"
+
+
+def hash_archivo(ruta, tamano_bloque=64 * 1024):
+    resumen = hashlib.sha256()
+    with open(ruta, "rb") as archivo:
+        for bloque in iter(lambda: archivo.read(tamano_bloque), b""):
+            resumen.update(bloque)
+    return resumen.hexdigest()
+
+def formatos_disponibles():
+    disponibles = []
+    for formato in FORMATOS_VARIANTES:
+        try:
+            if features.check(formato):
+                disponibles.append(formato)
+        except ValueError:
+            # Versiones de Pillow que no conocen el formato (p. ej. avif antes de 11.2)
+            pass
+    return disponibles
+
+
+def generar_variantes(ruta_original):
+    """Genera miniaturas en los formatos configurados y devuelve {variante: url}.
+
+    Los nombres llevan el hash del original, por lo que se pueden servir con
+    cache inmutable y volver a generarlas no duplica archivos.
+    """
+    resumen = hash_archivo(ruta_original)
+    os.makedirs(DIRECTORIO_VARIANTES, exist_ok=True)
+    variantes = {}
+    with Image.open(ruta_original) as original:
+        imagen = ImageOps.exif_transpose(original)
+        if imagen.mode not in ("RGB", "RGBA"):
+            imagen = imagen.convert("RGBA")
+        for ancho in ANCHOS_VARIANTES:
+            miniatura = imagen.copy()
+            miniatura.thumbnail((ancho, ancho))
+            for formato in formatos_disponibles():
+                nombre = f"{resumen}-{ancho}.{formato}"
+                ruta = os.path.join(DIRECTORIO_VARIANTES, nombre)
+                if not os.path.exists(ruta):
+                    temporal = ruta + ".parcial"
+                    miniatura.save(temporal, format=formato.upper(), quality=CALIDAD_VARIANTES)
+                    os.replace(temporal, ruta)
+                variantes[f"{formato}_{ancho}"] = f"{URL_VARIANTES}/{nombre}"
+    return variantes
+
+
+def procesar_restaurante(id_restaurante):
+    """Tarea en segundo plano: genera y guarda las variantes de un restaurante."""
+    if Image is None:
+        logger.warning("Pillow no esta instalado; no se generan variantes de imagen")
+        return
+    with SessionLocal() as db:
+        restaurante = db.get(Restaurante, id_restaurante)
+        if not restaurante or not restaurante.imagen:
+            return
+        imagen = restaurante.imagen
+        ruta = imagen.lstrip("/")
+        try:
+            variantes = generar_variantes(ruta)
+        except (OSError, ValueError):
+            logger.exception("No se pudieron generar las variantes de %s", ruta)
+            return
+        # Si la imagen cambio mientras se procesaba, la tarea de la nueva imagen guardara las suyas
+        db.refresh(restaurante)
+        if restaurante.imagen == imagen:
+            restaurante.variantes = variantes
+            db.commit()
+
+
+def _en_gracia(ruta):
+    return time.time() - os.path.getmtime(ruta) < GRACIA_HUERFANOS
+
+def _eliminar_con_variantes(ruta):
+    resumen = hash_archivo(ruta)
+    if os.path.isdir(DIRECTORIO_VARIANTES):
+        for nombre in os.listdir(DIRECTORIO_VARIANTES):
+            if nombre.startswith(resumen + "-"):
+                os.remove(os.path.join(DIRECTORIO_VARIANTES, nombre))
+    os.remove(ruta)
+
+
+def liberar_imagen(url):
+    """Tarea en segundo plano: borra la imagen (y sus variantes) si ningun restaurante ni producto la usa."""
+    ruta = url.lstrip("/")
+    if not os.path.exists(ruta) or _en_gracia(ruta):
+        return
+    with SessionLocal() as db:
+        referencias = db.scalar(select(func.count()).select_from(Restaurante).where(Restaurante.imagen == url))
+        referencias += db.scalar(select(func.count()).select_from(Producto).where(Producto.imagen == url))
+    if referencias == 0:
+        _eliminar_con_variantes(ruta)
+
+
+def recolectar_huerfanos():
+    """Borra los archivos por contenido y las variantes que ya no referencia ningun restaurante."""
+    with SessionLocal() as db:
+        filas = db.execute(select(Restaurante.imagen, Restaurante.variantes)).all()
+    usados = {os.path.basename(imagen) for imagen, _ in filas if imagen}
+    usados.update(os.path.basename(url) for _, variantes in filas for url in (variantes or {}).values())
+    eliminados = 0
+    for directorio in (DIRECTORIO_RESTAURANTES, DIRECTORIO_VARIANTES):
+        if not os.path.isdir(directorio):
+            continue
+        for nombre in os.listdir(directorio):
+            ruta = os.path.join(directorio, nombre)
+            # Las imagenes antiguas con nombre libre no se tocan
+            if nombre in usados or not NOMBRE_POR_CONTENIDO.match(nombre) or _en_gracia(ruta):
+                continue
+            os.remove(ruta)
+            eliminados += 1
+    return eliminados
+
+
+def rellenar(rehacer=False):
+    """Genera variantes para los restaurantes existentes."""
+    with SessionLocal() as db:
+        consulta = select(Restaurante.id).where(Restaurante.imagen.isnot(None))
+        if not rehacer:
+            consulta = consulta.where(Restaurante.variantes.is_(None))
+        ids = db.scalars(consulta).all()
+    for id_restaurante in ids:
+        procesar_restaurante(id_restaurante)
+    return len(ids)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Genera las variantes de las imagenes de restaurantes existentes")
+    parser.add_argument("--rehacer", action="store_true", help="regenerar tambien los restaurantes que ya tienen variantes")
+    parser.add_argument("--recolectar", action="store_true", help="solo borrar imagenes y variantes huerfanas")
+    argumentos = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    if argumentos.recolectar:
+        print(f"Archivos huerfanos eliminados: {recolectar_huerfanos()}")
+    else:
+        print(f"Restaurantes procesados: {rellenar(argumentos.rehacer)}")
@@ -0,0 +1,147 @@
+import csv
+import json
+from fastapi import HTTPException
+from pydantic import ValidationError
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+
+TAMANO_LOTE = 1000
+
+TIPOS_CSV = ("text/csv", "application/csv")
+TIPOS_NDJSON = ("application/x-ndjson", "application/ndjson", "application/jsonl")
+
+
+async def _lineas(flujo):
+    pendiente = b""
+    async for bloque in flujo:
+        pendiente += bloque
+        *lineas, pendiente = pendiente.split(b"\n")
+        for linea in lineas:
+            yield linea.decode("utf-8-sig").rstrip("\r")
+    if pendiente.strip():
+        yield pendiente.decode("utf-8-sig").rstrip("\r")
+
+
+async def leer_filas(request):
+    """Produce (numero_de_fila, dict | mensaje_de_error) segun el Content-Type.
+
+    JSON espera un arreglo; CSV (con cabecera, un registro por linea) y NDJSON
+    se leen del cuerpo a medida que llega.
+    """
+    tipo = request.headers.get("content-type", "application/json").split(";")[0].strip().lower()
+    if tipo in TIPOS_CSV:
+        columnas = None
+        numero = 0
+        async for linea in _lineas(request.stream()):
+            if not linea.strip():
+                continue
+            valores = next(csv.reader([linea]))
+            if columnas is None:
+                columnas = [columna.strip() for columna in valores]
+                continue
+            numero += 1
+            if len(valores) != len(columnas):
+                yield numero, f"Se esperaban {len(columnas)} columnas y llegaron {len(valores)}"
+                continue
+            yield numero, {columna: (valor if valor != "" else None) for columna, valor in zip(columnas, valores)}
+    elif tipo in TIPOS_NDJSON:
+        numero = 0
+        async for linea in _lineas(request.stream()):
+            if not linea.strip():
+                continue
+            numero += 1
+            try:
+                yield numero, json.loads(linea)
+            except json.JSONDecodeError:
+                yield numero, "La línea no es un JSON válido"
+    elif tipo == "application/json":
+        try:
+            datos = json.loads(await request.body())
+        except json.JSONDecodeError:
+            raise HTTPException(status_code=400, detail="El cuerpo no es un JSON válido")
+        if not isinstance(datos, list):
+            raise HTTPException(status_code=400, detail="Se esperaba un arreglo JSON de registros")
+        for numero, fila in enumerate(datos, start=1):
+            yield numero, fila
+    else:
+        raise HTTPException(status_code=415, detail="Formato no soportado: use application/json, text/csv o application/x-ndjson")
+
+
+def _detalle_validacion(error):
+    return [{"campo": ".".join(str(parte) for parte in detalle["loc"]), "mensaje": detalle["msg"]} for detalle in error.errors()]
+
+
+async def _existentes(db, columna, valores):
+    if not valores:
+        return set()
+    return set((await db.execute(select(columna).where(columna.in_(valores)))).scalars().all())
+
+
+async def _insertar_lote(db, modelo, unicos, referencias, lote, errores, preparar_lote):
+    """Descarta las filas que chocarian con la base y inserta el resto en un solo INSERT.
+
+    Cada fila rechazada aparece una sola vez en `errores`, con todos sus campos en conflicto.
+    """
+    rechazadas = {}
+    for columna in unicos:
+        repetidos = await _existentes(db, columna, [valores[columna.key] for _, valores in lote])
+        for numero, valores in lote:
+            if valores[columna.key] in repetidos:
+                rechazadas.setdefault(numero, []).append({"campo": columna.key, "mensaje": "Ya existe un registro con este valor"})
+    for campo, columna in referencias.items():
+        encontrados = await _existentes(db, columna, list({valores[campo] for _, valores in lote if valores.get(campo)}))
+        for numero, valores in lote:
+            if valores.get(campo) and valores[campo] not in encontrados:
+                rechazadas.setdefault(numero, []).append({"campo": campo, "mensaje": "El registro referenciado no existe"})
+    errores.extend({"fila": numero, "errores": errores_fila} for numero, errores_fila in rechazadas.items())
+    filas = [valores for numero, valores in lote if numero not in rechazadas]
+    if filas and preparar_lote:
+        filas = await preparar_lote(filas)
+    if filas:
+        await db.execute(insert(modelo).values(filas))
+    return len(filas)
+
+
+async def importar(db, filas, esquema, convertir, modelo, unicos, referencias=None, preparar_lote=None, tamano_lote=TAMANO_LOTE):
+    """Valida cada fila con `esquema` e inserta las validas por lotes en una sola transaccion.
+
+    `convertir` pasa del esquema validado a los valores de la tabla, `unicos`
+    son las columnas que no se pueden repetir y `referencias` mapea campos a
+    la columna que deben existir. `preparar_lote` (corutina opcional) recibe
+    las filas aceptadas de cada lote justo antes del INSERT. Devuelve el total
+    insertado y los errores por numero de fila.
+    """
+    referencias = referencias or {}
+    errores, lote, insertados = [], [], 0
+    vistos = {columna.key: set() for columna in unicos}
+    try:
+        async for numero, fila in filas:
+            if isinstance(fila, str):
+                errores.append({"fila": numero, "errores": [{"campo": None, "mensaje": fila}]})
+                continue
+            if not isinstance(fila, dict):
+                errores.append({"fila": numero, "errores": [{"campo": None, "mensaje": "Se esperaba un objeto"}]})
+                continue
+            try:
+                valores = convertir(esquema(**fila))
+            except ValidationError as error:
+                errores.append({"fila": numero, "errores": _detalle_validacion(error)})
+                continue
+            repetidas = [columna.key for columna in unicos if valores[columna.key] in vistos[columna.key]]
+            if repetidas:
+                errores.append({"fila": numero, "errores": [{"campo": campo, "mensaje": "Valor repetido en el archivo"} for campo in repetidas]})
+                continue
+            for columna in unicos:
+                vistos[columna.key].add(valores[columna.key])
+            lote.append((numero, valores))
+            if len(lote) >= tamano_lote:
+                insertados += await _insertar_lote(db, modelo, unicos, referencias, lote, errores, preparar_lote)
+                lote = []
+        if lote:
+            insertados += await _insertar_lote(db, modelo, unicos, referencias, lote, errores, preparar_lote)
+        await db.commit()
+    except IntegrityError as error:
+        await db.rollback()
+        raise HTTPException(status_code=409, detail=f"La importación se revirtió por un conflicto en la base de datos: {error.orig}")
+    errores.sort(key=lambda error: error["fila"])
+    return {"insertados": insertados, "errores": errores}
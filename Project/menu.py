@@ -0,0 +1,196 @@
+import asyncio
+import json
+import time
+from fastapi import HTTPException, Response
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import select
+from configuracion import MENU_TTL
+from conexion import AsyncSessionLocal
+from modelo import Producto, Categoria, Sucursal
+from sesion import calcular_etag
+import metricas
+import busqueda
+
+consultas_menu = metricas.registrar(metricas.Contador("ventrix_menu_consultas_total", "Lecturas del menu por resultado (memoria, construido, 304)"))
+
+COLUMNAS = ("id_producto", "nombre", "precio", "imagen", "disponibilidad", "id_sucursal", "id_categoria")
+
+
+class Menu:
+    """Productos de una sucursal agrupados por categoria, con version y ETag por vista.
+
+    Las vistas (menu completo, todos, disponibles, una categoria) se
+    serializan una vez por version y se guardan ya listas para responder.
+    La version es un hash del contenido: no vuelve a empezar al reconstruir
+    el menu y es la misma en todos los workers.
+    """
+
+    def __init__(self, sucursal, productos, categorias):
+        self.sucursal = sucursal
+        self.productos = productos
+        self.categorias = categorias
+        self.creado = time.monotonic()
+        self._vistas = {}
+        self.indice = busqueda.Indice()
+        for producto in productos.values():
+            self.indice.agregar(producto["id_producto"], producto["nombre"])
+        self._renovar()
+
+    def _renovar(self):
+        contenido = {
+            "productos": [self.productos[id_producto] for id_producto in sorted(self.productos)],
+            "categorias": sorted(self.categorias.items()),
+        }
+        self.version = calcular_etag(contenido).strip('"')[:16]
+        self._vistas.clear()
+
+    def vencido(self):
+        return time.monotonic() - self.creado > MENU_TTL
+
+    def marcar_disponibilidad(self, id_producto, disponibilidad):
+        producto = self.productos.get(id_producto)
+        if producto is None:
+            return False
+        if producto["disponibilidad"] != disponibilidad:
+            producto["disponibilidad"] = disponibilidad
+            self._renovar()
+        return True
+
+    def guardar_producto(self, producto, nombre_categoria):
+        self.productos[producto["id_producto"]] = producto
+        self.categorias[producto["id_categoria"]] = nombre_categoria
+        self.indice.agregar(producto["id_producto"], producto["nombre"])
+        self._renovar()
+
+    def quitar_producto(self, id_producto):
+        if self.productos.pop(id_producto, None) is not None:
+            self.indice.quitar(id_producto)
+            self._renovar()
+
+    def buscar(self, consulta, limite=10, solo_disponibles=False):
+        filtro = (lambda id_producto: self.productos[id_producto]["disponibilidad"]) if solo_disponibles else None
+        return [self.productos[id_producto] for id_producto in self.indice.buscar(consulta, limite, filtro)]
+
+    def _ordenados(self, filtro):
+        return sorted((producto for producto in self.productos.values() if filtro(producto)), key=lambda producto: (producto["nombre"], producto["id_producto"]))
+
+    def _datos(self, vista):
+        if vista == "menu":
+            categorias = []
+            for id_categoria, nombre in sorted(self.categorias.items(), key=lambda categoria: categoria[1]):
+                productos = self._ordenados(lambda producto: producto["id_categoria"] == id_categoria)
+                if productos:
+                    categorias.append({"id_categoria": id_categoria, "nombre": nombre, "productos": productos})
+            return {"id_sucursal": self.sucursal, "version": self.version, "categorias": categorias}
+        if vista == "todos":
+            return self._ordenados(lambda producto: True)
+        if vista == "disponibles":
+            return self._ordenados(lambda producto: producto["disponibilidad"])
+        # "categoria:<id>": disponibles de una categoria
+        id_categoria = int(vista.split(":", 1)[1])
+        return self._ordenados(lambda producto: producto["disponibilidad"] and producto["id_categoria"] == id_categoria)
+
+    def vista(self, vista):
+        """(etag, cuerpo JSON en bytes) de la vista pedida."""
+        if vista in self._vistas:
+            return self._vistas[vista]
+        datos = jsonable_encoder(self._datos(vista))
+        respuesta = (calcular_etag(datos), json.dumps(datos, separators=(",", ":")).encode("utf-8"))
+        # Solo se guardan las categorias que tiene la sucursal; cualquier otro id de la URL se responde sin guardarlo
+        if not vista.startswith("categoria:") or int(vista.split(":", 1)[1]) in self.categorias:
+            self._vistas[vista] = respuesta
+        return respuesta
+
+
+_menus = {}
+# Se incrementa con cada invalidacion; un menu construido con una generacion vieja no se guarda
+_generaciones = {}
+_construyendo = {}
+
+
+async def _construir(sucursal):
+    # Sesion propia: las lecturas que salen de memoria no piden conexion al pool
+    async with AsyncSessionLocal() as db:
+        filas = (await db.execute(
+            select(*(getattr(Producto, columna) for columna in COLUMNAS), Categoria.nombre.label("categoria"))
+            .join(Categoria, Categoria.id == Producto.id_categoria)
+            .where(Producto.id_sucursal == sucursal)
+        )).all()
+        # Una sucursal que no existe no se guarda en memoria: cualquier id de la URL ocuparia una entrada
+        if not filas and await db.scalar(select(Sucursal.id).where(Sucursal.id == sucursal)) is None:
+            raise HTTPException(status_code=404, detail="Sucursal no encontrada")
+    productos = {fila.id_producto: {columna: getattr(fila, columna) for columna in COLUMNAS} for fila in filas}
+    categorias = {fila.id_categoria: fila.categoria for fila in filas}
+    return Menu(sucursal, productos, categorias)
+
+
+async def obtener(sucursal):
+    """Menu en memoria de la sucursal; si no esta (o vencio) se construye una sola vez."""
+    menu = _menus.get(sucursal)
+    if menu is not None and not menu.vencido():
+        consultas_menu.incrementar((("resultado", "memoria"),))
+        return menu
+
+    # Si otra solicitud ya lo esta construyendo, se espera a esa en vez de repetir la consulta
+    pendiente = _construyendo.get(sucursal)
+    if pendiente is not None:
+        return await asyncio.shield(pendiente)
+
+    generacion = _generaciones.get(sucursal, 0)
+    pendiente = asyncio.get_running_loop().create_future()
+    _construyendo[sucursal] = pendiente
+    try:
+        menu = await _construir(sucursal)
+    except Exception as error:
+        pendiente.set_exception(error)
+        # Nadie mas espera si no hubo otras solicitudes; se marca como recuperada
+        pendiente.exception()
+        raise
+    except BaseException:
+        pendiente.cancel()
+        raise
+    finally:
+        del _construyendo[sucursal]
+    if _generaciones.get(sucursal, 0) == generacion:
+        _menus[sucursal] = menu
+    pendiente.set_result(menu)
+    consultas_menu.incrementar((("resultado", "construido"),))
+    return menu
+
+
+def responder(request, menu, vista):
+    """Respuesta de la vista con ETag; 304 si el cliente ya tiene esta version."""
+    etag, cuerpo = menu.vista(vista)
+    if request.headers.get("if-none-match") == etag:
+        consultas_menu.incrementar((("resultado", "304"),))
+        return Response(status_code=304, headers={"ETag": etag})
+    return Response(cuerpo, media_type="application/json", headers={"ETag": etag, "X-Menu-Version": str(menu.version)})
+
+
+def invalidar(sucursal):
+    """Descarta el menu de la sucursal; el proximo pedido lo reconstruye."""
+    _generaciones[sucursal] = _generaciones.get(sucursal, 0) + 1
+    _menus.pop(sucursal, None)
+
+
+def _corregir(sucursal, cambio):
+    # Una construccion en curso pudo leer el valor anterior: no se debe guardar
+    _generaciones[sucursal] = _generaciones.get(sucursal, 0) + 1
+    menu = _menus.get(sucursal)
+    if menu is None or cambio(menu) is False:
+        _menus.pop(sucursal, None)
+
+
+def guardar_producto(sucursal, producto, nombre_categoria):
+    """Agrega o reemplaza un producto en el menu en memoria (y en su indice de busqueda)."""
+    datos = {columna: getattr(producto, columna) for columna in COLUMNAS}
+    _corregir(sucursal, lambda menu: menu.guardar_producto(datos, nombre_categoria))
+
+
+def quitar_producto(sucursal, id_producto):
+    _corregir(sucursal, lambda menu: menu.quitar_producto(id_producto))
+
+
+def cambiar_disponibilidad(sucursal, id_producto, disponibilidad):
+    """Aplica el cambio de disponibilidad sobre el menu en memoria sin reconstruirlo."""
+    _corregir(sucursal, lambda menu: menu.marcar_disponibilidad(id_producto, disponibilidad))
@@ -0,0 +1,248 @@
+import asyncio
+import time
+from datetime import datetime
+from fastapi import HTTPException
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
+from configuracion import PLANO_TTL
+from conexion import AsyncSessionLocal
+from modelo import Mesa, Pedido, EstadoPedido, Sucursal
+import eventos
+
+COLUMNAS = ("id", "nombre", "estado", "id_sucursal", "id_pedido", "ocupada_desde", "version")
+ABIERTOS = (EstadoPedido.ORDENADO, EstadoPedido.COMANDADO, EstadoPedido.LISTO)
+
+
+def _fila(fila):
+    mesa = {columna: getattr(fila, columna) for columna in COLUMNAS}
+    if isinstance(mesa["ocupada_desde"], datetime):
+        mesa["ocupada_desde"] = mesa["ocupada_desde"].isoformat()
+    return mesa
+
+
+#//////////////////////////////////PLANO EN MEMORIA///////////////////////////////
+# La base es la fuente de verdad: cada operacion se resuelve con un UPDATE
+# condicional y, al confirmarse, el estado nuevo de las mesas se aplica al
+# plano de este worker y se publica como evento para el de los demas.
+# Cada UPDATE incrementa la version de la mesa: un evento que llega tarde
+# (p. ej. el eco de Redis de un cambio ya aplicado) no pisa uno mas nuevo.
+
+
+class Plano:
+    def __init__(self, sucursal, mesas, generacion):
+        self.sucursal = sucursal
+        self.mesas = mesas
+        self.generacion = generacion
+        # Ids eliminados: un evento atrasado no debe volver a agregarlos
+        self.eliminadas = set()
+        self.creado = time.monotonic()
+
+    def vencido(self):
+        return time.monotonic() - self.creado > PLANO_TTL
+
+    def de_tipo(self, tipo):
+        return sorted((mesa for mesa in self.mesas.values() if mesa["estado"] == tipo), key=lambda mesa: mesa["id"])
+
+
+_planos = {}
+_construyendo = {}
+# Cambios aplicados por sucursal: un plano leido antes de un cambio no se guarda
+_generaciones = {}
+
+
+async def _construir(sucursal, generacion):
+    async with AsyncSessionLocal() as db:
+        filas = (await db.execute(select(*(getattr(Mesa, columna) for columna in COLUMNAS)).where(Mesa.id_sucursal == sucursal))).all()
+        # Sin mesas se comprueba la sucursal, para no guardar un plano por cada id inventado
+        if not filas and await db.scalar(select(Sucursal.id).where(Sucursal.id == sucursal)) is None:
+            raise HTTPException(status_code=404, detail="Sucursal no encontrada")
+    return Plano(sucursal, {fila.id: _fila(fila) for fila in filas}, generacion)
+
+
+async def obtener(sucursal):
+    plano = _planos.get(sucursal)
+    if plano is not None and not plano.vencido():
+        return plano
+    pendiente = _construyendo.get(sucursal)
+    if pendiente is None:
+        pendiente = _construyendo[sucursal] = asyncio.ensure_future(_construir(sucursal, _generaciones.get(sucursal, 0)))
+        pendiente.add_done_callback(lambda _: _construyendo.pop(sucursal, None))
+    plano = await asyncio.shield(pendiente)
+    if plano.generacion != _generaciones.get(sucursal, 0):
+        # Hubo un cambio mientras se leia: se responde con lo leido pero no se guarda
+        return _planos.get(sucursal) or plano
+    actual = _planos.get(sucursal)
+    if actual is None or actual.vencido():
+        _planos[sucursal] = plano
+    return _planos[sucursal]
+
+
+def aplicar(sucursal, mesas):
+    """Escribe en el plano (si esta cargado) el estado confirmado de las mesas dadas, salvo que ya tenga uno mas nuevo."""
+    _generaciones[sucursal] = _generaciones.get(sucursal, 0) + 1
+    plano = _planos.get(sucursal)
+    if plano is None:
+        return
+    for mesa in mesas:
+        if mesa["id"] in plano.eliminadas:
+            continue
+        if mesa.get("eliminada"):
+            plano.mesas.pop(mesa["id"], None)
+            plano.eliminadas.add(mesa["id"])
+            continue
+        actual = plano.mesas.get(mesa["id"])
+        if actual is not None and actual["version"] >= mesa["version"]:
+            continue
+        plano.mesas[mesa["id"]] = {columna: mesa[columna] for columna in COLUMNAS}
+
+def _al_evento(canal, evento):
+    if evento["tipo"].startswith("mesa_"):
+        aplicar(canal, evento["datos"]["mesas"])
+
+eventos.difusor.oyentes.append(_al_evento)
+
+
+async def notificar(db, sucursal, tipo, ids):
+    """Deja en la sesion el evento con el estado nuevo de las mesas; se publica al confirmar."""
+    filas = (await db.execute(select(*(getattr(Mesa, columna) for columna in COLUMNAS)).where(Mesa.id.in_(ids)))).all()
+    mesas = [_fila(fila) for fila in filas]
+    eventos.encolar(db, sucursal, tipo, {"mesas": mesas})
+    return mesas
+
+async def _confirmar(db, sucursal, tipo, ids):
+    mesas = await notificar(db, sucursal, tipo, ids)
+    await db.commit()
+    # El evento llega a este worker un instante despues; se aplica ya para que la respuesta y el plano coincidan
+    aplicar(sucursal, mesas)
+    return mesas
+
+
+#//////////////////////////////////OPERACIONES///////////////////////////////
+
+
+async def _mesa_o_error(db, id_mesa):
+    mesa = (await db.execute(select(Mesa.id_sucursal, Mesa.id_pedido).where(Mesa.id == id_mesa))).first()
+    await db.rollback()
+    if mesa is None:
+        raise HTTPException(status_code=404, detail="Mesa no encontrada")
+    return mesa
+
+
+async def ocupar(db, id_mesa, id_pedido, sucursal=None):
+    """UPDATE condicional que ocupa la mesa solo si esta libre. No confirma."""
+    filtros = [Mesa.id == id_mesa, Mesa.id_pedido.is_(None)]
+    if sucursal is not None:
+        filtros.append(Mesa.id_sucursal == sucursal)
+    try:
+        resultado = await db.execute(update(Mesa).where(*filtros).values(id_pedido=id_pedido, ocupada_desde=datetime.now(), version=Mesa.version + 1))
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(status_code=409, detail="El pedido no existe o ya está sentado en otra mesa")
+    if resultado.rowcount == 0:
+        await _mesa_o_error(db, id_mesa)
+        raise HTTPException(status_code=409, detail="La mesa ya está ocupada o es de otra sucursal")
+
+
+async def sentar(db, id_mesa, id_pedido):
+    """Sienta el pedido en la mesa solo si esta libre; dos meseros a la vez no pueden ocuparla."""
+    await ocupar(db, id_mesa, id_pedido)
+    sucursal = await db.scalar(select(Mesa.id_sucursal).where(Mesa.id == id_mesa))
+    resultado = await db.execute(
+        update(Pedido)
+        .where(Pedido.id_pedido == id_pedido, Pedido.sucursal == sucursal, Pedido.estado.in_(ABIERTOS))
+        .values(id_mesa=id_mesa)
+    )
+    if resultado.rowcount == 0:
+        await db.rollback()
+        raise HTTPException(status_code=409, detail="El pedido no existe, es de otra sucursal o ya está pagado")
+    return (await _confirmar(db, sucursal, "mesa_ocupada", [id_mesa]))[0]
+
+
+async def trasladar(db, origen, destino):
+    """Mueve el pedido de `origen` a `destino` (que debe estar libre) en una transaccion."""
+    if origen == destino:
+        raise HTTPException(status_code=400, detail="La mesa de origen y la de destino son la misma")
+    # Las dos filas se bloquean siempre en el mismo orden (por id) para que dos traslados cruzados no se interbloqueen
+    filas = {
+        fila.id: fila for fila in (await db.execute(
+            select(Mesa.id, Mesa.id_sucursal, Mesa.id_pedido, Mesa.ocupada_desde)
+            .where(Mesa.id.in_((origen, destino)))
+            .order_by(Mesa.id)
+            .with_for_update()
+        )).all()
+    }
+    if origen not in filas or destino not in filas:
+        await db.rollback()
+        raise HTTPException(status_code=404, detail="Mesa no encontrada")
+    if filas[origen].id_sucursal != filas[destino].id_sucursal:
+        await db.rollback()
+        raise HTTPException(status_code=400, detail="Las mesas son de sucursales distintas")
+    id_pedido = filas[origen].id_pedido
+    if id_pedido is None:
+        await db.rollback()
+        raise HTTPException(status_code=409, detail="La mesa de origen está libre")
+    if filas[destino].id_pedido is not None:
+        await db.rollback()
+        raise HTTPException(status_code=409, detail="La mesa de destino ya está ocupada")
+
+    # Primero se libera el origen: id_pedido es unico y no puede estar en las dos a la vez
+    await db.execute(update(Mesa).where(Mesa.id == origen).values(id_pedido=None, ocupada_desde=None, version=Mesa.version + 1))
+    await db.execute(update(Mesa).where(Mesa.id == destino).values(id_pedido=id_pedido, ocupada_desde=filas[origen].ocupada_desde, version=Mesa.version + 1))
+    await db.execute(update(Pedido).where(Pedido.id_pedido == id_pedido).values(id_mesa=destino))
+    return await _confirmar(db, filas[origen].id_sucursal, "mesa_trasladada", [origen, destino])
+
+
+async def liberar(db, id_mesa):
+    resultado = await db.execute(
+        update(Mesa)
+        .where(Mesa.id == id_mesa, Mesa.id_pedido.is_not(None))
+        .values(id_pedido=None, ocupada_desde=None, version=Mesa.version + 1)
+    )
+    if resultado.rowcount == 0:
+        await _mesa_o_error(db, id_mesa)
+        raise HTTPException(status_code=409, detail="La mesa ya está libre")
+    sucursal = await db.scalar(select(Mesa.id_sucursal).where(Mesa.id == id_mesa))
+    return (await _confirmar(db, sucursal, "mesa_liberada", [id_mesa]))[0]
+
+
+async def liberar_pedidos(db, ids_pedido):
+    """Libera, sin confirmar, las mesas de los pedidos dados y deja sus eventos en la sesion."""
+    filas = (await db.execute(select(Mesa.id, Mesa.id_sucursal).where(Mesa.id_pedido.in_(ids_pedido)))).all()
+    if not filas:
+        return {}
+    await db.execute(update(Mesa).where(Mesa.id.in_([fila.id for fila in filas])).values(id_pedido=None, ocupada_desde=None, version=Mesa.version + 1))
+    por_sucursal = {}
+    for fila in filas:
+        por_sucursal.setdefault(fila.id_sucursal, []).append(fila.id)
+    for sucursal, ids in por_sucursal.items():
+        await notificar(db, sucursal, "mesa_liberada", ids)
+    return por_sucursal
+
+
+#//////////////////////////////////PISO///////////////////////////////
+
+
+async def piso(db, sucursal):
+    """Todas las mesas de la sucursal con el total y el estado de su pedido abierto.
+
+    Las mesas salen del plano en memoria; los totales, de una sola consulta
+    por el indice (sucursal, estado) de pedido.
+    """
+    plano = await obtener(sucursal)
+    abiertos = {
+        fila.id_pedido: fila for fila in (await db.execute(
+            select(Pedido.id_pedido, Pedido.total_pedido, Pedido.estado, Pedido.nombre)
+            .where(Pedido.sucursal == sucursal, Pedido.estado.in_(ABIERTOS))
+        )).all()
+    }
+    mesas = []
+    for mesa in sorted(plano.mesas.values(), key=lambda mesa: (mesa["estado"], mesa["id"])):
+        pedido = abiertos.get(mesa["id_pedido"])
+        mesas.append({
+            **mesa,
+            "ocupada": mesa["id_pedido"] is not None,
+            "total_pedido": pedido.total_pedido if pedido else None,
+            "estado_pedido": pedido.estado if pedido else None,
+            "nombre_pedido": pedido.nombre if pedido else None,
+        })
+    return {"id_sucursal": sucursal, "mesas": mesas}
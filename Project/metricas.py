@@ -0,0 +1,212 @@
+import threading
+import time
+from bisect import bisect_left
+from sqlalchemy import event
+
+# Limites (en segundos) usados por defecto en los histogramas
+LIMITES_TIEMPO = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+def _etiquetas(valores):
+    if not valores:
+        return ""
+    return "{" + ",".join(f'{clave}="{valor}"' for clave, valor in valores) + "}"
+
+
+class Contador:
+    tipo = "counter"
+
+    def __init__(self, nombre, ayuda):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self._valores = {}
+        self._lock = threading.Lock()
+
+    def incrementar(self, etiquetas=(), cantidad=1):
+        with self._lock:
+            self._valores[etiquetas] = self._valores.get(etiquetas, 0) + cantidad
+
+    def exponer(self):
+        lineas = [f"# HELP {self.nombre} {self.ayuda}", f"# TYPE {self.nombre} {self.tipo}"]
+        with self._lock:
+            valores = sorted(self._valores.items())
+        for etiquetas, valor in valores:
+            lineas.append(f"{self.nombre}{_etiquetas(etiquetas)} {valor}")
+        return lineas
+
+
+class Nivel(Contador):
+    """Gauge que sube y baja (p. ej. solicitudes en curso)."""
+
+    tipo = "gauge"
+
+
+class Indicador:
+    """Gauge cuyo valor se calcula al exponer (funcion -> {etiquetas: valor})."""
+
+    def __init__(self, nombre, ayuda, lector):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.lector = lector
+
+    def exponer(self):
+        lineas = [f"# HELP {self.nombre} {self.ayuda}", f"# TYPE {self.nombre} gauge"]
+        for etiquetas, valor in sorted(self.lector().items()):
+            lineas.append(f"{self.nombre}{_etiquetas(etiquetas)} {valor}")
+        return lineas
+
+
+class Histograma:
+    def __init__(self, nombre, ayuda, limites=LIMITES_TIEMPO):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.limites = tuple(limites)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observar(self, valor, etiquetas=()):
+        indice = bisect_left(self.limites, valor)
+        with self._lock:
+            serie = self._series.get(etiquetas)
+            if serie is None:
+                serie = self._series[etiquetas] = [[0] * (len(self.limites) + 1), 0.0, 0]
+            serie[0][indice] += 1
+            serie[1] += valor
+            serie[2] += 1
+
+    def exponer(self):
+        lineas = [f"# HELP {self.nombre} {self.ayuda}", f"# TYPE {self.nombre} histogram"]
+        with self._lock:
+            series = sorted((etiquetas, list(cubetas), suma, total) for etiquetas, (cubetas, suma, total) in self._series.items())
+        for etiquetas, cubetas, suma, total in series:
+            acumulado = 0
+            for limite, cantidad in zip(self.limites + ("+Inf",), cubetas):
+                acumulado += cantidad
+                lineas.append(f"{self.nombre}_bucket{_etiquetas(etiquetas + (('le', limite),))} {acumulado}")
+            lineas.append(f"{self.nombre}_sum{_etiquetas(etiquetas)} {suma}")
+            lineas.append(f"{self.nombre}_count{_etiquetas(etiquetas)} {total}")
+        return lineas
+
+
+REGISTRO = []
+
+def registrar(metrica):
+    REGISTRO.append(metrica)
+    return metrica
+
+def exponer():
+    lineas = []
+    for metrica in REGISTRO:
+        lineas.extend(metrica.exponer())
+    return "\n".join(lineas) + "\n"
+
+
+#//////////////////////////////////POOL DE CONEXIONES///////////////////////////////
+
+
+_pools = {}
+
+def _estado_pools():
+    estado = {}
+    for motor, pool in _pools.items():
+        # Solo QueuePool expone estos contadores; otros pools (sqlite en memoria) se omiten
+        if not hasattr(pool, "checkedout"):
+            continue
+        estado[(("motor", motor), ("estado", "ocupadas"))] = pool.checkedout()
+        estado[(("motor", motor), ("estado", "libres"))] = pool.checkedin()
+        estado[(("motor", motor), ("estado", "desborde"))] = max(pool.overflow(), 0)
+        estado[(("motor", motor), ("estado", "tamano"))] = pool.size()
+    return estado
+
+pool_conexiones = registrar(Indicador("ventrix_db_pool_conexiones", "Conexiones del pool por estado", _estado_pools))
+pool_eventos = registrar(Contador("ventrix_db_pool_eventos_total", "Eventos del pool (connect, checkout, checkin, invalidate)"))
+pool_espera = registrar(Histograma("ventrix_db_pool_espera_segundos", "Tiempo esperando una conexion del pool"))
+pool_uso = registrar(Histograma("ventrix_db_pool_uso_segundos", "Tiempo que una conexion permanece fuera del pool"))
+
+
+def instrumentar_pool(motor, nombre):
+    pool = motor.pool
+    _pools[nombre] = pool
+
+    @event.listens_for(pool, "connect")
+    def _connect(dbapi_connection, connection_record):
+        pool_eventos.incrementar((("motor", nombre), ("evento", "connect")))
+
+    @event.listens_for(pool, "checkout")
+    def _checkout(dbapi_connection, connection_record, connection_proxy):
+        connection_record.info["ventrix_checkout"] = time.perf_counter()
+        pool_eventos.incrementar((("motor", nombre), ("evento", "checkout")))
+
+    @event.listens_for(pool, "checkin")
+    def _checkin(dbapi_connection, connection_record):
+        inicio = connection_record.info.pop("ventrix_checkout", None)
+        if inicio is not None:
+            pool_uso.observar(time.perf_counter() - inicio, (("motor", nombre),))
+        pool_eventos.incrementar((("motor", nombre), ("evento", "checkin")))
+
+    @event.listens_for(pool, "invalidate")
+    def _invalidate(dbapi_connection, connection_record, exception):
+        pool_eventos.incrementar((("motor", nombre), ("evento", "invalidate")))
+
+
+def observar_espera(nombre, segundos):
+    pool_espera.observar(segundos, (("motor", nombre),))
+
+
+#//////////////////////////////////RUTAS HTTP///////////////////////////////
+
+
+LIMITES_TAMANO = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+solicitudes = registrar(Contador("ventrix_http_solicitudes_total", "Solicitudes atendidas por ruta, metodo y estado"))
+errores = registrar(Contador("ventrix_http_errores_total", "Respuestas 4xx y 5xx por ruta y estado"))
+en_curso = registrar(Nivel("ventrix_http_solicitudes_en_curso", "Solicitudes que se estan atendiendo"))
+duracion = registrar(Histograma("ventrix_http_duracion_segundos", "Duracion de las solicitudes por ruta y metodo"))
+tamano_respuesta = registrar(Histograma("ventrix_http_respuesta_bytes", "Tamano del cuerpo de la respuesta", LIMITES_TAMANO))
+
+
+def _plantilla(scope, raiz):
+    # Se etiqueta con la plantilla (/usuario/{id}) y no con la URL real para no disparar la cardinalidad
+    ruta = scope.get("route")
+    if ruta is not None and hasattr(ruta, "path"):
+        return ruta.path
+    montaje = scope.get("root_path", "")
+    if montaje != raiz:
+        return montaje[len(raiz):]
+    return "sin_ruta"
+
+
+class MiddlewareMetricas:
+    """Middleware ASGI puro: solo toca contadores en memoria en el camino de la solicitud."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        inicio = time.perf_counter()
+        raiz = scope.get("root_path", "")
+        metodo = (("metodo", scope["method"]),)
+        respuesta = [500, 0]
+
+        async def enviar(mensaje):
+            if mensaje["type"] == "http.response.start":
+                respuesta[0] = mensaje["status"]
+            elif mensaje["type"] == "http.response.body":
+                respuesta[1] += len(mensaje.get("body", b""))
+            await send(mensaje)
+
+        en_curso.incrementar(metodo)
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            en_curso.incrementar(metodo, -1)
+            ruta = (("ruta", _plantilla(scope, raiz)),)
+            estado = (("estado", respuesta[0]),)
+            solicitudes.incrementar(ruta + metodo + estado)
+            if respuesta[0] >= 400:
+                errores.incrementar(ruta + estado)
+            duracion.observar(time.perf_counter() - inicio, ruta + metodo)
+            tamano_respuesta.observar(respuesta[1], ruta)
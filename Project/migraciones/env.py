@@ -0,0 +1,33 @@
+from logging.config import fileConfig
+from alembic import context
+from sqlalchemy import create_engine, pool
+from configuracion import URL_DB
+from conexion import base
+import modelo
+
+config = context.config
+if config.config_file_name is not None:
+    fileConfig(config.config_file_name)
+
+target_metadata = base.metadata
+
+
+def run_migrations_offline():
+    context.configure(url=URL_DB, target_metadata=target_metadata, render_as_batch=True, literal_binds=True, dialect_opts={"paramstyle": "named"})
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online():
+    motor = create_engine(URL_DB, poolclass=pool.NullPool)
+    with motor.connect() as connection:
+        # render_as_batch: las revisiones autogeneradas tambien funcionan en SQLite (pruebas locales)
+        context.configure(connection=connection, target_metadata=target_metadata, render_as_batch=True)
+        with context.begin_transaction():
+            context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
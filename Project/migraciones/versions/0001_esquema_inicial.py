@@ -0,0 +1,65 @@
+"""esquema inicial (el que creaba base.metadata.create_all)
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+ROLES = ("ADMINISTRADOR", "CAJERO", "MESERO", "COCINA", "ADMINISTRADOR_SUCURSAL")
+ESTADOS = ("ACTIVO", "INACTIVO")
+
+
+def upgrade():
+    op.create_table(
+        "usuario",
+        sa.Column("documento", sa.String(10), primary_key=True, nullable=False),
+        sa.Column("nombre", sa.String(50), nullable=False),
+        sa.Column("correo", sa.String(100), nullable=False),
+        sa.Column("password", sa.String(50), nullable=False),
+        sa.Column("rol", sa.Enum(*ROLES, name="rolusuario"), nullable=False),
+        sa.Column("fecha_creacion", sa.Date(), nullable=False),
+        sa.Column("sucursal", sa.String(100), nullable=True),
+        sa.Column("estado", sa.Enum(*ESTADOS, name="estadousuario"), nullable=False),
+        sa.UniqueConstraint("documento"),
+    )
+    op.create_table(
+        "restaurante",
+        sa.Column("id", sa.String(100), primary_key=True, nullable=False),
+        sa.Column("nombre", sa.String(100), nullable=False),
+        sa.Column("descripcion", sa.String(200), nullable=True),
+        sa.Column("telefono", sa.String(10), nullable=False),
+        sa.Column("direccion", sa.String(200), nullable=False),
+        sa.Column("correo", sa.String(100), nullable=False),
+        sa.Column("imagen", sa.String(200), nullable=False),
+        sa.Column("fecha_creacion", sa.Date(), nullable=False),
+        sa.Column("fecha_finalizacion", sa.Date(), nullable=False),
+        sa.Column("estado", sa.Enum(*ESTADOS, name="estadorestaurante"), nullable=False),
+        sa.Column("id_usuario", sa.String(10), sa.ForeignKey("usuario.documento"), nullable=False),
+        sa.UniqueConstraint("id"),
+    )
+    op.create_table(
+        "sucursal",
+        sa.Column("id", sa.String(100), primary_key=True, nullable=False),
+        sa.Column("nombre", sa.String(100), nullable=False),
+        sa.Column("direccion", sa.String(200), nullable=False),
+        sa.Column("ciudad", sa.String(100), nullable=False),
+        sa.Column("telefono", sa.String(10), nullable=False),
+        sa.Column("fecha_apertura", sa.Date(), nullable=False),
+        sa.Column("estado", sa.Enum(*ESTADOS, name="estadosucursal"), nullable=False),
+        sa.Column("administrador", sa.String(10), nullable=True),
+        sa.Column("id_restaurante", sa.String(100), sa.ForeignKey("restaurante.id"), nullable=False),
+        sa.UniqueConstraint("id"),
+    )
+
+
+def downgrade():
+    op.drop_table("sucursal")
+    op.drop_table("restaurante")
+    op.drop_table("usuario")
@@ -0,0 +1,29 @@
+"""indices para las columnas que filtran las rutas de consulta
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+"""
+from alembic import op
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # login y las consultas por correo identifican al usuario por su correo
+    op.create_index("ix_usuario_correo", "usuario", ["correo"], unique=True)
+    op.create_index("ix_usuario_sucursal", "usuario", ["sucursal"])
+    op.create_index("ix_restaurante_id_usuario", "restaurante", ["id_usuario"])
+    op.create_index("ix_sucursal_administrador", "sucursal", ["administrador"])
+    op.create_index("ix_sucursal_id_restaurante", "sucursal", ["id_restaurante"])
+
+
+def downgrade():
+    op.drop_index("ix_sucursal_id_restaurante", table_name="sucursal")
+    op.drop_index("ix_sucursal_administrador", table_name="sucursal")
+    op.drop_index("ix_restaurante_id_usuario", table_name="restaurante")
+    op.drop_index("ix_usuario_sucursal", table_name="usuario")
+    op.drop_index("ix_usuario_correo", table_name="usuario")
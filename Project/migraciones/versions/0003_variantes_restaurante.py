@@ -0,0 +1,21 @@
+"""variantes (miniaturas webp/avif) de la imagen del restaurante
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column("restaurante", sa.Column("variantes", sa.JSON(), nullable=True))
+
+
+def downgrade():
+    op.drop_column("restaurante", "variantes")
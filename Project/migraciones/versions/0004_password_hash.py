@@ -0,0 +1,24 @@
+"""usuario.password guarda hashes bcrypt (60 caracteres)
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+# batch_alter_table: SQLite no tiene ALTER COLUMN y recrea la tabla; en MySQL es un ALTER normal
+def upgrade():
+    with op.batch_alter_table("usuario") as tabla:
+        tabla.alter_column("password", existing_type=sa.String(50), type_=sa.String(100), existing_nullable=False)
+
+
+def downgrade():
+    with op.batch_alter_table("usuario") as tabla:
+        tabla.alter_column("password", existing_type=sa.String(100), type_=sa.String(50), existing_nullable=False)
@@ -0,0 +1,27 @@
+"""lista de tokens revocados
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "token_revocado",
+        sa.Column("jti", sa.String(32), primary_key=True),
+        sa.Column("expira", sa.DateTime(), nullable=False),
+    )
+    op.create_index("ix_token_revocado_expira", "token_revocado", ["expira"])
+
+
+def downgrade():
+    op.drop_index("ix_token_revocado_expira", table_name="token_revocado")
+    op.drop_table("token_revocado")
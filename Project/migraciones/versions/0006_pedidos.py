@@ -0,0 +1,85 @@
+"""tablas de pedidos: categoria, producto, tipo_pago, mesa, pedido y detalle_pedido
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+ESTADOS_PEDIDO = ("ORDENADO", "COMANDADO", "LISTO", "PAGADO")
+
+
+def upgrade():
+    op.create_table(
+        "categoria",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("nombre", sa.String(100), nullable=False),
+    )
+    op.create_table(
+        "producto",
+        sa.Column("id_producto", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("nombre", sa.String(100), nullable=False),
+        sa.Column("precio", sa.Float(), nullable=False),
+        sa.Column("imagen", sa.String(1000), nullable=True),
+        sa.Column("disponibilidad", sa.Boolean(), nullable=False),
+        sa.Column("id_sucursal", sa.String(100), sa.ForeignKey("sucursal.id"), nullable=False),
+        sa.Column("id_categoria", sa.Integer(), sa.ForeignKey("categoria.id"), nullable=False),
+    )
+    op.create_index("ix_producto_id_sucursal", "producto", ["id_sucursal"])
+    op.create_table(
+        "tipo_pago",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("descripcion", sa.String(100), nullable=False),
+    )
+    op.create_table(
+        "mesa",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("nombre", sa.String(100), nullable=False),
+        sa.Column("estado", sa.String(20), nullable=False),
+        sa.Column("id_sucursal", sa.String(100), sa.ForeignKey("sucursal.id"), nullable=False),
+    )
+    op.create_index("ix_mesa_id_sucursal", "mesa", ["id_sucursal"])
+    op.create_table(
+        "pedido",
+        sa.Column("id_pedido", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("fecha_pedido", sa.Date(), nullable=False),
+        sa.Column("hora_pedido", sa.Time(), nullable=False),
+        sa.Column("estado", sa.Enum(*ESTADOS_PEDIDO, name="estadopedido"), nullable=False),
+        sa.Column("total_pedido", sa.Float(), nullable=True),
+        sa.Column("nombre", sa.String(100), nullable=True),
+        sa.Column("sucursal", sa.String(100), nullable=False),
+        sa.Column("id_mesa", sa.Integer(), sa.ForeignKey("mesa.id"), nullable=True),
+        sa.Column("id_tipo_pago", sa.Integer(), sa.ForeignKey("tipo_pago.id"), nullable=True),
+    )
+    op.create_index("ix_pedido_sucursal_estado", "pedido", ["sucursal", "estado"])
+    op.create_table(
+        "detalle_pedido",
+        sa.Column("id_detalle_pedido", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("cantidad", sa.Integer(), nullable=False),
+        sa.Column("hora_detalle", sa.Time(), nullable=False),
+        sa.Column("descripcion", sa.String(200), nullable=True),
+        sa.Column("precio_total", sa.Float(), nullable=False),
+        sa.Column("sucursal", sa.String(100), nullable=False),
+        sa.Column("id_producto", sa.Integer(), sa.ForeignKey("producto.id_producto"), nullable=False),
+        sa.Column("id_pedido", sa.Integer(), sa.ForeignKey("pedido.id_pedido"), nullable=False),
+    )
+    op.create_index("ix_detalle_pedido_id_pedido", "detalle_pedido", ["id_pedido"])
+
+
+def downgrade():
+    op.drop_index("ix_detalle_pedido_id_pedido", table_name="detalle_pedido")
+    op.drop_table("detalle_pedido")
+    op.drop_index("ix_pedido_sucursal_estado", table_name="pedido")
+    op.drop_table("pedido")
+    op.drop_index("ix_mesa_id_sucursal", table_name="mesa")
+    op.drop_table("mesa")
+    op.drop_table("tipo_pago")
+    op.drop_index("ix_producto_id_sucursal", table_name="producto")
+    op.drop_table("producto")
+    op.drop_table("categoria")
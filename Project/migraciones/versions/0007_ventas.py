@@ -0,0 +1,56 @@
+"""tabla venta y acumulados por hora y por dia
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "venta",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("fecha_hora", sa.DateTime(), nullable=False),
+        sa.Column("cantidad", sa.Integer(), nullable=False),
+        sa.Column("total", sa.Float(), nullable=False),
+        sa.Column("id_producto", sa.Integer(), sa.ForeignKey("producto.id_producto"), nullable=False),
+        sa.Column("id_sucursal", sa.String(100), sa.ForeignKey("sucursal.id"), nullable=False),
+        sa.Column("id_pedido", sa.Integer(), sa.ForeignKey("pedido.id_pedido"), nullable=True),
+    )
+    op.create_index("ix_venta_sucursal_fecha", "venta", ["id_sucursal", "fecha_hora"])
+    op.create_table(
+        "venta_hora",
+        sa.Column("id_sucursal", sa.String(100), primary_key=True),
+        sa.Column("hora", sa.DateTime(), primary_key=True),
+        sa.Column("id_producto", sa.Integer(), primary_key=True),
+        sa.Column("id_categoria", sa.Integer(), nullable=False),
+        sa.Column("cantidad", sa.Integer(), nullable=False),
+        sa.Column("total", sa.Float(), nullable=False),
+    )
+    op.create_index("ix_venta_hora_hora", "venta_hora", ["hora"])
+    op.create_table(
+        "venta_dia",
+        sa.Column("id_sucursal", sa.String(100), primary_key=True),
+        sa.Column("fecha", sa.Date(), primary_key=True),
+        sa.Column("id_producto", sa.Integer(), primary_key=True),
+        sa.Column("id_categoria", sa.Integer(), nullable=False),
+        sa.Column("cantidad", sa.Integer(), nullable=False),
+        sa.Column("total", sa.Float(), nullable=False),
+    )
+    op.create_index("ix_venta_dia_fecha", "venta_dia", ["fecha"])
+
+
+def downgrade():
+    op.drop_index("ix_venta_dia_fecha", table_name="venta_dia")
+    op.drop_table("venta_dia")
+    op.drop_index("ix_venta_hora_hora", table_name="venta_hora")
+    op.drop_table("venta_hora")
+    op.drop_index("ix_venta_sucursal_fecha", table_name="venta")
+    op.drop_table("venta")
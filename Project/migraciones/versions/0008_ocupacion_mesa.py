@@ -0,0 +1,30 @@
+"""ocupacion de mesas: pedido sentado y desde cuando
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0008"
+down_revision = "0007"
+branch_labels = None
+depends_on = None
+
+
+# batch_alter_table: SQLite no agrega restricciones con ALTER y recrea la tabla
+def upgrade():
+    with op.batch_alter_table("mesa") as tabla:
+        tabla.add_column(sa.Column("id_pedido", sa.Integer(), nullable=True))
+        tabla.add_column(sa.Column("ocupada_desde", sa.DateTime(), nullable=True))
+        tabla.create_unique_constraint("uq_mesa_id_pedido", ["id_pedido"])
+        tabla.create_foreign_key("fk_mesa_id_pedido", "pedido", ["id_pedido"], ["id_pedido"])
+
+
+def downgrade():
+    with op.batch_alter_table("mesa") as tabla:
+        tabla.drop_constraint("fk_mesa_id_pedido", type_="foreignkey")
+        tabla.drop_constraint("uq_mesa_id_pedido", type_="unique")
+        tabla.drop_column("ocupada_desde")
+        tabla.drop_column("id_pedido")
@@ -0,0 +1,50 @@
+"""liquidaciones: cobro de varios pedidos repartido en pagos
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0009"
+down_revision = "0008"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "liquidacion",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("fecha_hora", sa.DateTime(), nullable=False),
+        sa.Column("id_sucursal", sa.String(100), sa.ForeignKey("sucursal.id"), nullable=False),
+        sa.Column("total", sa.Float(), nullable=False),
+        sa.Column("propina", sa.Float(), nullable=False, server_default="0"),
+    )
+    op.create_index("ix_liquidacion_id_sucursal", "liquidacion", ["id_sucursal"])
+    op.create_table(
+        "pago",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("id_liquidacion", sa.Integer(), sa.ForeignKey("liquidacion.id"), nullable=False),
+        sa.Column("id_tipo_pago", sa.Integer(), sa.ForeignKey("tipo_pago.id"), nullable=False),
+        sa.Column("monto", sa.Float(), nullable=False),
+        sa.Column("propina", sa.Float(), nullable=False, server_default="0"),
+    )
+    op.create_index("ix_pago_id_liquidacion", "pago", ["id_liquidacion"])
+    # batch_alter_table: SQLite no agrega llaves foraneas con ALTER y recrea la tabla
+    with op.batch_alter_table("pedido") as tabla:
+        tabla.add_column(sa.Column("id_liquidacion", sa.Integer(), nullable=True))
+        tabla.create_index("ix_pedido_id_liquidacion", ["id_liquidacion"])
+        tabla.create_foreign_key("fk_pedido_id_liquidacion", "liquidacion", ["id_liquidacion"], ["id"])
+
+
+def downgrade():
+    with op.batch_alter_table("pedido") as tabla:
+        tabla.drop_constraint("fk_pedido_id_liquidacion", type_="foreignkey")
+        tabla.drop_index("ix_pedido_id_liquidacion")
+        tabla.drop_column("id_liquidacion")
+    op.drop_index("ix_pago_id_liquidacion", table_name="pago")
+    op.drop_table("pago")
+    op.drop_index("ix_liquidacion_id_sucursal", table_name="liquidacion")
+    op.drop_table("liquidacion")
@@ -0,0 +1,23 @@
+"""version de mesa: cada cambio la incrementa para ordenar los eventos
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0010"
+down_revision = "0009"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table("mesa") as tabla:
+        tabla.add_column(sa.Column("version", sa.Integer(), nullable=False, server_default="0"))
+
+
+def downgrade():
+    with op.batch_alter_table("mesa") as tabla:
+        tabla.drop_column("version")
@@ -1,4 +1,4 @@
-from sqlalchemy import Boolean, Column, Float, Integer, String, Enum as SQLAlchemyEnum, Date, ForeignKey, Time
+from sqlalchemy import Boolean, Column, Float, Integer, String, Enum as SQLAlchemyEnum, Date, DateTime, ForeignKey, Time, JSON, Index
 from sqlalchemy.orm import relationship
 from datetime import date
 from conexion import base
@@ -20,11 +20,11 @@ class Usuario(base):
 
     documento = Column(String(10), primary_key=True, unique=True, nullable=False)
     nombre = Column(String(50), nullable=False)
-    correo = Column(String(100), nullable=False)
-    password = Column(String(50), nullable=False)
+    correo = Column(String(100), nullable=False, unique=True, index=True)
+    password = Column(String(100), nullable=False)
     rol = Column(SQLAlchemyEnum(RolUsuario), nullable=False)
     fecha_creacion = Column(Date, nullable=False, default=date.today)
-    sucursal = Column(String(100), nullable=True)
+    sucursal = Column(String(100), nullable=True, index=True)
     estado = Column(SQLAlchemyEnum(EstadoUsuario), nullable=False, default=EstadoUsuario.ACTIVO)
 
     # Relación uno a uno con Restaurante
@@ -45,12 +45,14 @@ class Restaurante(base):
     direccion = Column(String(200), nullable=False)
     correo = Column(String(100), nullable=False)
     imagen = Column(String(200), nullable=False)
+    # Miniaturas generadas en segundo plano: {"webp_160": "/imagenes/...", ...}
+    variantes = Column(JSON, nullable=True)
     fecha_creacion = Column(Date, nullable=False, default=date.today)
     fecha_finalizacion = Column(Date, nullable=False)
     estado = Column(SQLAlchemyEnum(EstadoRestaurante), nullable=False)
 
     # Relación con Usuario (uno a uno)
-    id_usuario = Column(String(10), ForeignKey('usuario.documento'), nullable=False)
+    id_usuario = Column(String(10), ForeignKey('usuario.documento'), nullable=False, index=True)
     usuario = relationship("Usuario", back_populates="restaurante")
 
     # Relación con Sucursal (uno a muchos)
@@ -71,13 +73,29 @@ class Sucursal(base):
     telefono = Column(String(10), nullable=False)
     fecha_apertura = Column(Date, nullable=False, default=date.today)
     estado = Column(SQLAlchemyEnum(EstadoSucursal), nullable=False)
-    administrador = Column(String(10), nullable=True)
+    administrador = Column(String(10), nullable=True, index=True)
 
     # Relación con Restaurante
-    id_restaurante = Column(String(100), ForeignKey('restaurante.id'), nullable=False)
+    id_restaurante = Column(String(100), ForeignKey('restaurante.id'), nullable=False, index=True)
     restaurante = relationship("Restaurante", back_populates="sucursales")
     
-'''class Producto(base):
+class TokenRevocado(base):
+    __tablename__ = "token_revocado"
+
+    jti = Column(String(32), primary_key=True)
+    expira = Column(DateTime, nullable=False, index=True)
+
+class Categoria(base):
+    __tablename__ = "categoria"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    nombre = Column(String(100), nullable=False)
+
+    # Relación con Producto
+    productos = relationship("Producto", back_populates="categoria")
+
+
+class Producto(base):
     __tablename__ = "producto"
 
     id_producto = Column(Integer, primary_key=True, autoincrement=True)
@@ -86,16 +104,47 @@ class Sucursal(base):
     imagen = Column(String(1000), nullable=True)
     disponibilidad = Column(Boolean, nullable=False)
 
-    # Relación con Detalle_Pedido
-    detalle_pedido = relationship("Detalle_Pedido", back_populates="producto", lazy="select")
+    # Relación con DetallePedido
+    detalle_pedido = relationship("DetallePedido", back_populates="producto", lazy="select")
 
     # Relación con Sucursal
-    id_sucursal = Column(Integer, ForeignKey("sucursal.id"), nullable=False)
-    sucursal = relationship("Sucursal", back_populates="productos")
+    id_sucursal = Column(String(100), ForeignKey("sucursal.id"), nullable=False, index=True)
+    sucursal = relationship("Sucursal")
 
     # Relación con Categoria
     id_categoria = Column(Integer, ForeignKey("categoria.id"), nullable=False)
-    categoria = relationship("Categoria", back_populates="productos")'''
+    categoria = relationship("Categoria", back_populates="productos")
+
+
+class TipoPago(base):
+    __tablename__ = "tipo_pago"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    descripcion = Column(String(100), nullable=False)
+
+    # Relación con Pedido
+    pedidos = relationship("Pedido", back_populates="tipo_pago")
+
+
+class Mesa(base):
+    __tablename__ = "mesa"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    nombre = Column(String(100), nullable=False)
+    # 'Fisica' o 'Rapida'
+    estado = Column(String(20), nullable=False)
+
+    # Relación con Sucursal
+    id_sucursal = Column(String(100), ForeignKey("sucursal.id"), nullable=False, index=True)
+
+    # Ocupacion: pedido sentado en la mesa (NULL = libre). Un pedido solo puede estar en una mesa.
+    id_pedido = Column(Integer, ForeignKey("pedido.id_pedido", name="fk_mesa_id_pedido", use_alter=True), nullable=True, unique=True)
+    ocupada_desde = Column(DateTime, nullable=True)
+    # Se incrementa en cada UPDATE; los planos en memoria ignoran eventos con una version vieja
+    version = Column(Integer, nullable=False, default=0, server_default="0")
+
+    # Relación con Pedido
+    pedidos = relationship("Pedido", back_populates="mesa", foreign_keys="Pedido.id_mesa")
     
     
 class EstadoPedido(str, Enum):
@@ -105,26 +154,31 @@ class EstadoPedido(str, Enum):
     PAGADO = "PAGADO"
     
     
-'''class Pedido(base):
+class Pedido(base):
     __tablename__ = "pedido"
+    # Las pantallas listan los pedidos de una sucursal por estado
+    __table_args__ = (Index("ix_pedido_sucursal_estado", "sucursal", "estado"),)
 
     id_pedido = Column(Integer, primary_key=True, autoincrement=True)
     fecha_pedido = Column(Date, nullable=False)
     hora_pedido = Column(Time, nullable=False)
     estado = Column(SQLAlchemyEnum(EstadoPedido), nullable=False, default=EstadoPedido.ORDENADO)
     total_pedido = Column(Float, nullable=True, default=0.0)
-    nombre = Column(String, nullable=True)
-    sucursal = Column(String, nullable=False)
+    nombre = Column(String(100), nullable=True)
+    sucursal = Column(String(100), nullable=False)
 
     # Relación con Mesa
     id_mesa = Column(Integer, ForeignKey("mesa.id"), nullable=True)
-    mesa = relationship("Mesa", back_populates="pedidos")
+    mesa = relationship("Mesa", back_populates="pedidos", foreign_keys=[id_mesa])
 
     # Relación con TipoPago
     id_tipo_pago = Column(Integer, ForeignKey("tipo_pago.id"), nullable=True)
     tipo_pago = relationship("TipoPago", back_populates="pedidos")
 
-    # Relación con Detalle_Pedido
+    # Cobro en el que se pago (puede cubrir varios pedidos)
+    id_liquidacion = Column(Integer, ForeignKey("liquidacion.id"), nullable=True, index=True)
+
+    # Relación con DetallePedido
     detalle_pedido = relationship("DetallePedido", back_populates="pedido", lazy="select")
     
 
@@ -137,13 +191,73 @@ class DetallePedido(base):
     hora_detalle = Column(Time, nullable=False)
     descripcion = Column(String(200), nullable=True)
     precio_total = Column(Float, nullable=False)
-    sucursal = Column(String, nullable=False)
+    sucursal = Column(String(100), nullable=False)
 
     # Relación con Producto
     id_producto = Column(Integer, ForeignKey("producto.id_producto"), nullable=False)
     producto = relationship("Producto", back_populates="detalle_pedido")
 
     # Relación con Pedido
-    id_pedido = Column(Integer, ForeignKey("pedido.id_pedido"), nullable=False)
-    pedido = relationship("Pedido", back_populates="detalle_pedido")'''
-    
\ No newline at end of file
+    id_pedido = Column(Integer, ForeignKey("pedido.id_pedido"), nullable=False, index=True)
+    pedido = relationship("Pedido", back_populates="detalle_pedido")
+
+
+class Venta(base):
+    __tablename__ = "venta"
+    # Historial de ventas por sucursal y fecha (el tablero lee de los acumulados)
+    __table_args__ = (Index("ix_venta_sucursal_fecha", "id_sucursal", "fecha_hora"),)
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    fecha_hora = Column(DateTime, nullable=False)
+    cantidad = Column(Integer, nullable=False)
+    total = Column(Float, nullable=False)
+    id_producto = Column(Integer, ForeignKey("producto.id_producto"), nullable=False)
+    id_sucursal = Column(String(100), ForeignKey("sucursal.id"), nullable=False)
+    id_pedido = Column(Integer, ForeignKey("pedido.id_pedido"), nullable=True)
+
+
+
+# Un cobro que paga uno o varios pedidos, repartido en pagos por tipo de pago.
+class Liquidacion(base):
+    __tablename__ = "liquidacion"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    fecha_hora = Column(DateTime, nullable=False)
+    id_sucursal = Column(String(100), ForeignKey("sucursal.id"), nullable=False, index=True)
+    total = Column(Float, nullable=False)
+    propina = Column(Float, nullable=False, default=0.0)
+
+
+class Pago(base):
+    __tablename__ = "pago"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    id_liquidacion = Column(Integer, ForeignKey("liquidacion.id"), nullable=False, index=True)
+    id_tipo_pago = Column(Integer, ForeignKey("tipo_pago.id"), nullable=False)
+    monto = Column(Float, nullable=False)
+    propina = Column(Float, nullable=False, default=0.0)
+
+# Acumulados de venta por sucursal y producto; se suman al registrar cada venta.
+# id_categoria se copia del producto para agrupar por categoria sin JOIN.
+class VentaHora(base):
+    __tablename__ = "venta_hora"
+    __table_args__ = (Index("ix_venta_hora_hora", "hora"),)
+
+    id_sucursal = Column(String(100), primary_key=True)
+    hora = Column(DateTime, primary_key=True)
+    id_producto = Column(Integer, primary_key=True)
+    id_categoria = Column(Integer, nullable=False)
+    cantidad = Column(Integer, nullable=False, default=0)
+    total = Column(Float, nullable=False, default=0.0)
+
+
+class VentaDia(base):
+    __tablename__ = "venta_dia"
+    __table_args__ = (Index("ix_venta_dia_fecha", "fecha"),)
+
+    id_sucursal = Column(String(100), primary_key=True)
+    fecha = Column(Date, primary_key=True)
+    id_producto = Column(Integer, primary_key=True)
+    id_categoria = Column(Integer, nullable=False)
+    cantidad = Column(Integer, nullable=False, default=0)
+    total = Column(Float, nullable=False, default=0.0)
@@ -0,0 +1,57 @@
+import base64
+from fastapi import HTTPException
+from sqlalchemy import select, func
+
+LIMITE_POR_DEFECTO = 100
+LIMITE_MAXIMO = 1000
+
+
+def codificar_cursor(valor):
+    return base64.urlsafe_b64encode(str(valor).encode()).decode().rstrip("=")
+
+def decodificar_cursor(cursor):
+    try:
+        return base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="El cursor 'after' no es válido")
+
+def _campos_esquema(esquema):
+    return list(getattr(esquema, "model_fields", None) or esquema.__fields__)
+
+def columnas_solicitadas(esquema, fields):
+    permitidos = _campos_esquema(esquema)
+    if not fields:
+        return permitidos
+    nombres = [campo.strip() for campo in fields.split(",") if campo.strip()]
+    invalidos = [campo for campo in nombres if campo not in permitidos]
+    if invalidos:
+        raise HTTPException(status_code=400, detail=f"Campos no válidos: {', '.join(invalidos)}")
+    return nombres
+
+
+async def paginar(db, modelo, esquema, clave, filtros=(), limit=LIMITE_POR_DEFECTO, after=None, fields=None, total=False):
+    """Pagina por clave (keyset) seleccionando solo las columnas pedidas.
+
+    Devuelve las filas como diccionarios y las cabeceras X-Next-Cursor y,
+    solo si se pide, X-Total-Count.
+    """
+    nombres = columnas_solicitadas(esquema, fields)
+    columnas = [getattr(modelo, nombre) for nombre in nombres]
+    if clave.key not in nombres:
+        columnas.append(clave)
+
+    consulta = select(*columnas).where(*filtros).order_by(clave).limit(limit + 1)
+    if after:
+        consulta = consulta.where(clave > decodificar_cursor(after))
+    filas = (await db.execute(consulta)).all()
+
+    cabeceras = {}
+    if len(filas) > limit:
+        filas = filas[:limit]
+        cabeceras["X-Next-Cursor"] = codificar_cursor(getattr(filas[-1], clave.key))
+    if total:
+        # El conteo recorre todo el filtro, por eso solo se calcula cuando el cliente lo pide
+        cabeceras["X-Total-Count"] = str(await db.scalar(select(func.count()).select_from(modelo).where(*filtros)))
+
+    datos = [{nombre: getattr(fila, nombre) for nombre in nombres} for fila in filas]
+    return datos, cabeceras
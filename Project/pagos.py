@@ -0,0 +1,86 @@
+from datetime import datetime
+from fastapi import HTTPException
+from sqlalchemy import insert, select, update, func
+from modelo import Pedido, EstadoPedido, TipoPago, Liquidacion, Pago
+import eventos
+import ventas
+import mesas
+from pedidos import ANTERIOR
+
+# Diferencia maxima aceptada entre lo pagado y el total de los pedidos (redondeo de Float)
+TOLERANCIA = 0.01
+
+
+async def liquidar(db, ids_pedido, pagos):
+    """Paga todos los pedidos dados con un solo cobro, en una sola transaccion.
+
+    `pagos` reparte el total entre tipos de pago, cada uno con su propina.
+    Los pedidos se bloquean en orden de id para que no cambien su total
+    mientras se valida; despues todo son sentencias por conjunto: un INSERT
+    de la liquidacion, uno de varias filas para los pagos, un UPDATE para los
+    pedidos, las ventas y la liberacion de sus mesas.
+    """
+    ids_pedido = sorted(set(ids_pedido))
+    # Igual que al pagar un pedido suelto: solo se cobran los que estan listos
+    esperado = ANTERIOR[EstadoPedido.PAGADO]
+    try:
+        filas = (await db.execute(
+            select(Pedido.id_pedido, Pedido.sucursal, Pedido.estado, Pedido.total_pedido)
+            .where(Pedido.id_pedido.in_(ids_pedido))
+            .order_by(Pedido.id_pedido)
+            .with_for_update()
+        )).all()
+        faltantes = set(ids_pedido) - {fila.id_pedido for fila in filas}
+        if faltantes:
+            raise HTTPException(status_code=404, detail=f"Pedidos no encontrados: {sorted(faltantes)}")
+        sucursales = {fila.sucursal for fila in filas}
+        if len(sucursales) > 1:
+            raise HTTPException(status_code=400, detail="Los pedidos son de sucursales distintas")
+        no_listos = [fila.id_pedido for fila in filas if fila.estado != esperado]
+        if no_listos:
+            raise HTTPException(status_code=409, detail=f"Solo se pueden pagar pedidos en estado {esperado.value}: {no_listos}")
+
+        tipos = {pago["id_tipo_pago"] for pago in pagos}
+        existentes = await db.scalar(select(func.count()).select_from(TipoPago).where(TipoPago.id.in_(tipos)))
+        if existentes != len(tipos):
+            raise HTTPException(status_code=400, detail="Tipo de pago no encontrado")
+
+        total = round(sum(fila.total_pedido or 0 for fila in filas), 2)
+        pagado = round(sum(pago["monto"] for pago in pagos), 2)
+        if abs(pagado - total) > TOLERANCIA:
+            raise HTTPException(status_code=400, detail=f"Los pagos suman {pagado} y los pedidos {total}")
+        propina = round(sum(pago["propina"] for pago in pagos), 2)
+
+        sucursal = sucursales.pop()
+        momento = datetime.now()
+        resultado = await db.execute(insert(Liquidacion).values(fecha_hora=momento, id_sucursal=sucursal, total=total, propina=propina))
+        id_liquidacion = resultado.inserted_primary_key[0]
+        await db.execute(insert(Pago).values([{**pago, "id_liquidacion": id_liquidacion} for pago in pagos]))
+
+        # Con un solo medio de pago se conserva tambien en el pedido, como hacia el pago individual
+        id_tipo_pago = pagos[0]["id_tipo_pago"] if len(tipos) == 1 else None
+        resultado = await db.execute(
+            update(Pedido)
+            .where(Pedido.id_pedido.in_(ids_pedido), Pedido.estado == esperado)
+            .values(estado=EstadoPedido.PAGADO, id_liquidacion=id_liquidacion, id_tipo_pago=id_tipo_pago)
+        )
+        if resultado.rowcount != len(ids_pedido):
+            raise HTTPException(status_code=409, detail="Algún pedido cambió de estado durante el pago")
+
+        await ventas.registrar_pedidos(db, ids_pedido, momento)
+        await mesas.liberar_pedidos(db, ids_pedido)
+        for id_pedido in ids_pedido:
+            eventos.encolar(db, sucursal, "pedido_estado", {"id_pedido": id_pedido, "estado": EstadoPedido.PAGADO, "anterior": esperado})
+        await db.commit()
+    except BaseException:
+        await db.rollback()
+        raise
+    return {
+        "id_liquidacion": id_liquidacion,
+        "id_sucursal": sucursal,
+        "fecha_hora": momento,
+        "pedidos": ids_pedido,
+        "total": total,
+        "propina": propina,
+        "pagos": pagos,
+    }
@@ -0,0 +1,223 @@
+import argparse
+import asyncio
+import logging
+from fastapi import HTTPException
+from sqlalchemy import insert, select, update, delete, func
+from configuracion import RECONCILIACION_INTERVALO, RECONCILIACION_CORREGIR
+from conexion import AsyncSessionLocal
+from modelo import Pedido, DetallePedido, EstadoPedido
+import eventos
+import ventas
+import mesas
+import metricas
+
+logger = logging.getLogger("ventrix.pedidos")
+
+descuadrados = metricas.registrar(metricas.Contador("ventrix_pedidos_descuadrados_total", "Pedidos cuyo total no coincidia con la suma de sus detalles"))
+
+# Diferencia maxima entre total_pedido y la suma de sus lineas que se considera redondeo
+TOLERANCIA = 0.005
+
+# Ciclo de vida de un pedido: cada estado solo puede avanzar al siguiente
+TRANSICIONES = {
+    EstadoPedido.ORDENADO: EstadoPedido.COMANDADO,
+    EstadoPedido.COMANDADO: EstadoPedido.LISTO,
+    EstadoPedido.LISTO: EstadoPedido.PAGADO,
+}
+ANTERIOR = {nuevo: actual for actual, nuevo in TRANSICIONES.items()}
+
+
+async def crear_pedido(db, datos, detalles):
+    """Inserta el pedido y todas sus lineas en una sola transaccion.
+
+    Las lineas van en un unico INSERT de varias filas y el total del pedido
+    sale de ellas, asi que no hace falta volver a leer nada. Devuelve el id
+    del pedido, su total y las filas de detalle insertadas.
+    """
+    datos = {**datos, "estado": EstadoPedido.ORDENADO, "total_pedido": sum(d["precio_total"] for d in detalles)}
+    datos.pop("id_pedido", None)
+    try:
+        resultado = await db.execute(insert(Pedido).values(**datos))
+        id_pedido = resultado.inserted_primary_key[0]
+        filas = [{**detalle, "sucursal": datos["sucursal"], "id_pedido": id_pedido} for detalle in detalles]
+        if filas:
+            await db.execute(insert(DetallePedido).values(filas))
+        if datos.get("id_mesa"):
+            # El pedido ocupa su mesa en la misma transaccion; si ya esta ocupada no se crea
+            await mesas.ocupar(db, datos["id_mesa"], id_pedido, datos["sucursal"])
+            await mesas.notificar(db, datos["sucursal"], "mesa_ocupada", [datos["id_mesa"]])
+        eventos.encolar(db, datos["sucursal"], "pedido_creado", {**datos, "id_pedido": id_pedido, "detalles": filas})
+        await db.commit()
+    except BaseException:
+        await db.rollback()
+        raise
+    return id_pedido, datos["total_pedido"], filas
+
+
+async def cambiar_estado(db, id_pedido, nuevo):
+    """Avanza el pedido a `nuevo` solo si sigue en el estado anterior.
+
+    La comprobacion y el cambio son un mismo UPDATE condicional: si otro
+    cliente lo movio antes, no se toca ninguna fila y se responde 409 sin
+    haber bloqueado el pedido en ningun momento.
+    """
+    esperado = ANTERIOR.get(nuevo)
+    if esperado is None:
+        raise HTTPException(status_code=409, detail=f"Un pedido no puede pasar a {nuevo.value}")
+
+    resultado = await db.execute(
+        update(Pedido)
+        .where(Pedido.id_pedido == id_pedido, Pedido.estado == esperado)
+        .values(estado=nuevo)
+    )
+    if resultado.rowcount == 0:
+        actual = await db.scalar(select(Pedido.estado).where(Pedido.id_pedido == id_pedido))
+        await db.rollback()
+        if actual is None:
+            raise HTTPException(status_code=404, detail="Pedido no encontrado")
+        raise HTTPException(status_code=409, detail=f"El pedido está {actual.value}, no se puede pasar a {nuevo.value}")
+    if nuevo == EstadoPedido.PAGADO:
+        # La venta y sus acumulados entran en la misma transaccion que el pago
+        await ventas.registrar_pedidos(db, [id_pedido])
+        # Igual que al liquidar: el pedido pagado deja su mesa libre
+        await mesas.liberar_pedidos(db, [id_pedido])
+    sucursal = await db.scalar(select(Pedido.sucursal).where(Pedido.id_pedido == id_pedido))
+    eventos.encolar(db, sucursal, "pedido_estado", {"id_pedido": id_pedido, "estado": nuevo, "anterior": esperado})
+    await db.commit()
+
+
+#//////////////////////////////////TOTALES///////////////////////////////
+# total_pedido se mantiene sumando la diferencia de cada linea en la misma
+# transaccion que la modifica, asi leer el total es leer una fila.
+# Orden de bloqueo: primero la linea (si existe) y luego el pedido. Al
+# agregar se actualiza el pedido antes de insertar la linea, porque la
+# llave foranea del INSERT toma un bloqueo compartido sobre el pedido y dos
+# meseros agregando a la vez terminarian en un interbloqueo.
+
+
+async def _sumar_total(db, id_pedido, diferencia):
+    """total_pedido += diferencia en la base, solo si el pedido no esta pagado.
+
+    Devuelve la sucursal del pedido: las lineas y sus eventos usan esa, nunca
+    la que envia el cliente.
+    """
+    resultado = await db.execute(
+        update(Pedido)
+        .where(Pedido.id_pedido == id_pedido, Pedido.estado != EstadoPedido.PAGADO)
+        .values(total_pedido=func.coalesce(Pedido.total_pedido, 0) + diferencia)
+    )
+    if resultado.rowcount == 0:
+        estado = await db.scalar(select(Pedido.estado).where(Pedido.id_pedido == id_pedido))
+        await db.rollback()
+        if estado is None:
+            raise HTTPException(status_code=404, detail="Pedido no encontrado")
+        raise HTTPException(status_code=409, detail="El pedido ya está pagado")
+    # La fila ya esta bloqueada por el UPDATE: la sucursal no puede cambiar hasta confirmar
+    return await db.scalar(select(Pedido.sucursal).where(Pedido.id_pedido == id_pedido))
+
+async def _bloquear_detalle(db, id_detalle):
+    detalle = (await db.execute(
+        select(DetallePedido.id_pedido, DetallePedido.precio_total)
+        .where(DetallePedido.id_detalle_pedido == id_detalle)
+        .with_for_update()
+    )).first()
+    if detalle is None:
+        await db.rollback()
+        raise HTTPException(status_code=404, detail="Detalle de pedido no encontrado")
+    return detalle
+
+
+async def agregar_detalle(db, datos):
+    datos = {clave: valor for clave, valor in datos.items() if clave != "id_detalle_pedido"}
+    datos["sucursal"] = await _sumar_total(db, datos["id_pedido"], datos["precio_total"])
+    resultado = await db.execute(insert(DetallePedido).values(**datos))
+    datos["id_detalle_pedido"] = resultado.inserted_primary_key[0]
+    eventos.encolar(db, datos["sucursal"], "detalle_creado", datos)
+    await db.commit()
+    return datos
+
+async def actualizar_detalle(db, id_detalle, valores):
+    """Cambia una linea; las lineas no se mueven de pedido ni de sucursal, por eso se ignoran esos campos."""
+    valores = {clave: valor for clave, valor in valores.items() if clave not in ("id_detalle_pedido", "id_pedido", "sucursal")}
+    anterior = await _bloquear_detalle(db, id_detalle)
+    sucursal = await _sumar_total(db, anterior.id_pedido, valores.get("precio_total", anterior.precio_total) - anterior.precio_total)
+    if valores:
+        await db.execute(update(DetallePedido).where(DetallePedido.id_detalle_pedido == id_detalle).values(**valores))
+    eventos.encolar(db, sucursal, "detalle_actualizado", {"id_detalle_pedido": id_detalle, "id_pedido": anterior.id_pedido, **valores})
+    await db.commit()
+
+async def eliminar_detalle(db, id_detalle):
+    anterior = await _bloquear_detalle(db, id_detalle)
+    sucursal = await _sumar_total(db, anterior.id_pedido, -anterior.precio_total)
+    await db.execute(delete(DetallePedido).where(DetallePedido.id_detalle_pedido == id_detalle))
+    eventos.encolar(db, sucursal, "detalle_eliminado", {"id_detalle_pedido": id_detalle, "id_pedido": anterior.id_pedido})
+    await db.commit()
+
+
+#//////////////////////////////////RECONCILIACION///////////////////////////////
+
+
+def _suma_detalles():
+    return (
+        select(func.coalesce(func.sum(DetallePedido.precio_total), 0))
+        .where(DetallePedido.id_pedido == Pedido.id_pedido)
+        .scalar_subquery()
+    )
+
+async def reconciliar(db, corregir=False, incluir_pagados=False):
+    """Busca pedidos cuyo total_pedido no coincide con la suma de sus lineas.
+
+    Devuelve los descuadres encontrados; con `corregir` recalcula esos
+    totales en un solo UPDATE.
+    """
+    sumas = (
+        select(DetallePedido.id_pedido, func.sum(DetallePedido.precio_total).label("suma"))
+        .group_by(DetallePedido.id_pedido)
+        .subquery()
+    )
+    calculado = func.coalesce(sumas.c.suma, 0)
+    consulta = (
+        select(Pedido.id_pedido, Pedido.sucursal, Pedido.total_pedido, calculado.label("calculado"))
+        .outerjoin(sumas, sumas.c.id_pedido == Pedido.id_pedido)
+        .where(func.abs(func.coalesce(Pedido.total_pedido, 0) - calculado) > TOLERANCIA)
+    )
+    if not incluir_pagados:
+        consulta = consulta.where(Pedido.estado != EstadoPedido.PAGADO)
+    descuadres = [dict(fila._mapping) for fila in (await db.execute(consulta)).all()]
+
+    if descuadres:
+        descuadrados.incrementar(cantidad=len(descuadres))
+        logger.warning("Pedidos con total descuadrado: %s", [fila["id_pedido"] for fila in descuadres])
+    if corregir and descuadres:
+        # La suma se recalcula dentro del UPDATE, no se reutiliza la leida arriba
+        await db.execute(
+            update(Pedido)
+            .where(Pedido.id_pedido.in_([fila["id_pedido"] for fila in descuadres]))
+            .values(total_pedido=_suma_detalles())
+        )
+        await db.commit()
+    return descuadres
+
+async def reconciliar_periodicamente():
+    while True:
+        await asyncio.sleep(RECONCILIACION_INTERVALO)
+        try:
+            async with AsyncSessionLocal() as db:
+                await reconciliar(db, corregir=RECONCILIACION_CORREGIR)
+        except Exception:
+            logger.exception("No se pudo reconciliar los totales de los pedidos")
+
+
+async def _reconciliar_cli(corregir, incluir_pagados):
+    async with AsyncSessionLocal() as db:
+        return await reconciliar(db, corregir, incluir_pagados)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compara total_pedido con la suma de los detalles de cada pedido")
+    parser.add_argument("--corregir", action="store_true", help="recalcular los totales descuadrados")
+    parser.add_argument("--pagados", action="store_true", help="revisar tambien los pedidos pagados")
+    argumentos = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    for fila in asyncio.run(_reconciliar_cli(argumentos.corregir, argumentos.pagados)):
+        print(f"Pedido {fila['id_pedido']}: total {fila['total_pedido']}, detalles {fila['calculado']}")
@@ -0,0 +1,95 @@
+import contextvars
+import json
+import logging
+import time
+from sqlalchemy import event
+from configuracion import UMBRAL_CONSULTA_LENTA_MS
+
+logger = logging.getLogger("ventrix.sql_lento")
+
+_perfil_actual = contextvars.ContextVar("perfil_sql", default=None)
+
+
+class PerfilSolicitud:
+    """Consultas hechas durante una solicitud HTTP."""
+
+    __slots__ = ("scope", "consultas", "tiempo", "mas_lenta")
+
+    def __init__(self, scope):
+        self.scope = scope
+        self.consultas = 0
+        self.tiempo = 0.0
+        self.mas_lenta = 0.0
+
+    def registrar(self, duracion):
+        self.consultas += 1
+        self.tiempo += duracion
+        if duracion > self.mas_lenta:
+            self.mas_lenta = duracion
+
+    def ruta(self):
+        # La ruta se conoce despues del enrutamiento; se usa la plantilla, no la URL real
+        ruta = self.scope.get("route")
+        return getattr(ruta, "path", self.scope.get("path"))
+
+    def server_timing(self):
+        return (
+            f'db;dur={self.tiempo * 1000:.2f};desc="{self.consultas} consultas", '
+            f"db-lenta;dur={self.mas_lenta * 1000:.2f}"
+        )
+
+
+def _redactar(parametros):
+    if isinstance(parametros, dict):
+        return {clave: "?" for clave in parametros}
+    if isinstance(parametros, (list, tuple)):
+        return [_redactar(valor) if isinstance(valor, (dict, list, tuple)) else "?" for valor in parametros]
+    return "?"
+
+
+def instrumentar_motor(motor):
+    @event.listens_for(motor, "before_cursor_execute")
+    def _antes(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("ventrix_inicio", []).append(time.perf_counter())
+
+    @event.listens_for(motor, "after_cursor_execute")
+    def _despues(conn, cursor, statement, parameters, context, executemany):
+        duracion = time.perf_counter() - conn.info["ventrix_inicio"].pop()
+        perfil = _perfil_actual.get()
+        if perfil is not None:
+            perfil.registrar(duracion)
+        if duracion * 1000 >= UMBRAL_CONSULTA_LENTA_MS:
+            logger.warning(json.dumps({
+                "evento": "consulta_lenta",
+                "ruta": perfil.ruta() if perfil is not None else None,
+                "duracion_ms": round(duracion * 1000, 2),
+                "sentencia": statement,
+                "parametros": _redactar(parameters),
+                "executemany": executemany,
+            }, ensure_ascii=False))
+
+
+class MiddlewarePerfilSQL:
+    """Cuenta las consultas de cada solicitud y las devuelve en la cabecera Server-Timing."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        perfil = PerfilSolicitud(scope)
+        token = _perfil_actual.set(perfil)
+
+        async def enviar(mensaje):
+            if mensaje["type"] == "http.response.start":
+                cabeceras = list(mensaje.get("headers", []))
+                cabeceras.append((b"server-timing", perfil.server_timing().encode()))
+                mensaje = {**mensaje, "headers": cabeceras}
+            await send(mensaje)
+
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            _perfil_actual.reset(token)
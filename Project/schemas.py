@@ -1,7 +1,8 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, validator
 from datetime import date, time
-from typing import List, Optional, Dict
+from typing import List, Optional, Dict, Literal
 from modelo import EstadoPedido, RolUsuario, EstadoRestaurante, EstadoSucursal
+import contrasenas
 
 class SucursalSchema(BaseModel):
     id: str
@@ -39,10 +40,14 @@ class RestauranteSchema(BaseModel):
     direccion: str
     correo: str
     imagen: str
+    variantes: Optional[Dict[str, str]] = None
     fecha_creacion: date
     fecha_finalizacion: date
     estado: EstadoRestaurante
 
+class RestauranteArbolSchema(RestauranteSchema):
+    sucursales: List[SucursalSchema] = []
+
 class RestauranteCreateSchema(BaseModel):
     nombre: str
     descripcion: Optional[str] = None
@@ -67,11 +72,11 @@ class RestauranteUpdateSchema(BaseModel):
     estado: Optional[str]
     id_usuario: Optional[str]
 
+# Sin password: el hash nunca sale en las respuestas
 class UsuarioSchema(BaseModel):
     documento: str
     nombre: str
     correo: str
-    password: str
     rol: str
     fecha_creacion: date
     sucursal: Optional[str] = None
@@ -85,17 +90,55 @@ class UsuarioCreateSchema(BaseModel):
     fecha_creacion: date
     sucursal: Optional[str] = None
 
+    @validator("password")
+    def password_hasheable(cls, password):
+        if contrasenas.demasiado_larga(password):
+            raise ValueError(f"La contraseña no puede superar {contrasenas.MAXIMO_BYTES} bytes")
+        return password
+
+class UsuarioUpdateSchema(BaseModel):
+    documento: str
+    nombre: str
+    correo: str
+    # Sin password se conserva la actual
+    password: Optional[str] = None
+    rol: RolUsuario
+    fecha_creacion: date
+    sucursal: Optional[str] = None
+
+    @validator("password")
+    def password_hasheable(cls, password):
+        if password is not None and contrasenas.demasiado_larga(password):
+            raise ValueError(f"La contraseña no puede superar {contrasenas.MAXIMO_BYTES} bytes")
+        return password
+
 class UsuarioLoginSchema(BaseModel):
     correo: str
     password: str
 
+class LoginRespuestaSchema(BaseModel):
+    correo: str
+    access_token: str
+    token_type: str = "bearer"
+    expira_en: int
+
+class SesionSchema(BaseModel):
+    documento: str
+    nombre: str
+    correo: str
+    rol: RolUsuario
+    sucursal: Optional[str] = None
+    nombre_sucursal: Optional[str] = None
+    restaurante: Optional[str] = None
+    nombre_restaurante: Optional[str] = None
+
 class DetallePedidoSchema(BaseModel):
-    id_detalle_pedido: int  # ID del detalle del pedido
+    id_detalle_pedido: Optional[int] = None  # ID del detalle del pedido
     cantidad: int  # Cantidad de productos
     hora_detalle: time  # Hora del detalle del pedido
     descripcion: Optional[str] = None  # Descripción opcional del detalle
     precio_total: float  # Precio total del detalle
-    sucursal: str  # Sucursal donde se realizó el pedido
+    sucursal: Optional[str] = None  # La toma el servidor del pedido; si llega se ignora
     id_producto: int  # ID del producto asociado
     id_pedido: int  # ID del pedido al que pertenece este detalle
 
@@ -135,6 +178,30 @@ class PedidoSchema(BaseModel):
     sucursal: str
     id_mesa: Optional[int] = None
     id_tipo_pago: Optional[int] = None
+
+    class Config:
+        orm_mode = True
+
+# Linea de un pedido nuevo: la sucursal y el id del pedido los pone el servidor
+class DetalleNuevoSchema(BaseModel):
+    cantidad: int
+    hora_detalle: time
+    descripcion: Optional[str] = None
+    precio_total: float
+    id_producto: int
+
+class PedidoCreateSchema(PedidoSchema):
+    detalles: List[DetalleNuevoSchema] = []
+
+class PedidoDetallesSchema(PedidoSchema):
+    detalles: List[DetallePedidoSchema] = []
+
+class EstadoPedidoSchema(BaseModel):
+    estado: EstadoPedido
+
+class PedidoTotalSchema(BaseModel):
+    id_pedido: int
+    total_pedido: float
     
     
     
@@ -144,8 +211,41 @@ class ProductoSchema(BaseModel):
     precio: float
     imagen: Optional[str] = None
     disponibilidad: bool
-    id_sucursal: int
+    id_sucursal: str
     id_categoria: int
 
     class Config:
-        orm_mode = True
\ No newline at end of file
+        orm_mode = True
+
+class DisponibilidadSchema(BaseModel):
+    disponibilidad: bool
+
+class MesaSchema(BaseModel):
+    id: Optional[int] = None
+    nombre: str
+    estado: Literal["Fisica", "Rapida"]
+    id_sucursal: str
+
+class MesaUpdateSchema(BaseModel):
+    id: int
+    nombre: str
+
+class SentarSchema(BaseModel):
+    id_pedido: int
+
+class TrasladoSchema(BaseModel):
+    origen: int
+    destino: int
+
+class TipoPagoSchema(BaseModel):
+    id: Optional[int] = None
+    descripcion: str
+
+class PagoSchema(BaseModel):
+    id_tipo_pago: int
+    monto: float
+    propina: float = 0.0
+
+class LiquidacionSchema(BaseModel):
+    pedidos: List[int]
+    pagos: List[PagoSchema]
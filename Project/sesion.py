@@ -0,0 +1,44 @@
+import hashlib
+import json
+from sqlalchemy import select, or_, func, case
+from fastapi.encoders import jsonable_encoder
+from modelo import Usuario, Restaurante, Sucursal
+
+
+async def consultar_contexto(db, correo):
+    """Usuario, rol, sucursal y restaurante en una sola consulta.
+
+    La sucursal es la asignada al usuario o la que administra; el restaurante
+    es el de esa sucursal o, para el administrador, el que le pertenece.
+    Si hay varias combinaciones se elige siempre la misma: primero la sucursal
+    asignada, luego la de menor id, para que el ETag no cambie entre llamadas.
+    """
+    consulta = (
+        select(
+            Usuario.documento,
+            Usuario.nombre,
+            Usuario.correo,
+            Usuario.rol,
+            func.coalesce(Sucursal.id, Usuario.sucursal).label("sucursal"),
+            Sucursal.nombre.label("nombre_sucursal"),
+            Restaurante.id.label("restaurante"),
+            Restaurante.nombre.label("nombre_restaurante"),
+        )
+        .outerjoin(Sucursal, or_(Sucursal.id == Usuario.sucursal, Sucursal.administrador == Usuario.documento))
+        .outerjoin(Restaurante, or_(Restaurante.id == Sucursal.id_restaurante, Restaurante.id_usuario == Usuario.documento))
+        .where(Usuario.correo == correo)
+        .order_by(
+            case((Sucursal.id == Usuario.sucursal, 0), (Sucursal.id.is_not(None), 1), else_=2),
+            case((Restaurante.id == Sucursal.id_restaurante, 0), (Restaurante.id.is_not(None), 1), else_=2),
+            Sucursal.id,
+            Restaurante.id,
+        )
+        .limit(1)
+    )
+    fila = (await db.execute(consulta)).first()
+    return dict(fila._mapping) if fila else None
+
+
+def calcular_etag(datos):
+    cuerpo = json.dumps(jsonable_encoder(datos), sort_keys=True, separators=(",", ":"))
+    return '"' + hashlib.sha256(cuerpo.encode()).hexdigest()[:32] + '"'
@@ -0,0 +1,30 @@
+import os
+import sys
+import tempfile
+
+# La configuracion se lee del entorno al importar, asi que se fija antes de importar el proyecto
+_directorio = tempfile.mkdtemp(prefix="ventrix-pruebas-")
+os.environ.setdefault("URL_DB", f"sqlite:///{_directorio}/ventrix.db")
+os.environ.setdefault("URL_DB_ASYNC", f"sqlite+aiosqlite:///{_directorio}/ventrix.db")
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+os.environ.setdefault("RECONCILIACION_INTERVALO", "0")
+
+PROYECTO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROYECTO)
+
+import pytest
+from alembic import command
+from alembic.config import Config
+
+
+@pytest.fixture(scope="session", autouse=True)
+def esquema():
+    """Crea el esquema con las migraciones, igual que en un despliegue."""
+    configuracion = Config(os.path.join(PROYECTO, "alembic.ini"))
+    configuracion.set_main_option("script_location", os.path.join(PROYECTO, "migraciones"))
+    command.upgrade(configuracion, "head")
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
@@ -0,0 +1,21 @@
+import busqueda
+
+
+def test_el_filtro_se_aplica_antes_de_buscar_parecidos():
+    indice = busqueda.Indice()
+    for numero in range(12):
+        indice.agregar(numero, f"Pizza {numero}")
+    indice.agregar(100, "Pizza grande")
+    indice.agregar(101, "Piza")
+    disponibles = {100, 101}
+
+    # Los 12 no disponibles llenan el limite por prefijo; aun asi se buscan los parecidos disponibles
+    assert indice.buscar("pizza", limite=10, filtro=disponibles.__contains__) == [100, 101]
+
+
+def test_sin_tildes_y_por_prefijo():
+    indice = busqueda.Indice()
+    indice.agregar(1, "Café con leche")
+    indice.agregar(2, "Leche asada")
+    assert indice.buscar("cafe") == [1]
+    assert indice.buscar("lech") == [2, 1]
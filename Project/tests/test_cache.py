@@ -0,0 +1,38 @@
+import pytest
+import cache
+
+
+class BackendCaido:
+    async def obtener(self, clave):
+        raise ConnectionError("redis no responde")
+
+    async def guardar(self, clave, valor, ttl=None):
+        raise ConnectionError("redis no responde")
+
+    async def eliminar(self, *claves):
+        raise ConnectionError("redis no responde")
+
+
+@pytest.mark.anyio
+async def test_sin_backend_responde_el_cargador(monkeypatch):
+    monkeypatch.setattr(cache, "backend", BackendCaido())
+
+    async def cargar():
+        return "Ana"
+
+    assert await cache.consultar("usuario:nombre:1", cargar) == "Ana"
+    await cache.invalidar("usuario:nombre:1")
+
+
+@pytest.mark.anyio
+async def test_la_segunda_consulta_sale_de_la_cache(monkeypatch):
+    monkeypatch.setattr(cache, "backend", cache.BackendRedis(cache.crear_cliente_redis("memoria://")))
+    llamadas = []
+
+    async def cargar():
+        llamadas.append(1)
+        return {"nombre": "Ana"}
+
+    assert await cache.consultar("usuario:nombre:2", cargar) == {"nombre": "Ana"}
+    assert await cache.consultar("usuario:nombre:2", cargar) == {"nombre": "Ana"}
+    assert len(llamadas) == 1
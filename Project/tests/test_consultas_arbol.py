@@ -0,0 +1,49 @@
+import re
+from datetime import date
+import pytest
+from fastapi.testclient import TestClient
+from conexion import AsyncSessionLocal
+from modelo import Usuario, RolUsuario, Restaurante, EstadoRestaurante, Sucursal, EstadoSucursal
+from paginacion import codificar_cursor
+from vista import app
+
+
+def _consultas(respuesta):
+    # MiddlewarePerfilSQL informa las sentencias de la solicitud en Server-Timing
+    return int(re.search(r'desc="(\d+) consultas"', respuesta.headers["server-timing"]).group(1))
+
+
+async def _crear(prefijo, restaurantes, sucursales):
+    async with AsyncSessionLocal() as db:
+        db.add(Usuario(documento=prefijo, nombre="N", correo=f"{prefijo}@x.co", password="x", rol=RolUsuario.ADMINISTRADOR))
+        await db.flush()
+        for r in range(restaurantes):
+            db.add(Restaurante(
+                id=f"{prefijo}-r{r}", nombre="R", telefono="1", direccion="d", correo="r@x.co", imagen="",
+                fecha_finalizacion=date(2030, 1, 1), estado=EstadoRestaurante.ACTIVO, id_usuario=prefijo,
+            ))
+            await db.flush()
+            for s in range(sucursales):
+                db.add(Sucursal(id=f"{prefijo}-r{r}-s{s}", nombre="S", direccion="d", ciudad="c", telefono="1", estado=EstadoSucursal.ACTIVO, id_restaurante=f"{prefijo}-r{r}"))
+        await db.commit()
+
+
+@pytest.mark.anyio
+async def test_arbol_no_crece_con_las_sucursales():
+    await _crear("arb1", 1, 1)
+    await _crear("arb5", 1, 5)
+    cliente = TestClient(app)
+    una = cliente.get("/restaurante/arb1-r0/arbol")
+    cinco = cliente.get("/restaurante/arb5-r0/arbol")
+    assert len(cinco.json()["sucursales"]) == 5
+    assert _consultas(una) == _consultas(cinco) == 2
+
+
+@pytest.mark.anyio
+async def test_lista_con_sucursales_no_crece_con_la_pagina():
+    await _crear("lst", 4, 3)
+    cliente = TestClient(app)
+    uno = cliente.get("/restaurante", params={"include": "sucursales", "limit": 1, "after": codificar_cursor("lst-r")})
+    cuatro = cliente.get("/restaurante", params={"include": "sucursales", "limit": 4, "after": codificar_cursor("lst-r")})
+    assert [len(restaurante["sucursales"]) for restaurante in cuatro.json()] == [3, 3, 3, 3]
+    assert _consultas(uno) == _consultas(cuatro) == 2
@@ -0,0 +1,45 @@
+from datetime import date, time
+import pytest
+from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+from sqlalchemy import insert
+from conexion import AsyncSessionLocal
+from modelo import Pedido, EstadoPedido
+import autenticacion
+from vista import app
+
+
+async def _pedido(sucursal):
+    async with AsyncSessionLocal() as db:
+        resultado = await db.execute(insert(Pedido).values(fecha_pedido=date.today(), hora_pedido=time(12), estado=EstadoPedido.ORDENADO, total_pedido=0, sucursal=sucursal))
+        await db.commit()
+        return resultado.inserted_primary_key[0]
+
+
+def _token(sucursal):
+    return autenticacion.emitir_token({"documento": "ev", "rol": "COCINA", "sucursal": sucursal, "restaurante": None})
+
+
+def test_cada_pantalla_recibe_solo_su_sucursal():
+    # Con el contexto corre el lifespan: el bus de eventos queda escuchando en el bucle de la app
+    with TestClient(app) as cliente:
+        pedido_a = cliente.portal.call(_pedido, "ev-a")
+        pedido_b = cliente.portal.call(_pedido, "ev-b")
+        with cliente.websocket_connect(f"/ws/sucursal/ev-a?token={_token('ev-a')}") as pantalla_a, \
+                cliente.websocket_connect(f"/ws/sucursal/ev-b?token={_token('ev-b')}") as pantalla_b:
+            assert cliente.put(f"/pedidos/{pedido_a}/estado", json={"estado": "COMANDADO"}).status_code == 200
+            assert cliente.put(f"/pedidos/{pedido_b}/estado", json={"estado": "COMANDADO"}).status_code == 200
+
+            evento = pantalla_a.receive_json()
+            assert evento["tipo"] == "pedido_estado"
+            assert evento["datos"] == {"id_pedido": pedido_a, "estado": "COMANDADO", "anterior": "ORDENADO"}
+            # El primer evento de la otra pantalla ya es el de su sucursal, no el de ev-a
+            assert pantalla_b.receive_json()["datos"]["id_pedido"] == pedido_b
+
+
+def test_no_se_suscribe_a_otra_sucursal():
+    with TestClient(app) as cliente:
+        with pytest.raises(WebSocketDisconnect) as error:
+            with cliente.websocket_connect(f"/ws/sucursal/ev-c?token={_token('ev-d')}") as pantalla:
+                pantalla.receive_json()
+        assert error.value.code == 1008
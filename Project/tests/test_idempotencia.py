@@ -0,0 +1,88 @@
+import asyncio
+import httpx
+import pytest
+from fastapi import FastAPI, Request
+import idempotencia
+
+ejecuciones = []
+
+app = FastAPI()
+app.add_middleware(idempotencia.MiddlewareIdempotencia)
+
+
+@app.post("/pedidos/prueba")
+async def crear(request: Request):
+    datos = await request.json()
+    ejecuciones.append(datos)
+    await asyncio.sleep(0.05)
+    return {"numero": len(ejecuciones), **datos}
+
+
+@app.post("/pedidosX")
+async def parecida(request: Request):
+    datos = await request.json()
+    ejecuciones.append(datos)
+    return {"numero": len(ejecuciones), **datos}
+
+
+def _cliente():
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://prueba")
+
+
+@pytest.mark.anyio
+async def test_la_misma_clave_en_paralelo_se_ejecuta_una_vez():
+    ejecuciones.clear()
+    cabeceras = {"Idempotency-Key": "paralela", "Authorization": "Bearer a"}
+    async with _cliente() as cliente:
+        primera, segunda = await asyncio.gather(
+            cliente.post("/pedidos/prueba", json={"mesa": 1}, headers=cabeceras),
+            cliente.post("/pedidos/prueba", json={"mesa": 1}, headers=cabeceras),
+        )
+    assert len(ejecuciones) == 1
+    assert primera.status_code == segunda.status_code == 200
+    assert primera.json() == segunda.json()
+    assert [primera.headers.get("idempotent-replayed"), segunda.headers.get("idempotent-replayed")].count("true") == 1
+
+
+@pytest.mark.anyio
+async def test_la_misma_clave_con_otro_cuerpo_es_422():
+    ejecuciones.clear()
+    cabeceras = {"Idempotency-Key": "distinta", "Authorization": "Bearer a"}
+    async with _cliente() as cliente:
+        primera = await cliente.post("/pedidos/prueba", json={"mesa": 1}, headers=cabeceras)
+        segunda = await cliente.post("/pedidos/prueba", json={"mesa": 2}, headers=cabeceras)
+    assert primera.status_code == 200
+    assert segunda.status_code == 422
+    assert len(ejecuciones) == 1
+
+
+class AlmacenCaido:
+    async def obtener(self, clave):
+        raise ConnectionError("redis caido")
+
+    async def guardar(self, clave, valor):
+        raise ConnectionError("redis caido")
+
+
+@pytest.mark.anyio
+async def test_sin_almacen_se_atiende_sin_idempotencia(monkeypatch):
+    ejecuciones.clear()
+    monkeypatch.setattr(idempotencia, "almacen", AlmacenCaido())
+    async with _cliente() as cliente:
+        respuesta = await cliente.post("/pedidos/prueba", json={"mesa": 3}, headers={"Idempotency-Key": "caida"})
+    assert respuesta.status_code == 200
+    assert ejecuciones == [{"mesa": 3}]
+
+
+@pytest.mark.anyio
+async def test_solo_aplica_a_los_prefijos_completos():
+    ejecuciones.clear()
+    cabeceras = {"Idempotency-Key": "prefijo", "Authorization": "Bearer a"}
+    async with _cliente() as cliente:
+        primera = await cliente.post("/pedidosX", json={"mesa": 4}, headers=cabeceras)
+        segunda = await cliente.post("/pedidosX", json={"mesa": 4}, headers=cabeceras)
+    assert primera.status_code == segunda.status_code == 200
+    assert "idempotent-replayed" not in segunda.headers
+    assert len(ejecuciones) == 2
+    assert idempotencia._aplica("/pedidos") and idempotencia._aplica("/pedidos/5/estado")
+    assert not idempotencia._aplica("/pagos-historial")
@@ -0,0 +1,33 @@
+import pytest
+from conexion import AsyncSessionLocal
+from modelo import Usuario, RolUsuario
+from schemas import UsuarioCreateSchema
+import importacion
+
+
+async def _filas(*filas):
+    for numero, fila in enumerate(filas, start=1):
+        yield numero, fila
+
+
+def _usuario(documento, correo):
+    return {"documento": documento, "nombre": "N", "correo": correo, "password": "clave", "rol": "MESERO", "fecha_creacion": "2026-01-01"}
+
+
+@pytest.mark.anyio
+async def test_fila_con_varios_conflictos_se_reporta_una_vez():
+    async with AsyncSessionLocal() as db:
+        db.add(Usuario(documento="imp1", nombre="N", correo="imp1@x.co", password="x", rol=RolUsuario.MESERO))
+        await db.commit()
+
+    async with AsyncSessionLocal() as db:
+        resultado = await importacion.importar(
+            db, _filas(_usuario("imp1", "imp1@x.co"), _usuario("imp2", "imp2@x.co")),
+            UsuarioCreateSchema, lambda usuario: usuario.dict(), Usuario, unicos=[Usuario.documento, Usuario.correo],
+        )
+
+    assert resultado["insertados"] == 1
+    assert resultado["errores"] == [{"fila": 1, "errores": [
+        {"campo": "documento", "mensaje": "Ya existe un registro con este valor"},
+        {"campo": "correo", "mensaje": "Ya existe un registro con este valor"},
+    ]}]
@@ -0,0 +1,20 @@
+import pytest
+from sqlalchemy import text
+from conexion import crear
+
+# Consultas por las columnas indexadas en 0002 y el indice que deben usar
+CONSULTAS = [
+    ("SELECT * FROM usuario WHERE correo = 'a@b.co'", "ix_usuario_correo"),
+    ("SELECT * FROM usuario WHERE sucursal = 's1'", "ix_usuario_sucursal"),
+    ("SELECT * FROM restaurante WHERE id_usuario = '1'", "ix_restaurante_id_usuario"),
+    ("SELECT * FROM sucursal WHERE administrador = '1'", "ix_sucursal_administrador"),
+    ("SELECT * FROM sucursal WHERE id_restaurante = 'r1'", "ix_sucursal_id_restaurante"),
+]
+
+
+@pytest.mark.parametrize("consulta, indice", CONSULTAS)
+def test_la_consulta_usa_el_indice(consulta, indice):
+    with crear.connect() as conexion:
+        plan = " ".join(fila[-1] for fila in conexion.execute(text(f"EXPLAIN QUERY PLAN {consulta}")))
+    assert indice in plan
+    assert not plan.startswith("SCAN")
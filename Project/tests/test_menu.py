@@ -0,0 +1,53 @@
+from datetime import date
+import pytest
+from fastapi import HTTPException
+from conexion import AsyncSessionLocal
+from modelo import Usuario, RolUsuario, Restaurante, EstadoRestaurante, Sucursal, EstadoSucursal, Categoria, Producto
+import menu
+
+
+async def _sucursal_con_producto(prefijo):
+    async with AsyncSessionLocal() as db:
+        db.add(Usuario(documento=prefijo, nombre="N", correo=f"{prefijo}@x.co", password="x", rol=RolUsuario.ADMINISTRADOR))
+        await db.flush()
+        db.add(Restaurante(id=f"{prefijo}-r", nombre="R", telefono="1", direccion="d", correo="r@x.co", imagen="", fecha_finalizacion=date(2030, 1, 1), estado=EstadoRestaurante.ACTIVO, id_usuario=prefijo))
+        await db.flush()
+        db.add(Sucursal(id=f"{prefijo}-s", nombre="S", direccion="d", ciudad="c", telefono="1", estado=EstadoSucursal.ACTIVO, id_restaurante=f"{prefijo}-r"))
+        categoria = Categoria(nombre="Bebidas")
+        db.add(categoria)
+        await db.flush()
+        db.add(Producto(nombre="Café", precio=3.0, imagen="", disponibilidad=True, id_sucursal=f"{prefijo}-s", id_categoria=categoria.id))
+        await db.commit()
+        return f"{prefijo}-s", categoria.id
+
+
+@pytest.mark.anyio
+async def test_sucursal_desconocida_no_queda_en_memoria():
+    with pytest.raises(HTTPException) as error:
+        await menu.obtener("no-existe")
+    assert error.value.status_code == 404
+    assert "no-existe" not in menu._menus
+
+
+@pytest.mark.anyio
+async def test_la_version_no_reinicia_al_reconstruir():
+    sucursal, id_categoria = await _sucursal_con_producto("men")
+    primero = await menu.obtener(sucursal)
+    etag, _ = primero.vista("menu")
+    menu.invalidar(sucursal)
+    reconstruido = await menu.obtener(sucursal)
+    assert reconstruido is not primero
+    assert reconstruido.version == primero.version
+    assert reconstruido.vista("menu")[0] == etag
+
+    reconstruido.marcar_disponibilidad(next(iter(reconstruido.productos)), False)
+    assert reconstruido.version != primero.version
+
+
+@pytest.mark.anyio
+async def test_categorias_ajenas_no_se_guardan():
+    sucursal, id_categoria = await _sucursal_con_producto("mcat")
+    actual = await menu.obtener(sucursal)
+    actual.vista(f"categoria:{id_categoria}")
+    actual.vista("categoria:987654")
+    assert list(actual._vistas) == [f"categoria:{id_categoria}"]
@@ -0,0 +1,78 @@
+import asyncio
+import json
+from datetime import date, time
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import insert, select
+from conexion import AsyncSessionLocal
+from modelo import Mesa, Pedido, EstadoPedido
+import eventos
+import mesas
+import pedidos
+
+
+async def _mesa(sucursal):
+    async with AsyncSessionLocal() as db:
+        resultado = await db.execute(insert(Mesa).values(nombre="M1", estado="Fisica", id_sucursal=sucursal))
+        await db.commit()
+        return resultado.inserted_primary_key[0]
+
+
+@pytest.mark.anyio
+async def test_un_evento_atrasado_no_pisa_la_mesa():
+    id_mesa = await _mesa("mes-a")
+    plano = await mesas.obtener("mes-a")
+    mesa = plano.mesas[id_mesa]
+
+    mesas.aplicar("mes-a", [{**mesa, "id_pedido": 7, "version": mesa["version"] + 2}])
+    mesas.aplicar("mes-a", [{**mesa, "id_pedido": None, "version": mesa["version"] + 1}])
+    assert plano.mesas[id_mesa]["id_pedido"] == 7
+
+    mesas.aplicar("mes-a", [{"id": id_mesa, "eliminada": True}])
+    mesas.aplicar("mes-a", [{**mesa, "version": mesa["version"] + 3}])
+    assert id_mesa not in plano.mesas
+
+
+@pytest.mark.anyio
+async def test_no_se_guarda_un_plano_leido_antes_de_un_cambio():
+    await _mesa("mes-b")
+    lectura = asyncio.ensure_future(mesas.obtener("mes-b"))
+    await asyncio.sleep(0)
+    mesas.aplicar("mes-b", [])
+    await lectura
+    assert "mes-b" not in mesas._planos
+
+
+@pytest.mark.anyio
+async def test_sucursal_inexistente():
+    with pytest.raises(HTTPException) as error:
+        await mesas.obtener("no-existe")
+    assert error.value.status_code == 404
+    assert "no-existe" not in mesas._planos
+
+
+@pytest.mark.anyio
+async def test_pagar_un_pedido_libera_su_mesa():
+    id_mesa = await _mesa("mes-c")
+    async with AsyncSessionLocal() as db:
+        resultado = await db.execute(insert(Pedido).values(fecha_pedido=date.today(), hora_pedido=time(12), estado=EstadoPedido.LISTO, total_pedido=0, sucursal="mes-c"))
+        await db.commit()
+        id_pedido = resultado.inserted_primary_key[0]
+        await mesas.sentar(db, id_mesa, id_pedido)
+        await pedidos.cambiar_estado(db, id_pedido, EstadoPedido.PAGADO)
+        assert await db.scalar(select(Mesa.id_pedido).where(Mesa.id == id_mesa)) is None
+
+
+@pytest.mark.anyio
+async def test_los_eventos_se_reconocen_por_su_tipo():
+    id_mesa = await _mesa("mes-d")
+    plano = await mesas.obtener("mes-d")
+    mesa = plano.mesas[id_mesa]
+
+    # Separadores compactos: el tipo se lee del evento decodificado, no del texto
+    eventos.difusor.difundir("mes-d", json.dumps({"id": 1, "tipo": "mesa_ocupada", "datos": {"mesas": [{**mesa, "id_pedido": 9, "version": mesa["version"] + 1}]}}, separators=(",", ":")))
+    assert plano.mesas[id_mesa]["id_pedido"] == 9
+
+    # Otro evento cuyos datos tienen un campo "tipo" que empieza por mesa_ no se confunde con uno de mesas
+    eventos.difusor.difundir("mes-d", json.dumps({"id": 2, "tipo": "producto_actualizado", "datos": {"tipo": "mesa_vip", "mesas": [{**mesa, "version": 99}]}}))
+    assert plano.mesas[id_mesa]["id_pedido"] == 9
@@ -0,0 +1,53 @@
+import time
+import pytest
+from starlette.routing import Route
+import metricas
+from perfil_sql import MiddlewarePerfilSQL
+
+SOLICITUDES = 5000
+RONDAS = 5
+# Criterio de aceptacion: cada middleware agrega menos de 50 µs por solicitud
+LIMITE_US = 50
+
+RUTA = Route("/item/{id}", lambda request: None)
+
+
+async def app(scope, receive, send):
+    # Aplicacion minima: lo que se mide es solo lo que agrega el middleware
+    scope["route"] = RUTA
+    await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"application/json")]})
+    await send({"type": "http.response.body", "body": b'{"id":1}'})
+
+
+async def _recibir():
+    return {"type": "http.request", "body": b"", "more_body": False}
+
+
+async def _enviar(mensaje):
+    pass
+
+
+async def _ronda(pila):
+    """Segundos por solicitud llamando a la pila ASGI directamente, sin servidor ni cliente."""
+    inicio = time.perf_counter()
+    for numero in range(SOLICITUDES):
+        await pila({
+            "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET", "scheme": "http",
+            "path": f"/item/{numero}", "raw_path": f"/item/{numero}".encode(), "root_path": "", "query_string": b"",
+            "headers": [], "client": ("127.0.0.1", 1), "server": ("prueba", 80),
+        }, _recibir, _enviar)
+    return (time.perf_counter() - inicio) / SOLICITUDES
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("middleware", [metricas.MiddlewareMetricas, MiddlewarePerfilSQL])
+async def test_el_middleware_agrega_menos_de_50_us(middleware):
+    envuelta = middleware(app)
+    # Las rondas se alternan y se toma la mejor de cada pila para descontar el ruido de la maquina
+    sin = con = float("inf")
+    for _ in range(RONDAS):
+        sin = min(sin, await _ronda(app))
+        con = min(con, await _ronda(envuelta))
+    extra_us = (con - sin) * 1e6
+    print(f"{middleware.__name__}: {sin * 1e6:.1f} µs sin, {con * 1e6:.1f} µs con, {extra_us:.1f} µs extra")
+    assert extra_us < LIMITE_US
@@ -0,0 +1,49 @@
+from datetime import date, time
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import insert
+from conexion import AsyncSessionLocal
+from modelo import Pedido, DetallePedido, EstadoPedido
+import eventos
+import pedidos
+from vista import app
+
+
+async def _pedido(sucursal, estado=EstadoPedido.ORDENADO):
+    async with AsyncSessionLocal() as db:
+        resultado = await db.execute(insert(Pedido).values(fecha_pedido=date.today(), hora_pedido=time(12), estado=estado, total_pedido=0, sucursal=sucursal))
+        await db.commit()
+        return resultado.inserted_primary_key[0]
+
+
+@pytest.mark.anyio
+async def test_la_linea_toma_la_sucursal_del_pedido(monkeypatch):
+    publicados = []
+    monkeypatch.setattr(eventos, "encolar", lambda db, sucursal, tipo, datos: publicados.append((sucursal, tipo)))
+    id_pedido = await _pedido("ped-a")
+
+    async with AsyncSessionLocal() as db:
+        detalle = await pedidos.agregar_detalle(db, {
+            "cantidad": 1, "hora_detalle": time(12), "precio_total": 10.0, "sucursal": "ped-b", "id_producto": 1, "id_pedido": id_pedido,
+        })
+        guardado = await db.get(DetallePedido, detalle["id_detalle_pedido"])
+
+    assert detalle["sucursal"] == guardado.sucursal == "ped-a"
+    assert publicados == [("ped-a", "detalle_creado")]
+
+
+@pytest.mark.anyio
+async def test_la_linea_se_crea_sin_sucursal():
+    id_pedido = await _pedido("ped-d")
+    respuesta = TestClient(app).post("/detalles-pedido", json={
+        "cantidad": 1, "hora_detalle": "12:00:00", "precio_total": 10.0, "id_producto": 1, "id_pedido": id_pedido,
+    })
+    assert respuesta.status_code == 201
+    assert respuesta.json()["sucursal"] == "ped-d"
+
+
+@pytest.mark.anyio
+async def test_un_pedido_pagado_no_se_elimina():
+    id_pedido = await _pedido("ped-c", EstadoPedido.PAGADO)
+    respuesta = TestClient(app).delete(f"/pedidos/{id_pedido}")
+    assert respuesta.status_code == 409
@@ -0,0 +1,33 @@
+from datetime import date
+import pytest
+from conexion import AsyncSessionLocal
+from modelo import Usuario, RolUsuario, Restaurante, EstadoRestaurante, Sucursal, EstadoSucursal
+import sesion
+
+
+def _restaurante(id, dueno):
+    return Restaurante(id=id, nombre=id, telefono="1", direccion="d", correo="r@x.co", imagen="", fecha_finalizacion=date(2030, 1, 1), estado=EstadoRestaurante.ACTIVO, id_usuario=dueno)
+
+def _sucursal(id, restaurante, administrador):
+    return Sucursal(id=id, nombre=id, direccion="d", ciudad="c", telefono="1", estado=EstadoSucursal.ACTIVO, administrador=administrador, id_restaurante=restaurante)
+
+
+@pytest.mark.anyio
+async def test_el_contexto_es_siempre_el_mismo():
+    # Administra dos sucursales y ademas es dueno de otro restaurante: hay cuatro combinaciones
+    async with AsyncSessionLocal() as db:
+        db.add_all([
+            Usuario(documento="ses1", nombre="Dueno", correo="ses1@x.co", password="x", rol=RolUsuario.ADMINISTRADOR),
+            Usuario(documento="ses2", nombre="Admin", correo="ses2@x.co", password="x", rol=RolUsuario.ADMINISTRADOR_SUCURSAL),
+        ])
+        await db.flush()
+        db.add_all([_restaurante("ses-r1", "ses1"), _restaurante("ses-r2", "ses2")])
+        await db.flush()
+        db.add_all([_sucursal("ses-s2", "ses-r1", "ses2"), _sucursal("ses-s1", "ses-r1", "ses2")])
+        await db.commit()
+
+    async with AsyncSessionLocal() as db:
+        contextos = [await sesion.consultar_contexto(db, "ses2@x.co") for _ in range(3)]
+    assert contextos[0]["sucursal"] == "ses-s1"
+    assert contextos[0]["restaurante"] == "ses-r1"
+    assert all(contexto == contextos[0] for contexto in contextos)
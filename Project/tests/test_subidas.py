@@ -0,0 +1,44 @@
+from fastapi import FastAPI, File, UploadFile
+from fastapi.testclient import TestClient
+import almacenamiento
+
+app = FastAPI()
+app.add_middleware(almacenamiento.MiddlewareLimiteSubida, limite=1000)
+recibidas = []
+
+
+@app.post("/subir")
+async def subir(imagen: UploadFile = File(...)):
+    recibidas.append(len(await imagen.read()))
+    return {"bytes": recibidas[-1]}
+
+
+def _partes(tamano):
+    # Cuerpo en varios bloques y sin Content-Length, como una subida chunked
+    cuerpo = (
+        b"--limite\r\nContent-Disposition: form-data; name=\"imagen\"; filename=\"a.png\"\r\n"
+        b"Content-Type: image/png\r\n\r\n" + b"x" * tamano + b"\r\n--limite--\r\n"
+    )
+    for inicio in range(0, len(cuerpo), 256):
+        yield cuerpo[inicio:inicio + 256]
+
+
+def test_content_length_grande_se_rechaza_sin_leer():
+    with TestClient(app) as cliente:
+        respuesta = cliente.post("/subir", files={"imagen": ("a.png", b"x" * 5000, "image/png")})
+    assert respuesta.status_code == 413
+    assert recibidas == []
+
+
+def test_cuerpo_chunked_se_corta_al_pasar_el_limite():
+    with TestClient(app) as cliente:
+        respuesta = cliente.post("/subir", content=_partes(5000), headers={"content-type": "multipart/form-data; boundary=limite"})
+    assert respuesta.status_code == 413
+    assert recibidas == []
+
+
+def test_subida_dentro_del_limite():
+    with TestClient(app) as cliente:
+        respuesta = cliente.post("/subir", files={"imagen": ("a.png", b"x" * 500, "image/png")})
+    assert respuesta.status_code == 200
+    assert respuesta.json() == {"bytes": 500}
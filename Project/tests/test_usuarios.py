@@ -0,0 +1,32 @@
+import pytest
+from fastapi.testclient import TestClient
+from conexion import AsyncSessionLocal
+from modelo import Usuario, RolUsuario
+import contrasenas
+from vista import app
+
+
+def _datos(**cambios):
+    return {"documento": "usu1", "nombre": "Ana", "correo": "usu1@x.co", "rol": "MESERO", "fecha_creacion": "2026-01-01", **cambios}
+
+
+@pytest.mark.anyio
+async def test_el_hash_no_sale_en_las_respuestas():
+    async with AsyncSessionLocal() as db:
+        db.add(Usuario(documento="usu1", nombre="Ana", correo="usu1@x.co", password=await contrasenas.hashear("vieja"), rol=RolUsuario.MESERO))
+        await db.commit()
+    cliente = TestClient(app)
+
+    assert "password" not in cliente.get("/usuario/usu1").json()
+    assert all("password" not in usuario for usuario in cliente.get("/usuario").json())
+    assert cliente.get("/usuario", params={"fields": "documento,password"}).status_code == 400
+
+    # Sin password se conserva la actual
+    respuesta = cliente.put("/usuario/usu1", json=_datos(nombre="Ana Maria"))
+    assert respuesta.status_code == 200 and "password" not in respuesta.json()
+    async with AsyncSessionLocal() as db:
+        assert (await contrasenas.verificar("vieja", (await db.get(Usuario, "usu1")).password))[0]
+
+    cliente.put("/usuario/usu1", json=_datos(password="nueva"))
+    async with AsyncSessionLocal() as db:
+        assert (await contrasenas.verificar("nueva", (await db.get(Usuario, "usu1")).password))[0]
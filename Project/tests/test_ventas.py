@@ -0,0 +1,60 @@
+from datetime import date, datetime
+import pytest
+from fastapi.testclient import TestClient
+from conexion import AsyncSessionLocal
+from modelo import Usuario, RolUsuario, Restaurante, EstadoRestaurante, Sucursal, EstadoSucursal, Venta, VentaDia
+import autenticacion
+from vista import app
+
+
+async def _restaurante_con_venta(prefijo):
+    async with AsyncSessionLocal() as db:
+        db.add(Usuario(documento=prefijo, nombre="N", correo=f"{prefijo}@x.co", password="x", rol=RolUsuario.ADMINISTRADOR))
+        await db.flush()
+        db.add(Restaurante(id=f"{prefijo}-r", nombre="R", telefono="1", direccion="d", correo="r@x.co", imagen="", fecha_finalizacion=date(2030, 1, 1), estado=EstadoRestaurante.ACTIVO, id_usuario=prefijo))
+        await db.flush()
+        db.add(Sucursal(id=f"{prefijo}-s", nombre="S", direccion="d", ciudad="c", telefono="1", estado=EstadoSucursal.ACTIVO, id_restaurante=f"{prefijo}-r"))
+        await db.flush()
+        db.add(Venta(fecha_hora=datetime(2026, 5, 1, 12), cantidad=1, total=10.0, id_producto=1, id_sucursal=f"{prefijo}-s"))
+        db.add(VentaDia(id_sucursal=f"{prefijo}-s", fecha=date(2026, 5, 2), id_producto=1, id_categoria=1, cantidad=1, total=10.0))
+        await db.commit()
+
+
+def _token(sucursal, restaurante=None, rol=RolUsuario.ADMINISTRADOR_SUCURSAL):
+    token = autenticacion.emitir_token({"documento": "exp", "rol": rol, "sucursal": sucursal, "restaurante": restaurante})
+    return {"Authorization": f"Bearer {token}"}
+
+
+@pytest.mark.anyio
+async def test_la_exportacion_solo_incluye_las_sucursales_del_token():
+    await _restaurante_con_venta("expa")
+    await _restaurante_con_venta("expb")
+    cliente = TestClient(app)
+    parametros = {"desde": "2026-05-01", "hasta": "2026-05-01"}
+
+    ajena = cliente.get("/ventas/exportar", params={**parametros, "sucursal": "expb-s"}, headers=_token("expa-s"))
+    assert ajena.status_code == 403
+
+    propia = cliente.get("/ventas/exportar", params=parametros, headers=_token("expa-s"))
+    assert propia.status_code == 200
+    filas = propia.text.strip().splitlines()[1:]
+    assert len(filas) == 1 and "expa-s" in filas[0]
+
+    administrador = cliente.get("/ventas/exportar", params={**parametros, "sucursal": "expa-s"}, headers=_token(None, "expa-r", RolUsuario.ADMINISTRADOR))
+    assert administrador.status_code == 200
+
+
+@pytest.mark.anyio
+async def test_el_tablero_solo_suma_las_sucursales_del_token():
+    await _restaurante_con_venta("tab1")
+    await _restaurante_con_venta("tab2")
+    cliente = TestClient(app)
+    parametros = {"desde": "2026-05-02", "hasta": "2026-05-02"}
+
+    assert cliente.get("/ventas", params=parametros).status_code == 401
+    assert cliente.get("/mayorproductodia", params={**parametros, "sucursal": "tab2-s"}, headers=_token("tab1-s")).status_code == 403
+
+    # Sin sucursal se suman solo las del token, no las de todos los restaurantes
+    respuesta = cliente.get("/ventas", params=parametros, headers=_token(None, "tab1-r", RolUsuario.ADMINISTRADOR))
+    assert respuesta.status_code == 200
+    assert [fila["total"] for fila in respuesta.json()] == [10.0]
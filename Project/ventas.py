@@ -0,0 +1,220 @@
+import argparse
+import asyncio
+import logging
+from datetime import datetime, date, time, timedelta
+from sqlalchemy import insert, select, delete, func, cast, Date
+from conexion import AsyncSessionLocal
+from modelo import Venta, VentaHora, VentaDia, DetallePedido, Producto, Categoria
+
+logger = logging.getLogger("ventrix.ventas")
+
+
+def _dialecto(db):
+    return db.get_bind().dialect.name
+
+def _acumular(dialecto, modelo, filas):
+    """INSERT de varias filas que suma cantidad y total si la clave ya existe."""
+    if dialecto == "mysql":
+        from sqlalchemy.dialects.mysql import insert as insert_dialecto
+        sentencia = insert_dialecto(modelo).values(filas)
+        return sentencia.on_duplicate_key_update(
+            cantidad=modelo.cantidad + sentencia.inserted.cantidad,
+            total=modelo.total + sentencia.inserted.total,
+        )
+    if dialecto == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as insert_dialecto
+    else:
+        from sqlalchemy.dialects.sqlite import insert as insert_dialecto
+    sentencia = insert_dialecto(modelo).values(filas)
+    return sentencia.on_conflict_do_update(
+        index_elements=[columna.name for columna in modelo.__table__.primary_key],
+        set_={"cantidad": modelo.cantidad + sentencia.excluded.cantidad, "total": modelo.total + sentencia.excluded.total},
+    )
+
+def _agrupar(lineas, periodo):
+    grupos = {}
+    for linea in lineas:
+        clave = (linea["id_sucursal"], periodo(linea["fecha_hora"]), linea["id_producto"])
+        grupo = grupos.setdefault(clave, {"id_categoria": linea["id_categoria"], "cantidad": 0, "total": 0.0})
+        grupo["cantidad"] += linea["cantidad"]
+        grupo["total"] += linea["total"]
+    # Orden fijo de claves: dos transacciones acumulando a la vez bloquean las filas en el mismo orden
+    return [(clave, grupos[clave]) for clave in sorted(grupos)]
+
+
+async def registrar_ventas(db, lineas):
+    """Inserta las ventas y suma sus cantidades a los acumulados por hora y por dia.
+
+    Cada linea trae fecha_hora, cantidad, total, id_producto, id_sucursal y
+    opcionalmente id_pedido e id_categoria. No confirma: va dentro de la
+    transaccion de quien la llama.
+    """
+    if not lineas:
+        return 0
+    faltantes = {linea["id_producto"] for linea in lineas if linea.get("id_categoria") is None}
+    if faltantes:
+        categorias = dict((await db.execute(
+            select(Producto.id_producto, Producto.id_categoria).where(Producto.id_producto.in_(faltantes))
+        )).all())
+        lineas = [{**linea, "id_categoria": categorias[linea["id_producto"]]} if linea.get("id_categoria") is None else linea for linea in lineas]
+
+    columnas = ("fecha_hora", "cantidad", "total", "id_producto", "id_sucursal", "id_pedido")
+    await db.execute(insert(Venta).values([{columna: linea.get(columna) for columna in columnas} for linea in lineas]))
+
+    dialecto = _dialecto(db)
+    por_hora = _agrupar(lineas, lambda momento: momento.replace(minute=0, second=0, microsecond=0))
+    await db.execute(_acumular(dialecto, VentaHora, [
+        {"id_sucursal": sucursal, "hora": hora, "id_producto": producto, **valores}
+        for (sucursal, hora, producto), valores in por_hora
+    ]))
+    por_dia = _agrupar(lineas, lambda momento: momento.date())
+    await db.execute(_acumular(dialecto, VentaDia, [
+        {"id_sucursal": sucursal, "fecha": fecha, "id_producto": producto, **valores}
+        for (sucursal, fecha, producto), valores in por_dia
+    ]))
+    return len(lineas)
+
+async def registrar_pedidos(db, ids_pedido, momento=None):
+    """Registra como ventas las lineas de los pedidos dados (al pagarlos)."""
+    momento = momento or datetime.now()
+    filas = (await db.execute(
+        select(
+            DetallePedido.cantidad, DetallePedido.precio_total, DetallePedido.id_producto,
+            DetallePedido.sucursal, DetallePedido.id_pedido, Producto.id_categoria,
+        )
+        .join(Producto, Producto.id_producto == DetallePedido.id_producto)
+        .where(DetallePedido.id_pedido.in_(ids_pedido))
+    )).all()
+    return await registrar_ventas(db, [
+        {
+            "fecha_hora": momento, "cantidad": fila.cantidad, "total": fila.precio_total,
+            "id_producto": fila.id_producto, "id_sucursal": fila.sucursal,
+            "id_pedido": fila.id_pedido, "id_categoria": fila.id_categoria,
+        }
+        for fila in filas
+    ])
+
+
+#//////////////////////////////////CONSULTAS DEL TABLERO///////////////////////////////
+
+
+def rango(desde, hasta):
+    hasta = hasta or date.today()
+    return desde or hasta, hasta
+
+def _filtros(modelo, columna, inicio, fin, sucursal, visibles=None):
+    """`visibles` (SELECT de ids de sucursal) limita la consulta a las sucursales del usuario."""
+    filtros = [columna >= inicio, columna < fin]
+    if sucursal:
+        filtros.append(modelo.id_sucursal == sucursal)
+    if visibles is not None:
+        filtros.append(modelo.id_sucursal.in_(visibles))
+    return filtros
+
+async def ventas_por_periodo(db, desde, hasta, sucursal=None, granularidad="dia", visibles=None):
+    if granularidad == "hora":
+        modelo, columna = VentaHora, VentaHora.hora
+        inicio, fin = datetime.combine(desde, time()), datetime.combine(hasta + timedelta(days=1), time())
+    else:
+        modelo, columna = VentaDia, VentaDia.fecha
+        inicio, fin = desde, hasta + timedelta(days=1)
+    consulta = (
+        select(columna.label("periodo"), func.sum(modelo.cantidad).label("cantidad"), func.sum(modelo.total).label("total"))
+        .where(*_filtros(modelo, columna, inicio, fin, sucursal, visibles))
+        .group_by(columna)
+        .order_by(columna)
+    )
+    return (await db.execute(consulta)).all()
+
+async def productos_mas_vendidos(db, desde, hasta, sucursal=None, limite=5, por_categoria=False, visibles=None):
+    cantidad = func.sum(VentaDia.cantidad).label("cantidad")
+    columnas = [VentaDia.id_producto, Producto.nombre, cantidad]
+    agrupar = [VentaDia.id_producto, Producto.nombre]
+    if por_categoria:
+        columnas.append(Categoria.nombre.label("categoria"))
+        agrupar.append(Categoria.nombre)
+    consulta = select(*columnas).join_from(VentaDia, Producto, Producto.id_producto == VentaDia.id_producto)
+    if por_categoria:
+        consulta = consulta.join(Categoria, Categoria.id == VentaDia.id_categoria)
+    consulta = (
+        consulta
+        .where(*_filtros(VentaDia, VentaDia.fecha, desde, hasta + timedelta(days=1), sucursal, visibles))
+        .group_by(*agrupar)
+        .order_by(cantidad.desc())
+        .limit(limite)
+    )
+    return (await db.execute(consulta)).all()
+
+
+#//////////////////////////////////EXPORTACION///////////////////////////////
+
+
+COLUMNAS_EXPORTACION = ("id", "fecha_hora", "cantidad", "total", "id_producto", "id_sucursal", "id_pedido")
+
+def consulta_exportacion(desde, hasta, sucursal=None, visibles=None):
+    inicio, fin = datetime.combine(desde, time()), datetime.combine(hasta + timedelta(days=1), time())
+    return (
+        select(*(getattr(Venta, columna) for columna in COLUMNAS_EXPORTACION))
+        .where(*_filtros(Venta, Venta.fecha_hora, inicio, fin, sucursal, visibles))
+        .order_by(Venta.fecha_hora, Venta.id)
+    )
+
+def esquema_parquet():
+    import pyarrow
+    return pyarrow.schema([
+        ("id", pyarrow.int64()),
+        ("fecha_hora", pyarrow.timestamp("us")),
+        ("cantidad", pyarrow.int64()),
+        ("total", pyarrow.float64()),
+        ("id_producto", pyarrow.int64()),
+        ("id_sucursal", pyarrow.string()),
+        ("id_pedido", pyarrow.int64()),
+    ])
+
+
+#//////////////////////////////////RECONSTRUCCION///////////////////////////////
+
+
+def _truncar(dialecto, columna, unidad):
+    if unidad == "dia":
+        return cast(columna, Date) if dialecto == "postgresql" else func.date(columna)
+    if dialecto == "mysql":
+        return func.date_format(columna, "%Y-%m-%d %H:00:00")
+    if dialecto == "postgresql":
+        return func.date_trunc("hour", columna)
+    # sqlite guarda los DateTime como texto con microsegundos
+    return func.strftime("%Y-%m-%d %H:00:00.000000", columna)
+
+async def reconstruir(db, desde, hasta):
+    """Recalcula los acumulados de [desde, hasta] desde la tabla venta con INSERT ... SELECT."""
+    dialecto = _dialecto(db)
+    inicio, fin = datetime.combine(desde, time()), datetime.combine(hasta + timedelta(days=1), time())
+    for modelo, columna, unidad, limites in (
+        (VentaHora, "hora", "hora", (inicio, fin)),
+        (VentaDia, "fecha", "dia", (desde, hasta + timedelta(days=1))),
+    ):
+        periodo = _truncar(dialecto, Venta.fecha_hora, unidad)
+        await db.execute(delete(modelo).where(getattr(modelo, columna) >= limites[0], getattr(modelo, columna) < limites[1]))
+        origen = (
+            select(Venta.id_sucursal, periodo, Venta.id_producto, Producto.id_categoria, func.sum(Venta.cantidad), func.sum(Venta.total))
+            .join(Producto, Producto.id_producto == Venta.id_producto)
+            .where(Venta.fecha_hora >= inicio, Venta.fecha_hora < fin)
+            .group_by(Venta.id_sucursal, periodo, Venta.id_producto, Producto.id_categoria)
+        )
+        await db.execute(insert(modelo).from_select(["id_sucursal", columna, "id_producto", "id_categoria", "cantidad", "total"], origen))
+    await db.commit()
+
+
+async def _reconstruir_cli(desde, hasta):
+    async with AsyncSessionLocal() as db:
+        await reconstruir(db, desde, hasta)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recalcula los acumulados de ventas por hora y por dia desde la tabla venta")
+    parser.add_argument("--desde", type=date.fromisoformat, required=True, help="primer dia (AAAA-MM-DD)")
+    parser.add_argument("--hasta", type=date.fromisoformat, default=date.today(), help="ultimo dia (AAAA-MM-DD), por defecto hoy")
+    argumentos = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(_reconstruir_cli(argumentos.desde, argumentos.hasta))
+    print(f"Acumulados recalculados del {argumentos.desde} al {argumentos.hasta}")
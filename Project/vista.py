@@ -1,34 +1,81 @@
-import os, json, ast
-from fastapi import FastAPI, Depends, HTTPException, Path, UploadFile, File, Form
-from sqlalchemy import text
-from sqlalchemy.orm import Session
-from sqlalchemy.exc import NoResultFound
-from typing import List, Optional, Dict
-from conexion import crear, get_db
-from modelo import base, Usuario, RolUsuario, Restaurante, Sucursal
-from schemas import UsuarioSchema, UsuarioCreateSchema, UsuarioLoginSchema, RestauranteSchema, SucursalSchema, SucursalCreateSchema, SucursalUpdateSchema
+import os, json, ast, asyncio
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Depends, HTTPException, Path, UploadFile, File, Form, Query, Request, Response, BackgroundTasks, WebSocket, WebSocketDisconnect
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import text, select, update, delete, func
+from sqlalchemy.orm import selectinload
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.exc import NoResultFound, IntegrityError
+from typing import List, Optional, Dict, Literal
+from conexion import get_db, get_async_db, AsyncSessionLocal, crear_async
+from modelo import Usuario, RolUsuario, Restaurante, Sucursal, Pedido, DetallePedido, EstadoPedido, Producto, Categoria, Mesa, TipoPago
+from schemas import UsuarioSchema, UsuarioCreateSchema, UsuarioUpdateSchema, UsuarioLoginSchema, LoginRespuestaSchema, SesionSchema, RestauranteSchema, RestauranteArbolSchema, SucursalSchema, SucursalCreateSchema, SucursalUpdateSchema, PedidoSchema, PedidoCreateSchema, PedidoDetallesSchema, EstadoPedidoSchema, PedidoTotalSchema, DetallePedidoSchema, ProductoSchema, DisponibilidadSchema, MesaSchema, MesaUpdateSchema, SentarSchema, TrasladoSchema, TipoPagoSchema, LiquidacionSchema
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
+from fastapi.responses import PlainTextResponse, JSONResponse, StreamingResponse
 from datetime import date
+import metricas
+import cache
+import sesion
+import almacenamiento
+import imagenes
+import importacion
+import contrasenas
+import autenticacion
+import pedidos
+import pagos
+import ventas
+import exportacion
+import menu
+import mesas
+import eventos
+import idempotencia
+from autenticacion import requiere_rol, usuario_actual
+from configuracion import TOKEN_DURACION, RECONCILIACION_INTERVALO
+from perfil_sql import MiddlewarePerfilSQL
+from paginacion import paginar, columnas_solicitadas, LIMITE_POR_DEFECTO, LIMITE_MAXIMO
+
+@asynccontextmanager
+async def ciclo_de_vida(app):
+    tareas = [asyncio.create_task(autenticacion.refrescar_periodicamente())]
+    cache.iniciar()
+    tareas.append(asyncio.create_task(eventos.escuchar()))
+    if RECONCILIACION_INTERVALO > 0:
+        tareas.append(asyncio.create_task(pedidos.reconciliar_periodicamente()))
+    try:
+        yield
+    finally:
+        for tarea in tareas:
+            tarea.cancel()
+        await asyncio.gather(*tareas, return_exceptions=True)
+        contrasenas.cerrar()
+        await crear_async.dispose()
 
-app = FastAPI()
+app = FastAPI(lifespan=ciclo_de_vida)
 
 IMAGES_DIRECTORY = "imagenes"
-app.mount(f"/{IMAGES_DIRECTORY}", StaticFiles(directory=IMAGES_DIRECTORY), name="imagenes")
+app.mount(f"/{IMAGES_DIRECTORY}", almacenamiento.ArchivosEstaticos(directory=IMAGES_DIRECTORY), name="imagenes")
 
+# Van primero para quedar dentro de CORS: las respuestas repetidas y los 413 tambien llevan sus cabeceras
+app.add_middleware(idempotencia.MiddlewareIdempotencia)
+app.add_middleware(almacenamiento.MiddlewareLimiteSubida)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["http://localhost:5173"], 
     allow_credentials=True,
-    allow_methods=["GET", "POST", "PUT", "DELETE"],
+    allow_methods=["GET", "POST", "PUT", "PATCH", "DELETE"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Total-Count", "ETag", "X-Menu-Version"],
 )
+app.add_middleware(MiddlewarePerfilSQL)
+app.add_middleware(metricas.MiddlewareMetricas)
 
 @app.get("/")
 async def root():
     return {"message": "Servidor funcionando"}
 
-base.metadata.create_all(bind=crear)
+@app.get("/metrics", response_class=PlainTextResponse)
+async def obtener_metricas():
+    return metricas.exponer()
 
 
 
@@ -38,90 +85,145 @@ base.metadata.create_all(bind=crear)
 
 
 
-@app.post("/usuario", response_model=UsuarioCreateSchema, status_code=201)
-async def crear_usuario(usuario: UsuarioCreateSchema, db: Session = Depends(get_db)):
+@app.post("/usuario", response_model=UsuarioSchema, status_code=201)
+async def crear_usuario(usuario: UsuarioCreateSchema, db: AsyncSession = Depends(get_async_db)):
     nuevo_usuario = Usuario(**usuario.dict())
+    nuevo_usuario.password = await contrasenas.hashear(usuario.password)
     db.add(nuevo_usuario)
-    db.commit()
-    db.refresh(nuevo_usuario)
+    await db.commit()
+    await db.refresh(nuevo_usuario)
     return nuevo_usuario
 
-@app.post("/usuario/login", response_model=UsuarioLoginSchema)
-async def login(usuario: UsuarioLoginSchema, db: Session = Depends(get_db)):
-    db_usuario = (
-        db.query(Usuario)
-        .filter(Usuario.correo == usuario.correo, Usuario.password == usuario.password)
-        .first()
+async def _hashear_lote(filas):
+    hashes = await contrasenas.hashear_varios([fila["password"] for fila in filas])
+    return [{**fila, "password": hash_password} for fila, hash_password in zip(filas, hashes)]
+
+@app.post("/usuario/bulk", dependencies=[Depends(requiere_rol(RolUsuario.ADMINISTRADOR, RolUsuario.ADMINISTRADOR_SUCURSAL))])
+async def importar_usuarios(request: Request, db: AsyncSession = Depends(get_async_db)):
+    return await importacion.importar(
+        db, importacion.leer_filas(request), UsuarioCreateSchema, lambda usuario: usuario.dict(),
+        Usuario, unicos=[Usuario.documento, Usuario.correo], preparar_lote=_hashear_lote,
     )
+
+@app.post("/usuario/login", response_model=LoginRespuestaSchema)
+async def login(usuario: UsuarioLoginSchema, db: AsyncSession = Depends(get_async_db)):
+    resultado = await db.execute(select(Usuario).where(Usuario.correo == usuario.correo))
+    db_usuario = resultado.scalars().first()
     if not db_usuario:
         raise HTTPException(status_code=400, detail="Correo o contraseña incorrectos")
-    return db_usuario
+    valido, hash_nuevo = await contrasenas.verificar(usuario.password, db_usuario.password)
+    if not valido:
+        raise HTTPException(status_code=400, detail="Correo o contraseña incorrectos")
+    if hash_nuevo:
+        # Migracion transparente: texto plano antiguo o costo de bcrypt desactualizado
+        db_usuario.password = hash_nuevo
+        await db.commit()
+    # El token lleva el contexto del usuario para que las demas rutas no lo consulten
+    contexto = await sesion.consultar_contexto(db, usuario.correo)
+    return LoginRespuestaSchema(correo=usuario.correo, access_token=autenticacion.emitir_token(contexto), expira_en=TOKEN_DURACION)
+
+@app.post("/usuario/logout", status_code=204)
+async def logout(token: dict = Depends(usuario_actual), db: AsyncSession = Depends(get_async_db)):
+    await autenticacion.revocar(db, token)
+
+@app.get("/session/bootstrap", response_model=SesionSchema)
+async def obtener_contexto_sesion(correo: str, request: Request, db: AsyncSession = Depends(get_async_db)):
+    contexto = await sesion.consultar_contexto(db, correo)
+    if not contexto:
+        raise HTTPException(status_code=404, detail="Usuario no encontrado")
+    etag = sesion.calcular_etag(contexto)
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    return JSONResponse(jsonable_encoder(SesionSchema(**contexto)), headers={"ETag": etag})
 
 @app.get("/usuario/correo/{correo}", response_model=str)
-async def obtener_usuario_por_correo(correo: str, db: Session = Depends(get_db)):
-    db_usuario = db.query(Usuario).filter(Usuario.correo == correo).first()
+async def obtener_usuario_por_correo(correo: str, db: AsyncSession = Depends(get_async_db)):
+    resultado = await db.execute(select(Usuario).where(Usuario.correo == correo))
+    db_usuario = resultado.scalars().first()
     if not db_usuario:
         raise HTTPException(status_code=404, detail="Usuario no encontrado")
     return db_usuario.documento
 
 @app.get("/usuario/sucursal/{documento}", response_model=str)
-async def obtener_sucursal_por_documento(documento: str, db: Session = Depends(get_db)):
-    db_usuario = db.query(Usuario).filter(Usuario.documento == documento).first()
-    if not db_usuario:
-        raise HTTPException(status_code=404, detail="Usuario no encontrado")
-    return db_usuario.sucursal
+async def obtener_sucursal_por_documento(documento: str, db: AsyncSession = Depends(get_async_db)):
+    async def cargar():
+        db_usuario = await db.get(Usuario, documento)
+        if not db_usuario:
+            raise HTTPException(status_code=404, detail="Usuario no encontrado")
+        return db_usuario.sucursal
+    return await cache.consultar(f"usuario:sucursal:{documento}", cargar)
 
 @app.get("/usuario/documento/{correo}", response_model=RolUsuario)
-async def obtener_rol_por_correo(correo: str, db: Session = Depends(get_db)):
-    db_usuario = db.query(Usuario).filter(Usuario.correo == correo).first()
-    if not db_usuario:
-        raise HTTPException(status_code=404, detail="Usuario no encontrado")
-    return db_usuario.rol
+async def obtener_rol_por_correo(correo: str, db: AsyncSession = Depends(get_async_db)):
+    async def cargar():
+        resultado = await db.execute(select(Usuario.rol).where(Usuario.correo == correo))
+        rol = resultado.scalar()
+        if not rol:
+            raise HTTPException(status_code=404, detail="Usuario no encontrado")
+        return rol.value
+    return RolUsuario(await cache.consultar(f"usuario:rol:{correo}", cargar))
 
 @app.get("/usuario", response_model=List[UsuarioSchema])
-async def listar_usuarios(db: Session = Depends(get_db)):
-    usuarios = db.query(Usuario).all()
-    return usuarios
+async def listar_usuarios(
+    limit: int = Query(LIMITE_POR_DEFECTO, ge=1, le=LIMITE_MAXIMO),
+    after: Optional[str] = None,
+    fields: Optional[str] = None,
+    total: bool = False,
+    db: AsyncSession = Depends(get_async_db),
+):
+    usuarios, cabeceras = await paginar(db, Usuario, UsuarioSchema, Usuario.documento, limit=limit, after=after, fields=fields, total=total)
+    return JSONResponse(jsonable_encoder(usuarios), headers=cabeceras)
 
 @app.get("/usuario/sucursales/{sucursal}", response_model=List[UsuarioSchema], status_code=200)
-async def listar_usuarios_por_sucursal(sucursal: str, db: Session = Depends(get_db)):
-    usuarios = db.query(Usuario).filter(Usuario.sucursal == sucursal).all()
+async def listar_usuarios_por_sucursal(sucursal: str, db: AsyncSession = Depends(get_async_db)):
+    resultado = await db.execute(select(Usuario).where(Usuario.sucursal == sucursal))
+    usuarios = resultado.scalars().all()
     if not usuarios:
         raise HTTPException(status_code=404, detail="No se encontraron usuarios para esta sucursal")
     return usuarios
 
 @app.get("/usuario/{id}", response_model=UsuarioSchema)
-async def obtener_usuario_por_id(id: str, db: Session = Depends(get_db)):
-    db_usuario = db.query(Usuario).filter(Usuario.documento == id).first()
+async def obtener_usuario_por_id(id: str, db: AsyncSession = Depends(get_async_db)):
+    db_usuario = await db.get(Usuario, id)
     if not db_usuario:
         raise HTTPException(status_code=404, detail="Usuario no encontrado")
     return db_usuario
 
 @app.get("/usuario/nombre/{id}", response_model=str)
-async def obtener_nombre_por_documento(id: str, db: Session = Depends(get_db)):
-    db_usuario = db.query(Usuario).filter(Usuario.documento == id).first()
-    if not db_usuario:
-        raise HTTPException(status_code=404, detail="Usuario no encontrado")
-    return db_usuario.nombre
+async def obtener_nombre_por_documento(id: str, db: AsyncSession = Depends(get_async_db)):
+    async def cargar():
+        db_usuario = await db.get(Usuario, id)
+        if not db_usuario:
+            raise HTTPException(status_code=404, detail="Usuario no encontrado")
+        return db_usuario.nombre
+    return await cache.consultar(f"usuario:nombre:{id}", cargar)
 
 @app.put("/usuario/{id}", response_model=UsuarioSchema)
-async def actualizar_usuario(id: str, usuario: UsuarioCreateSchema, db: Session = Depends(get_db)):
-    db_usuario = db.query(Usuario).filter(Usuario.documento == id).first()
+async def actualizar_usuario(id: str, usuario: UsuarioUpdateSchema, db: AsyncSession = Depends(get_async_db)):
+    db_usuario = await db.get(Usuario, id)
     if not db_usuario:
         raise HTTPException(status_code=404, detail="Usuario no encontrado")
-    for key, value in usuario.dict().items():
+    claves = cache.claves_de(db_usuario)
+    datos = usuario.dict()
+    if datos["password"] is None:
+        del datos["password"]
+    else:
+        datos["password"] = await contrasenas.hashear(datos["password"])
+    for key, value in datos.items():
         setattr(db_usuario, key, value)
-    db.commit()
-    db.refresh(db_usuario)
+    await db.commit()
+    await cache.invalidar(*claves, *cache.claves_de(db_usuario))
+    await db.refresh(db_usuario)
     return db_usuario
 
 @app.delete("/usuario/{id}", status_code=204)
-async def eliminar_usuario(id: str, db: Session = Depends(get_db)):
-    db_usuario = db.query(Usuario).filter(Usuario.documento == id).first()
+async def eliminar_usuario(id: str, db: AsyncSession = Depends(get_async_db)):
+    db_usuario = await db.get(Usuario, id)
     if not db_usuario:
         raise HTTPException(status_code=404, detail="Usuario no encontrado")
-    db.delete(db_usuario)
-    db.commit()
+    await db.delete(db_usuario)
+    await db.commit()
+    await cache.invalidar(*cache.claves_de(db_usuario))
 
 
 
@@ -135,6 +237,7 @@ async def eliminar_usuario(id: str, db: Session = Depends(get_db)):
 
 @app.post("/restaurante", response_model=RestauranteSchema, status_code=201)
 async def registrar_restaurante(
+    tareas: BackgroundTasks,
     id: str = Form(...),
     nombre: str = Form(...),
     descripcion: str = Form(...),
@@ -145,9 +248,9 @@ async def registrar_restaurante(
     fecha_creacion: str = Form(...),
     fecha_finalizacion: str = Form(...),
     estado: str = Form(...),
-    usuario: str = Form(...),  
-    db: Session = Depends(get_db),
-):  
+    usuario: str = Form(...),
+    db: AsyncSession = Depends(get_async_db),
+):
     
     try:
         usuario_data = json.loads(usuario)  
@@ -170,58 +273,92 @@ async def registrar_restaurante(
     )
 
     if imagen:
-        nombre_imagen = f"{nuevo_restaurante.id}-{imagen.filename}"
-        ruta_imagen = os.path.join(IMAGES_DIRECTORY, "restaurantes", nombre_imagen)
-        os.makedirs(os.path.dirname(ruta_imagen), exist_ok=True)
-        with open(ruta_imagen, "wb") as buffer:
-            buffer.write(await imagen.read())
+        nombre_imagen = await almacenamiento.guardar_subida(imagen, os.path.join(IMAGES_DIRECTORY, "restaurantes"))
         nuevo_restaurante.imagen = f"/{IMAGES_DIRECTORY}/restaurantes/{nombre_imagen}"
 
     db.add(nuevo_restaurante)
-    db.commit()
-    db.refresh(nuevo_restaurante)
+    await db.commit()
+    await db.refresh(nuevo_restaurante)
+    if imagen:
+        tareas.add_task(imagenes.procesar_restaurante, nuevo_restaurante.id)
     return nuevo_restaurante
 
 @app.get("/restaurante", response_model=List[RestauranteSchema])
-async def listar_restaurantes(db: Session = Depends(get_db)):
-    restaurantes = db.query(Restaurante).all()
-    return restaurantes
+async def listar_restaurantes(
+    limit: int = Query(LIMITE_POR_DEFECTO, ge=1, le=LIMITE_MAXIMO),
+    after: Optional[str] = None,
+    fields: Optional[str] = None,
+    total: bool = False,
+    include: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
+):
+    if include not in (None, "sucursales"):
+        raise HTTPException(status_code=400, detail="Solo se admite include=sucursales")
+    if include and fields and "id" not in columnas_solicitadas(RestauranteSchema, fields):
+        fields += ",id"
+    restaurantes, cabeceras = await paginar(db, Restaurante, RestauranteSchema, Restaurante.id, limit=limit, after=after, fields=fields, total=total)
+    if include and restaurantes:
+        # Una sola consulta IN para las sucursales de toda la pagina (la misma estrategia de selectinload)
+        campos = columnas_solicitadas(SucursalSchema, None)
+        resultado = await db.execute(
+            select(Sucursal.id_restaurante, *[getattr(Sucursal, campo) for campo in campos])
+            .where(Sucursal.id_restaurante.in_([restaurante["id"] for restaurante in restaurantes]))
+            .order_by(Sucursal.id)
+        )
+        por_restaurante = {}
+        for fila in resultado:
+            por_restaurante.setdefault(fila.id_restaurante, []).append({campo: getattr(fila, campo) for campo in campos})
+        for restaurante in restaurantes:
+            restaurante["sucursales"] = por_restaurante.get(restaurante["id"], [])
+    return JSONResponse(jsonable_encoder(restaurantes), headers=cabeceras)
 
 
 @app.get("/restaurante/{id}", response_model=RestauranteSchema)
-async def obtener_restaurante_por_id(id: str, db: Session = Depends(get_db)):
-    restaurante = db.query(Restaurante).filter(Restaurante.id == id).first()
+async def obtener_restaurante_por_id(id: str, db: AsyncSession = Depends(get_async_db)):
+    restaurante = await db.get(Restaurante, id)
     if not restaurante:
         raise HTTPException(status_code=404, detail="Restaurante no encontrado")
     return restaurante
 
 
-@app.get("/restaurante/id_usuario/{id_usuario}", response_model=str)
-async def obtener_id_usuario(id_usuario: str, db: Session = Depends(get_db)):
-    restaurante = db.query(Restaurante).filter(Restaurante.id_usuario == id_usuario).first()
+@app.get("/restaurante/{id}/arbol", response_model=RestauranteArbolSchema)
+async def obtener_arbol_restaurante(id: str, db: AsyncSession = Depends(get_async_db)):
+    restaurante = await db.get(Restaurante, id, options=[selectinload(Restaurante.sucursales)])
     if not restaurante:
+        raise HTTPException(status_code=404, detail="Restaurante no encontrado")
+    return restaurante
+
+
+@app.get("/restaurante/id_usuario/{id_usuario}", response_model=str)
+async def obtener_id_usuario(id_usuario: str, db: AsyncSession = Depends(get_async_db)):
+    resultado = await db.execute(select(Restaurante.id).where(Restaurante.id_usuario == id_usuario).limit(1))
+    id_restaurante = resultado.scalar()
+    if not id_restaurante:
         raise HTTPException(status_code=404, detail="Restaurante no encontrado para este usuario")
-    return restaurante.id
+    return id_restaurante
 
 @app.get("/restaurante/nombre/{id_restaurante}", response_model=str)
-async def obtener_nombre_del_restaurante(id_restaurante: str, db: Session = Depends(get_db)):
-    restaurante = db.query(Restaurante).filter(Restaurante.id == id_restaurante).first()
-    if not restaurante:
-        raise HTTPException(status_code=404, detail="No se encontró el nombre del restaurante")
-    return restaurante.nombre
+async def obtener_nombre_del_restaurante(id_restaurante: str, db: AsyncSession = Depends(get_async_db)):
+    async def cargar():
+        restaurante = await db.get(Restaurante, id_restaurante)
+        if not restaurante:
+            raise HTTPException(status_code=404, detail="No se encontró el nombre del restaurante")
+        return restaurante.nombre
+    return await cache.consultar(f"restaurante:nombre:{id_restaurante}", cargar)
 
 @app.put("/restaurante/{id}", response_model=RestauranteSchema)
 async def actualizar_restaurante(
     id: str,
+    tareas: BackgroundTasks,
     nombre: str = Form(...),
     descripcion: str = Form(...),
     telefono: str = Form(...),
     direccion: str = Form(...),
     correo: str = Form(...),
-    imagen: UploadFile = File(None), 
-    db: Session = Depends(get_db),
+    imagen: UploadFile = File(None),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    db_restaurante = db.query(Restaurante).filter(Restaurante.id == id).first()
+    db_restaurante = await db.get(Restaurante, id)
     if not db_restaurante:
         raise HTTPException(status_code=404, detail="Restaurante no encontrado")
 
@@ -232,33 +369,33 @@ async def actualizar_restaurante(
     db_restaurante.correo = correo
 
     if imagen:
-        if db_restaurante.imagen:
-            ruta_actual = db_restaurante.imagen.lstrip("/")
-            if os.path.exists(ruta_actual):
-                os.remove(ruta_actual)
-
-        nombre_imagen = f"{db_restaurante.id}-{imagen.filename}"
-        ruta_imagen = os.path.join(IMAGES_DIRECTORY, "restaurantes", nombre_imagen)
-        os.makedirs(os.path.dirname(ruta_imagen), exist_ok=True)  
-        with open(ruta_imagen, "wb") as buffer:
-            buffer.write(await imagen.read())
+        nombre_imagen = await almacenamiento.guardar_subida(imagen, os.path.join(IMAGES_DIRECTORY, "restaurantes"))
+        imagen_anterior = db_restaurante.imagen
         db_restaurante.imagen = f"/{IMAGES_DIRECTORY}/restaurantes/{nombre_imagen}"
-
-    db.commit()
-    db.refresh(db_restaurante)
+        if imagen_anterior != db_restaurante.imagen:
+            db_restaurante.variantes = None
+            tareas.add_task(imagenes.procesar_restaurante, db_restaurante.id)
+            # La imagen anterior puede seguir en uso por otro restaurante; se borra solo si queda huerfana
+            if imagen_anterior:
+                tareas.add_task(imagenes.liberar_imagen, imagen_anterior)
+
+    await db.commit()
+    await cache.invalidar(*cache.claves_de(db_restaurante))
+    await db.refresh(db_restaurante)
     return db_restaurante
 
 @app.delete("/restaurante/{id}", status_code=204)
-async def eliminar_restaurante(id: str, db: Session = Depends(get_db)):
-    db_restaurante = db.query(Restaurante).filter(Restaurante.id == id).first()
+async def eliminar_restaurante(id: str, tareas: BackgroundTasks, db: AsyncSession = Depends(get_async_db)):
+    # Las sucursales se cargan de una vez para que el borrado en cascada no haga lazy load
+    db_restaurante = await db.get(Restaurante, id, options=[selectinload(Restaurante.sucursales)])
     if not db_restaurante:
         raise HTTPException(status_code=404, detail="Restaurante no encontrado")
 
-    if db_restaurante.imagen and os.path.exists(db_restaurante.imagen):
-        os.remove(db_restaurante.imagen)
-
-    db.delete(db_restaurante)
-    db.commit()
+    await db.delete(db_restaurante)
+    await db.commit()
+    if db_restaurante.imagen:
+        tareas.add_task(imagenes.liberar_imagen, db_restaurante.imagen)
+    await cache.invalidar(*cache.claves_de(db_restaurante), *(clave for sucursal in db_restaurante.sucursales for clave in cache.claves_de(sucursal)))
 
 
 
@@ -269,7 +406,7 @@ async def eliminar_restaurante(id: str, db: Session = Depends(get_db)):
 
 
 @app.post("/sucursal", response_model=SucursalSchema, status_code=201)
-async def crear_sucursal(sucursal: SucursalCreateSchema, db: Session = Depends(get_db)):
+async def crear_sucursal(sucursal: SucursalCreateSchema, db: AsyncSession = Depends(get_async_db)):
    
     nueva_sucursal = Sucursal(
         id=sucursal.id,
@@ -283,328 +420,585 @@ async def crear_sucursal(sucursal: SucursalCreateSchema, db: Session = Depends(g
         id_restaurante=sucursal.restaurante.get("id")
     )
     db.add(nueva_sucursal)
-    db.commit()
-    db.refresh(nueva_sucursal)
+    await db.commit()
+    await db.refresh(nueva_sucursal)
     return nueva_sucursal
 
+def _valores_sucursal(sucursal):
+    valores = sucursal.dict(exclude={"restaurante"})
+    valores["id_restaurante"] = sucursal.restaurante.get("id")
+    return valores
+
+async def _filas_sucursal(filas):
+    # En CSV/NDJSON se admite la columna plana id_restaurante en lugar del objeto restaurante
+    async for numero, fila in filas:
+        if isinstance(fila, dict) and "restaurante" not in fila and "id_restaurante" in fila:
+            fila = {**fila, "restaurante": {"id": fila["id_restaurante"]}}
+        yield numero, fila
+
+@app.post("/sucursal/bulk", dependencies=[Depends(requiere_rol(RolUsuario.ADMINISTRADOR))])
+async def importar_sucursales(request: Request, db: AsyncSession = Depends(get_async_db)):
+    return await importacion.importar(
+        db, _filas_sucursal(importacion.leer_filas(request)), SucursalCreateSchema, _valores_sucursal,
+        Sucursal, unicos=[Sucursal.id], referencias={"id_restaurante": Restaurante.id},
+    )
+
 @app.get("/sucursal/id_usuario/{administrador}", response_model=str)
-async def obtener_sucursal_por_administrador(administrador: str, db: Session = Depends(get_db)):
-    sucursal = db.query(Sucursal).filter(Sucursal.administrador == administrador).first()
-    if not sucursal:
-        raise HTTPException(status_code=404, detail="No se encontró una sucursal para este administrador")
-    return sucursal.id
+async def obtener_sucursal_por_administrador(administrador: str, db: AsyncSession = Depends(get_async_db)):
+    async def cargar():
+        resultado = await db.execute(select(Sucursal.id).where(Sucursal.administrador == administrador).limit(1))
+        id_sucursal = resultado.scalar()
+        if not id_sucursal:
+            raise HTTPException(status_code=404, detail="No se encontró una sucursal para este administrador")
+        return id_sucursal
+    return await cache.consultar(f"sucursal:administrador:{administrador}", cargar)
 
 @app.get("/sucursal/{id_sucursal}", response_model=SucursalSchema)
-async def obtener_sucursal(id_sucursal: str, db: Session = Depends(get_db)):
-    sucursal = db.query(Sucursal).filter(Sucursal.id == id_sucursal).first()
+async def obtener_sucursal(id_sucursal: str, db: AsyncSession = Depends(get_async_db)):
+    sucursal = await db.get(Sucursal, id_sucursal)
     if not sucursal:
         raise HTTPException(status_code=404, detail="Sucursal no encontrada")
     return sucursal
 
 @app.put("/sucursal/{id_sucursal}", response_model=SucursalSchema)
-async def actualizar_sucursal(id_sucursal: str, sucursal: SucursalUpdateSchema, db: Session = Depends(get_db)):
-    db_sucursal = db.query(Sucursal).filter(Sucursal.id == id_sucursal).first()
+async def actualizar_sucursal(id_sucursal: str, sucursal: SucursalUpdateSchema, db: AsyncSession = Depends(get_async_db)):
+    db_sucursal = await db.get(Sucursal, id_sucursal)
     if not db_sucursal:
         raise HTTPException(status_code=404, detail="Sucursal no encontrada")
-    
+
+    claves = cache.claves_de(db_sucursal)
     for key, value in sucursal.dict(exclude_unset=True).items():
         setattr(db_sucursal, key, value)
-    
-    db.commit()
-    db.refresh(db_sucursal)
+
+    await db.commit()
+    await cache.invalidar(*claves, *cache.claves_de(db_sucursal))
+    await db.refresh(db_sucursal)
     return db_sucursal
 
 @app.delete("/sucursal/{id_sucursal}", status_code=204)
-async def eliminar_sucursal(id_sucursal: str, db: Session = Depends(get_db)):
-    db_sucursal = db.query(Sucursal).filter(Sucursal.id == id_sucursal).first()
+async def eliminar_sucursal(id_sucursal: str, db: AsyncSession = Depends(get_async_db)):
+    db_sucursal = await db.get(Sucursal, id_sucursal)
     if not db_sucursal:
         raise HTTPException(status_code=404, detail="Sucursal no encontrada")
     
-    db.delete(db_sucursal)
-    db.commit()
+    await db.delete(db_sucursal)
+    await db.commit()
+    await cache.invalidar(*cache.claves_de(db_sucursal))
 
 @app.get("/sucursal/restaurante/{id_restaurante}", response_model=List[SucursalSchema])
-async def obtener_sucursales_por_restaurante(id_restaurante: str, db: Session = Depends(get_db)):
-    sucursales = db.query(Sucursal).filter(Sucursal.id_restaurante == id_restaurante).all()
-    if not sucursales:
+async def obtener_sucursales_por_restaurante(
+    id_restaurante: str,
+    limit: int = Query(LIMITE_POR_DEFECTO, ge=1, le=LIMITE_MAXIMO),
+    after: Optional[str] = None,
+    fields: Optional[str] = None,
+    total: bool = False,
+    db: AsyncSession = Depends(get_async_db),
+):
+    sucursales, cabeceras = await paginar(
+        db, Sucursal, SucursalSchema, Sucursal.id, filtros=[Sucursal.id_restaurante == id_restaurante],
+        limit=limit, after=after, fields=fields, total=total,
+    )
+    if not sucursales and not after:
         raise HTTPException(status_code=404, detail="No se encontraron sucursales para este restaurante")
-    return sucursales
-
+    return JSONResponse(jsonable_encoder(sucursales), headers=cabeceras)
 
 
 
 
-# /////////////////////////////////DETALLE DE PEDIDO ////////////////////////////////////////
 
 
+# /////////////////////////////////DETALLE DE PEDIDO ////////////////////////////////////////
 
-
-'''@app.post("/detalles-pedido", response_model=DetallePedidoSchema, status_code=201)
-async def crear_detalle_pedido(detalle: DetallePedidoSchema, db: Session = Depends(get_db)):
-    nuevo_detalle = DetallePedido(**detalle.dict())
-    db.add(nuevo_detalle)
-    db.commit()
-    db.refresh(nuevo_detalle)
-    return nuevo_detalle
+@app.post("/detalles-pedido", response_model=DetallePedidoSchema, status_code=201)
+async def crear_detalle_pedido(detalle: DetallePedidoSchema, db: AsyncSession = Depends(get_async_db)):
+    return await pedidos.agregar_detalle(db, detalle.dict())
 
 @app.put("/detalles-pedido/{id}", response_model=DetallePedidoSchema)
-async def actualizar_detalle_pedido(id: int, detalle: DetallePedidoSchema, db: Session = Depends(get_db)):
-    db_detalle = db.query(DetallePedido).filter(DetallePedido.id_detalle_pedido == id).first()
-    if not db_detalle:
-        raise HTTPException(status_code=404, detail="Detalle de pedido no encontrado")
-
-    for key, value in detalle.dict(exclude_unset=True).items():
-        setattr(db_detalle, key, value)
-
-    db.commit()
-    db.refresh(db_detalle)
-    return db_detalle
+async def actualizar_detalle_pedido(id: int, detalle: DetallePedidoSchema, db: AsyncSession = Depends(get_async_db)):
+    await pedidos.actualizar_detalle(db, id, detalle.dict(exclude_unset=True))
+    return await db.get(DetallePedido, id)
 
 @app.get("/detalles-pedido/{id}", response_model=DetallePedidoSchema)
-async def obtener_detalle_por_id(id: int, db: Session = Depends(get_db)):
-    detalle = db.query(DetallePedido).filter(DetallePedido.id_detalle_pedido == id).first()
+async def obtener_detalle_por_id(id: int, db: AsyncSession = Depends(get_async_db)):
+    detalle = await db.get(DetallePedido, id)
     if not detalle:
         raise HTTPException(status_code=404, detail="Detalle de pedido no encontrado")
     return detalle
 
 @app.get("/detalles-pedido/pedidos/{id_pedido}", response_model=List[DetallePedidoSchema])
-async def obtener_detalle_por_id_pedido(id_pedido: int, db: Session = Depends(get_db)):
-    detalles = db.query(DetallePedido).filter(DetallePedido.id_pedido == id_pedido).all()
-    return detalles
+async def obtener_detalle_por_id_pedido(id_pedido: int, db: AsyncSession = Depends(get_async_db)):
+    detalles = await db.scalars(select(DetallePedido).where(DetallePedido.id_pedido == id_pedido))
+    return detalles.all()
 
 @app.get("/detalles-pedido", response_model=List[DetallePedidoSchema])
-async def obtener_todos_los_detalles(db: Session = Depends(get_db)):
-    detalles = db.query(DetallePedido).all()
-    return detalles
+async def obtener_todos_los_detalles(
+    limit: int = Query(LIMITE_POR_DEFECTO, ge=1, le=LIMITE_MAXIMO),
+    after: Optional[str] = None,
+    fields: Optional[str] = None,
+    total: bool = False,
+    db: AsyncSession = Depends(get_async_db),
+):
+    detalles, cabeceras = await paginar(
+        db, DetallePedido, DetallePedidoSchema, DetallePedido.id_detalle_pedido,
+        limit=limit, after=after, fields=fields, total=total,
+    )
+    return JSONResponse(jsonable_encoder(detalles), headers=cabeceras)
 
 @app.delete("/detalles-pedido/{id}", status_code=204)
-async def eliminar_detalle_pedido(id: int, db: Session = Depends(get_db)):
-    db_detalle = db.query(DetallePedido).filter(DetallePedido.id_detalle_pedido == id).first()
-    if not db_detalle:
-        raise HTTPException(status_code=404, detail="Detalle de pedido no encontrado")
-
-    db.delete(db_detalle)
-    db.commit()
-    return
+async def eliminar_detalle_pedido(id: int, db: AsyncSession = Depends(get_async_db)):
+    await pedidos.eliminar_detalle(db, id)
 
 
 
 
 #  ////////////////////////// Pedido ////////////////////
 
-@app.post("/pedidos", response_model=PedidoSchema, status_code=201)
-async def crear_pedido(pedido: PedidoSchema, db: Session = Depends(get_db)):
-    nuevo_pedido = Pedido(**pedido.dict())
-    db.add(nuevo_pedido)
-    db.commit()
-    db.refresh(nuevo_pedido)
-    return nuevo_pedido
+@app.post("/pedidos", response_model=PedidoDetallesSchema, status_code=201)
+async def crear_pedido(pedido: PedidoCreateSchema, db: AsyncSession = Depends(get_async_db)):
+    datos = pedido.dict(exclude={"detalles"})
+    id_pedido, total_pedido, detalles = await pedidos.crear_pedido(db, datos, [detalle.dict() for detalle in pedido.detalles])
+    return {**datos, "id_pedido": id_pedido, "estado": EstadoPedido.ORDENADO, "total_pedido": total_pedido, "detalles": detalles}
+
+@app.put("/pedidos/{id}/estado", response_model=EstadoPedidoSchema)
+async def cambiar_estado_pedido(id: int, cambio: EstadoPedidoSchema, db: AsyncSession = Depends(get_async_db)):
+    await pedidos.cambiar_estado(db, id, cambio.estado)
+    return cambio
 
 @app.put("/pedidos/{id}", response_model=PedidoSchema)
-async def actualizar_pedido(id: int, pedido_datos: PedidoSchema, db: Session = Depends(get_db)):
-    db_pedido = db.query(Pedido).filter(Pedido.id_pedido == id).first()
+async def actualizar_pedido(id: int, pedido_datos: PedidoSchema, db: AsyncSession = Depends(get_async_db)):
+    # El estado solo cambia por /pedidos/{id}/estado, que valida la transicion,
+    # el total lo mantienen las lineas del pedido y la mesa, /mesas/{id}/sentar y /mesas/trasladar
+    valores = pedido_datos.dict(exclude_unset=True, exclude={"id_pedido", "estado", "total_pedido", "id_mesa"})
+    if valores:
+        await db.execute(update(Pedido).where(Pedido.id_pedido == id).values(**valores))
+
+    db_pedido = await db.get(Pedido, id)
     if not db_pedido:
         raise HTTPException(status_code=404, detail="Pedido no encontrado")
-
-    for key, value in pedido_datos.dict(exclude_unset=True).items():
-        setattr(db_pedido, key, value)
-
-    db.commit()
-    db.refresh(db_pedido)
+    if valores:
+        eventos.encolar(db, db_pedido.sucursal, "pedido_actualizado", {"id_pedido": id, **valores})
+        await db.commit()
     return db_pedido
 
+@app.get("/pedidos/{id}/total", response_model=PedidoTotalSchema)
+async def obtener_total_pedido(id: int, db: AsyncSession = Depends(get_async_db)):
+    fila = (await db.execute(select(Pedido.id_pedido, func.coalesce(Pedido.total_pedido, 0).label("total_pedido")).where(Pedido.id_pedido == id))).first()
+    if not fila:
+        raise HTTPException(status_code=404, detail="Pedido no encontrado")
+    return fila._mapping
+
 @app.get("/pedidos/{id}", response_model=PedidoSchema)
-async def obtener_pedido(id: int, db: Session = Depends(get_db)):
-    db_pedido = db.query(Pedido).filter(Pedido.id_pedido == id).first()
+async def obtener_pedido(id: int, db: AsyncSession = Depends(get_async_db)):
+    db_pedido = await db.get(Pedido, id)
     if not db_pedido:
         raise HTTPException(status_code=404, detail="Pedido no encontrado")
     return db_pedido
 
 @app.get("/pedidos", response_model=List[PedidoSchema])
-async def obtener_todos_los_pedidos(db: Session = Depends(get_db)):
-    pedidos = db.query(Pedido).all()
-    return pedidos
+async def obtener_todos_los_pedidos(
+    sucursal: Optional[str] = None,
+    estado: Optional[EstadoPedido] = None,
+    limit: int = Query(LIMITE_POR_DEFECTO, ge=1, le=LIMITE_MAXIMO),
+    after: Optional[str] = None,
+    fields: Optional[str] = None,
+    total: bool = False,
+    db: AsyncSession = Depends(get_async_db),
+):
+    filtros = []
+    if sucursal:
+        filtros.append(Pedido.sucursal == sucursal)
+    if estado:
+        filtros.append(Pedido.estado == estado)
+    lista, cabeceras = await paginar(
+        db, Pedido, PedidoSchema, Pedido.id_pedido, filtros=filtros,
+        limit=limit, after=after, fields=fields, total=total,
+    )
+    return JSONResponse(jsonable_encoder(lista), headers=cabeceras)
 
 @app.delete("/pedidos/{id}", status_code=204)
-async def eliminar_pedido(id: int, db: Session = Depends(get_db)):
-    db_pedido = db.query(Pedido).filter(Pedido.id_pedido == id).first()
-    if not db_pedido:
+async def eliminar_pedido(id: int, db: AsyncSession = Depends(get_async_db)):
+    # Se bloquea el pedido para que no lo paguen mientras se elimina
+    pedido = (await db.execute(select(Pedido.sucursal, Pedido.estado).where(Pedido.id_pedido == id).with_for_update())).first()
+    if pedido is None:
         raise HTTPException(status_code=404, detail="Pedido no encontrado")
+    # Un pedido pagado tiene ventas y liquidacion que lo referencian
+    if pedido.estado == EstadoPedido.PAGADO:
+        await db.rollback()
+        raise HTTPException(status_code=409, detail="Un pedido pagado no se puede eliminar")
 
-    db.delete(db_pedido)
-    db.commit()
-    return
+    await mesas.liberar_pedidos(db, [id])
+    try:
+        await db.execute(delete(DetallePedido).where(DetallePedido.id_pedido == id))
+        await db.execute(delete(Pedido).where(Pedido.id_pedido == id))
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(status_code=409, detail="El pedido tiene registros que dependen de él")
+    eventos.encolar(db, pedido.sucursal, "pedido_eliminado", {"id_pedido": id})
+    await db.commit()
+
+
+
+#  ////////////////////////// EVENTOS EN TIEMPO REAL ////////////////////
+# Pantallas de cocina y meseros: reciben los cambios de pedidos de su sucursal al confirmarse
+
+@app.websocket("/ws/sucursal/{sucursal}")
+async def eventos_websocket(websocket: WebSocket, sucursal: str, token: str = Query(...)):
+    # El navegador no deja poner cabeceras en un WebSocket, por eso el token va en la URL
+    try:
+        sesion_token = autenticacion.verificar_token(token)
+    except HTTPException:
+        await websocket.close(code=1008)
+        return
+    async with AsyncSessionLocal() as db:
+        permitido = await eventos.puede_ver(db, sesion_token, sucursal)
+    if not permitido:
+        await websocket.close(code=1008)
+        return
+
+    await websocket.accept()
+    suscripcion = eventos.suscribir(sucursal, "websocket")
+    try:
+        while True:
+            mensaje = await suscripcion.siguiente()
+            await websocket.send_text(mensaje if mensaje is not None else '{"tipo":"latido"}')
+    except WebSocketDisconnect:
+        pass
+    finally:
+        eventos.cancelar(suscripcion, "websocket")
+
+@app.get("/eventos/sucursal/{sucursal}")
+async def eventos_sse(sucursal: str, sesion_token: dict = Depends(usuario_actual), db: AsyncSession = Depends(get_async_db)):
+    if not await eventos.puede_ver(db, sesion_token, sucursal):
+        raise HTTPException(status_code=403, detail="No tiene permisos para esta sucursal")
+    # La conexion vuelve al pool ya: el flujo puede durar horas y no la necesita
+    await db.close()
+    return StreamingResponse(
+        eventos.flujo_sse(sucursal),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+
+#  ////////////////////////// MESAS ////////////////////
+# La ocupacion se cambia con UPDATE condicionales; las lecturas salen del plano en memoria
+
+@app.get("/mesas/{nit}")
+async def obtener_mesas(nit: str):
+    return (await mesas.obtener(nit)).de_tipo("Fisica")
+
+@app.get("/mesarapida/{nit}")
+async def obtener_mesa_rapida(nit: str):
+    return (await mesas.obtener(nit)).de_tipo("Rapida")
+
+@app.get("/piso/{id_sucursal}")
+async def obtener_piso(id_sucursal: str, db: AsyncSession = Depends(get_async_db)):
+    # Todo lo que necesita la pantalla del salon en una sola respuesta
+    return await mesas.piso(db, id_sucursal)
+
+@app.post("/mesas/{id}/sentar")
+async def sentar_en_mesa(id: int, datos: SentarSchema, db: AsyncSession = Depends(get_async_db)):
+    return await mesas.sentar(db, id, datos.id_pedido)
+
+@app.post("/mesas/trasladar")
+async def trasladar_mesa(traslado: TrasladoSchema, db: AsyncSession = Depends(get_async_db)):
+    return await mesas.trasladar(db, traslado.origen, traslado.destino)
+
+@app.post("/mesas/{id}/liberar")
+async def liberar_mesa(id: int, db: AsyncSession = Depends(get_async_db)):
+    return await mesas.liberar(db, id)
+
+@app.post("/registrar_mesa")
+async def registrar_mesa(mesa: MesaSchema, db: AsyncSession = Depends(get_async_db)):
+    # Verificar si ya existe una mesa con el mismo nombre
+    existente = await db.scalar(select(Mesa.id).where(Mesa.nombre == mesa.nombre, Mesa.id_sucursal == mesa.id_sucursal))
+    if existente:
+        raise HTTPException(status_code=400, detail="El nombre de la mesa ya existe")
+
+    nueva_mesa = Mesa(nombre=mesa.nombre, estado=mesa.estado, id_sucursal=mesa.id_sucursal)
+    db.add(nueva_mesa)
+    await db.flush()
+    await mesas.notificar(db, mesa.id_sucursal, "mesa_creada", [nueva_mesa.id])
+    await db.commit()
+    return {
+        "id": nueva_mesa.id,
+        "nombre": nueva_mesa.nombre,
+        "estado": nueva_mesa.estado,
+        "id_sucursal": nueva_mesa.id_sucursal
+    }
+
+@app.put("/actualizar_mesa/")
+async def actualizar_mesa(mesa: MesaUpdateSchema, db: AsyncSession = Depends(get_async_db)):
+    resultado = await db.execute(update(Mesa).where(Mesa.id == mesa.id).values(nombre=mesa.nombre, version=Mesa.version + 1))
+    if resultado.rowcount == 0:
+        raise HTTPException(status_code=404, detail="Mesa no encontrada")
+    id_sucursal = await db.scalar(select(Mesa.id_sucursal).where(Mesa.id == mesa.id))
+    await mesas.notificar(db, id_sucursal, "mesa_actualizada", [mesa.id])
+    await db.commit()
+    return {
+        "id": mesa.id,
+        "nombre": mesa.nombre
+    }
+
+@app.delete("/eliminar_mesa/{id}")
+async def eliminar_mesa(id: int, db: AsyncSession = Depends(get_async_db)):
+    # Solo se elimina si esta libre
+    id_sucursal = await db.scalar(select(Mesa.id_sucursal).where(Mesa.id == id))
+    if id_sucursal is None:
+        raise HTTPException(status_code=404, detail="Mesa no encontrada")
+    try:
+        resultado = await db.execute(delete(Mesa).where(Mesa.id == id, Mesa.id_pedido.is_(None)))
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(status_code=409, detail="La mesa tiene pedidos registrados")
+    if resultado.rowcount == 0:
+        raise HTTPException(status_code=409, detail="La mesa está ocupada")
+    eventos.encolar(db, id_sucursal, "mesa_eliminada", {"mesas": [{"id": id, "eliminada": True}]})
+    await db.commit()
+    return {
+        "detail": "Mesa eliminada exitosamente"
+    }
+
+
+
+#  ////////////////////////// VENTAS ////////////////////
+# El tablero lee de los acumulados por hora/dia, no de la tabla venta
+
+def _rango_ventas(desde, hasta):
+    desde, hasta = ventas.rango(desde, hasta)
+    if desde > hasta:
+        raise HTTPException(status_code=400, detail="'desde' no puede ser posterior a 'hasta'")
+    return desde, hasta
+
+async def _sucursales_visibles(db, sesion_token, sucursal):
+    # Solo las sucursales que el token puede ver: la propia o, para el administrador, las de su restaurante
+    visibles = eventos.sucursales_visibles(sesion_token)
+    if visibles is None or (sucursal and not await eventos.puede_ver(db, sesion_token, sucursal)):
+        raise HTTPException(status_code=403, detail="No tiene permisos para esta sucursal")
+    return visibles
+
+requiere_tablero = requiere_rol(RolUsuario.ADMINISTRADOR, RolUsuario.ADMINISTRADOR_SUCURSAL)
+
+@app.get("/ventas")
+async def obtener_ventas(
+    desde: Optional[date] = None,
+    hasta: Optional[date] = None,
+    sucursal: Optional[str] = None,
+    granularidad: Literal["hora", "dia"] = "dia",
+    sesion_token: dict = Depends(requiere_tablero),
+    db: AsyncSession = Depends(get_async_db),
+):
+    visibles = await _sucursales_visibles(db, sesion_token, sucursal)
+    desde, hasta = _rango_ventas(desde, hasta)
+    resultados = await ventas.ventas_por_periodo(db, desde, hasta, sucursal, granularidad, visibles)
+    return [{
+        "fecha_hora": resultado.periodo.strftime("%Y-%m-%d %H:%M:%S"),
+        "cantidad": resultado.cantidad,
+        "total": resultado.total,
+    } for resultado in resultados]
+
+@app.get("/ventas/exportar")
+async def exportar_ventas(
+    formato: Literal["csv", "ndjson", "parquet"] = "csv",
+    desde: Optional[date] = None,
+    hasta: Optional[date] = None,
+    sucursal: Optional[str] = None,
+    sesion_token: dict = Depends(requiere_tablero),
+    db: AsyncSession = Depends(get_async_db),
+):
+    visibles = await _sucursales_visibles(db, sesion_token, sucursal)
+    await db.close()
+    # Se recorre la tabla venta por bloques con un cursor del servidor; la memoria no crece con el rango
+    tipo = exportacion.validar_formato(formato)
+    desde, hasta = _rango_ventas(desde, hasta)
+    return StreamingResponse(
+        exportacion.exportar(ventas.consulta_exportacion(desde, hasta, sucursal, visibles), ventas.COLUMNAS_EXPORTACION, formato, ventas.esquema_parquet),
+        media_type=tipo,
+        headers={"Content-Disposition": f'attachment; filename="ventas_{desde}_{hasta}.{formato}"'},
+    )
+
+@app.get("/mayorproductodia")
+async def obtener_productos_mas_vendidos(
+    desde: Optional[date] = None,
+    hasta: Optional[date] = None,
+    sucursal: Optional[str] = None,
+    sesion_token: dict = Depends(requiere_tablero),
+    db: AsyncSession = Depends(get_async_db),
+):
+    visibles = await _sucursales_visibles(db, sesion_token, sucursal)
+    desde, hasta = _rango_ventas(desde, hasta)
+    resultados = await ventas.productos_mas_vendidos(db, desde, hasta, sucursal, visibles=visibles)
+    return [{
+        "id_producto": resultado.id_producto,
+        "nombre": resultado.nombre,
+        "cantidad": resultado.cantidad,
+    } for resultado in resultados]
+
+@app.get("/productocategoria")
+async def obtener_productos_mas_vendidos_por_categoria(
+    desde: Optional[date] = None,
+    hasta: Optional[date] = None,
+    sucursal: Optional[str] = None,
+    sesion_token: dict = Depends(requiere_tablero),
+    db: AsyncSession = Depends(get_async_db),
+):
+    visibles = await _sucursales_visibles(db, sesion_token, sucursal)
+    desde, hasta = _rango_ventas(desde, hasta)
+    resultados = await ventas.productos_mas_vendidos(db, desde, hasta, sucursal, por_categoria=True, visibles=visibles)
+    return [{
+        "id_producto": resultado.id_producto,
+        "nombre": resultado.nombre,
+        "cantidad": resultado.cantidad,
+        "categoria": resultado.categoria,
+    } for resultado in resultados]
 
 
 
 # ///////////////////////////////// PRODUCTO////////////////////////////////
 
+@app.get("/menu/{id_sucursal}")
+async def obtener_menu(id_sucursal: str, request: Request):
+    # Productos agrupados por categoria, servidos desde memoria con ETag
+    return menu.responder(request, await menu.obtener(id_sucursal), "menu")
+
 @app.post("/producto/registrar_producto", response_model=ProductoSchema, status_code=201)
 async def crear_producto(
     nombre: str = Form(...),
     precio: float = Form(...),
     disponibilidad: bool = Form(...),
     id_categoria: int = Form(...),
-    id_sucursal: int = Form(...),
+    id_sucursal: str = Form(...),
     imagen: UploadFile = File(...),  # Imagen es obligatoria
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db),
 ):
-    try:
-        # Verificar si el producto ya existe en la sucursal
-        sql = text("SELECT * FROM producto WHERE nombre = :nombre AND id_sucursal = :id_sucursal")
-        producto_existente = db.execute(sql, {'nombre': nombre, 'id_sucursal': id_sucursal}).fetchone()
-
-        if producto_existente:
-            raise HTTPException(status_code=400, detail="El producto ya existe en esta sucursal.")
-
-        # Crear el objeto Producto sin la imagen por ahora
-        nuevo_producto = Producto(
-            nombre=nombre,
-            precio=precio,
-            disponibilidad=disponibilidad,
-            id_categoria=id_categoria,
-            id_sucursal=id_sucursal,
-            imagen=""  # Se actualizará más tarde con la imagen
-        )
-
-        # Agregar el nuevo producto a la base de datos
-        db.add(nuevo_producto)
-        db.commit()
-        db.refresh(nuevo_producto)
-
-        # Guardar la imagen en el directorio de imágenes
-        nombre_archivo = f"{nuevo_producto.id_producto}-{imagen.filename}"
-        ruta_imagen = os.path.join(IMAGES_DIRECTORY, "productos", nombre_archivo)
-        
-        # Crear directorio si no existe
-        os.makedirs(os.path.dirname(ruta_imagen), exist_ok=True)
-        
-        # Guardar la imagen en el servidor
-        with open(ruta_imagen, "wb") as buffer:
-            buffer.write(await imagen.read())
-        
-        # Actualizar la ruta de la imagen en el producto
-        nuevo_producto.imagen = f"/{IMAGES_DIRECTORY}/productos/{nombre_archivo}"
-
-        db.commit()  # Confirmar los cambios en la base de datos
-        db.refresh(nuevo_producto)
-
-        return nuevo_producto
+    # Verificar si el producto ya existe en la sucursal
+    existente = await db.scalar(select(Producto.id_producto).where(Producto.nombre == nombre, Producto.id_sucursal == id_sucursal))
+    if existente:
+        raise HTTPException(status_code=400, detail="El producto ya existe en esta sucursal.")
+    categoria = await db.get(Categoria, id_categoria)
+    if not categoria:
+        raise HTTPException(status_code=404, detail="Categoría no encontrada")
 
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error al registrar el producto: {str(e)}")
+    nombre_imagen = await almacenamiento.guardar_subida(imagen, os.path.join(IMAGES_DIRECTORY, "productos"))
+    nuevo_producto = Producto(
+        nombre=nombre,
+        precio=precio,
+        disponibilidad=disponibilidad,
+        id_categoria=id_categoria,
+        id_sucursal=id_sucursal,
+        imagen=f"/{IMAGES_DIRECTORY}/productos/{nombre_imagen}",
+    )
+    db.add(nuevo_producto)
+    await db.commit()
+    menu.guardar_producto(id_sucursal, nuevo_producto, categoria.nombre)
+    return nuevo_producto
 
 
 @app.get("/producto", response_model=List[ProductoSchema])
-async def obtener_todos_los_productos(db: Session = Depends(get_db)):
-    productos = db.query(Producto).all()
-    return productos
+async def obtener_todos_los_productos(
+    limit: int = Query(LIMITE_POR_DEFECTO, ge=1, le=LIMITE_MAXIMO),
+    after: Optional[str] = None,
+    fields: Optional[str] = None,
+    total: bool = False,
+    db: AsyncSession = Depends(get_async_db),
+):
+    productos, cabeceras = await paginar(
+        db, Producto, ProductoSchema, Producto.id_producto,
+        limit=limit, after=after, fields=fields, total=total,
+    )
+    return JSONResponse(jsonable_encoder(productos), headers=cabeceras)
 
 
 @app.get("/producto/id_sucursal/{id_sucursal}", response_model=List[ProductoSchema])
-async def obtener_productos_por_sucursal(id_sucursal: int, db: Session = Depends(get_db)):
-    productos = db.query(Producto).filter(Producto.id_sucursal == id_sucursal).all()
-    return productos
+async def obtener_productos_por_sucursal(id_sucursal: str, request: Request):
+    return menu.responder(request, await menu.obtener(id_sucursal), "todos")
 
 @app.get("/producto/disponibilidad/{id_sucursal}", response_model=List[ProductoSchema])
-async def obtener_productos_disponibles(id_sucursal: int, db: Session = Depends(get_db)):
-    productos = db.query(Producto).filter(Producto.id_sucursal == id_sucursal, Producto.disponibilidad == True).all()
-    return productos
+async def obtener_productos_disponibles(id_sucursal: str, request: Request):
+    return menu.responder(request, await menu.obtener(id_sucursal), "disponibles")
 
 @app.get("/producto/categoria/{id_sucursal}/{categoria}", response_model=List[ProductoSchema])
-async def obtener_productos_por_categoria(id_sucursal: int, categoria: int, db: Session = Depends(get_db)):
-    productos = db.query(Producto).filter(
-        Producto.id_sucursal == id_sucursal,
-        Producto.disponibilidad == True,
-        Producto.id_categoria == categoria
-    ).all()
-    return productos
+async def obtener_productos_por_categoria(id_sucursal: str, categoria: int, request: Request):
+    return menu.responder(request, await menu.obtener(id_sucursal), f"categoria:{categoria}")
+
+@app.get("/producto/buscar", response_model=List[ProductoSchema])
+async def buscar_productos(
+    q: str = Query(..., min_length=1, max_length=100),
+    id_sucursal: str = Query(...),
+    limite: int = Query(10, ge=1, le=50),
+    disponibles: bool = False,
+):
+    # Busqueda por prefijo, sin tildes y tolerante a errores, sobre el indice del menu en memoria
+    return (await menu.obtener(id_sucursal)).buscar(q, limite, disponibles)
 
 @app.get("/producto/{id}", response_model=ProductoSchema)
-async def obtener_producto_por_id(id: int, db: Session = Depends(get_db)):
-    producto = db.query(Producto).filter(Producto.id_producto == id).first()
+async def obtener_producto_por_id(id: int, db: AsyncSession = Depends(get_async_db)):
+    producto = await db.get(Producto, id)
     if not producto:
-        raise HTTPException(status_code=404)
+        raise HTTPException(status_code=404, detail="Producto no encontrado")
+    return producto
 
 @app.put("/producto/{id}", response_model=ProductoSchema)
 async def actualizar_producto(
     id: int,
+    tareas: BackgroundTasks,
     nombre: str = Form(...),
-    precio: int = Form(...),
+    precio: float = Form(...),
     id_categoria: int = Form(...),
     imagen: UploadFile = File(None),  # Imagen es opcional
     disponibilidad: bool = Form(...),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db),
 ):
-    try:
-        # Obtener el producto existente
-        producto_existente = db.query(Producto).filter(Producto.id_producto == id).first()
-        
-        if not producto_existente:
-            raise HTTPException(status_code=404, detail="Producto no encontrado")
-        
-        # Mantener el nombre de archivo actual si no se sube una nueva imagen
-        nombre_archivo = producto_existente.imagen
-        
-        # Si se sube una nueva imagen, manejar el reemplazo
-        if imagen:
-            if nombre_archivo:
-                # Eliminar la imagen anterior si existe
-                archivo_anterior = os.path.join(IMAGES_DIRECTORY, "productos", nombre_archivo.split('/')[-1])
-                if os.path.exists(archivo_anterior):
-                    os.remove(archivo_anterior)
-
-            # Guardar la nueva imagen
-            nombre_archivo = f"{producto_existente.id_producto}-{imagen.filename}"
-            ruta_imagen = os.path.join(IMAGES_DIRECTORY, "productos", nombre_archivo)
-            os.makedirs(os.path.dirname(ruta_imagen), exist_ok=True)
-            with open(ruta_imagen, "wb") as buffer:
-                buffer.write(await imagen.read())
-
-            producto_existente.imagen = f"/{IMAGES_DIRECTORY}/productos/{nombre_archivo}"
-
-        # Actualizar los campos del producto
-        categoria = db.query(Categoria).filter(Categoria.id_categoria == id_categoria).first()
-        if not categoria:
-            raise HTTPException(status_code=404, detail="Categoría no encontrada")
-
-        producto_existente.nombre = nombre
-        producto_existente.precio = precio
-        producto_existente.id_categoria = id_categoria
-        producto_existente.disponibilidad = disponibilidad
-        
-        # Guardar cambios en la base de datos
-        db.commit()
-        db.refresh(producto_existente)
-
-        return producto_existente
-    
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error al actualizar el producto: {str(e)}")
+    producto_existente = await db.get(Producto, id)
+    if not producto_existente:
+        raise HTTPException(status_code=404, detail="Producto no encontrado")
+    categoria = await db.get(Categoria, id_categoria)
+    if not categoria:
+        raise HTTPException(status_code=404, detail="Categoría no encontrada")
+
+    imagen_anterior = producto_existente.imagen
+    if imagen:
+        nombre_imagen = await almacenamiento.guardar_subida(imagen, os.path.join(IMAGES_DIRECTORY, "productos"))
+        producto_existente.imagen = f"/{IMAGES_DIRECTORY}/productos/{nombre_imagen}"
+
+    producto_existente.nombre = nombre
+    producto_existente.precio = precio
+    producto_existente.id_categoria = id_categoria
+    producto_existente.disponibilidad = disponibilidad
+
+    await db.commit()
+    menu.guardar_producto(producto_existente.id_sucursal, producto_existente, categoria.nombre)
+    # La imagen anterior puede seguir en uso por otro producto; se borra solo si queda huerfana
+    if imagen_anterior and imagen_anterior != producto_existente.imagen:
+        tareas.add_task(imagenes.liberar_imagen, imagen_anterior)
+    return producto_existente
+
+@app.patch("/producto/{id}/disponibilidad", response_model=DisponibilidadSchema)
+async def cambiar_disponibilidad_producto(id: int, cambio: DisponibilidadSchema, db: AsyncSession = Depends(get_async_db)):
+    # Solo cambia una columna: el menu en memoria se corrige en el sitio, sin reconstruirlo
+    resultado = await db.execute(update(Producto).where(Producto.id_producto == id).values(disponibilidad=cambio.disponibilidad))
+    if resultado.rowcount == 0:
+        raise HTTPException(status_code=404, detail="Producto no encontrado")
+    id_sucursal = await db.scalar(select(Producto.id_sucursal).where(Producto.id_producto == id))
+    await db.commit()
+    menu.cambiar_disponibilidad(id_sucursal, id, cambio.disponibilidad)
+    return cambio
 
 @app.delete("/producto/{id}", status_code=204)
-async def eliminar_producto(id: int, db: Session = Depends(get_db)):
+async def eliminar_producto(id: int, tareas: BackgroundTasks, db: AsyncSession = Depends(get_async_db)):
+    producto = await db.get(Producto, id)
+    if not producto:
+        raise HTTPException(status_code=404, detail="Producto no encontrado")
+
+    await db.delete(producto)
     try:
-        # Obtener el producto existente
-        producto = db.query(Producto).filter(Producto.id_producto == id).first()
-        
-        if not producto:
-            raise HTTPException(status_code=404, detail="Producto no encontrado")
-        
-        # Eliminar la imagen si existe
-        if producto.imagen:
-            archivo_imagen = os.path.join(IMAGES_DIRECTORY, "productos", producto.imagen.split('/')[-1])
-            if os.path.exists(archivo_imagen):
-                os.remove(archivo_imagen)
-
-        # Eliminar el producto de la base de datos
-        db.delete(producto)
-        db.commit()
-
-        return {"message": "Producto eliminado exitosamente"}
-    
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error al eliminar el producto: {str(e)}")'''
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(status_code=409, detail="El producto tiene pedidos o ventas registradas")
+    menu.quitar_producto(producto.id_sucursal, id)
+    if producto.imagen:
+        tareas.add_task(imagenes.liberar_imagen, producto.imagen)
 
 
 
@@ -635,6 +1029,65 @@ async def eliminar_producto(id: int, db: Session = Depends(get_db)):
 
 
 
+
+
+
+#  ////////////////////////// PAGOS ////////////////////
+# Las escrituras aceptan Idempotency-Key (ver idempotencia.py)
+
+@app.get("/tipo_pago")
+async def obtener_tipos_pago(db: AsyncSession = Depends(get_async_db)):
+    return (await db.execute(select(TipoPago.id, TipoPago.descripcion).order_by(TipoPago.id))).mappings().all()
+
+@app.get("/tipo_pago/{id}")
+async def obtener_tipo_pago(id: int, db: AsyncSession = Depends(get_async_db)):
+    tipo_pago = (await db.execute(select(TipoPago.id, TipoPago.descripcion).where(TipoPago.id == id))).mappings().first()
+    if not tipo_pago:
+        raise HTTPException(status_code=404, detail="Tipo de pago no encontrado")
+    return tipo_pago
+
+@app.post("/registrar_tipo_pago")
+async def registrar_tipo_pago(tipo_pago: TipoPagoSchema, db: AsyncSession = Depends(get_async_db)):
+    nuevo = TipoPago(**tipo_pago.dict(exclude_none=True))
+    db.add(nuevo)
+    try:
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(status_code=400, detail="El id de este tipo de pago ya existe")
+    return {
+        "id": nuevo.id,
+        "descripcion": nuevo.descripcion
+    }
+
+@app.put("/tipo_pago/{id}")
+async def actualizar_tipo_pago(id: int, tipo_pago: TipoPagoSchema, db: AsyncSession = Depends(get_async_db)):
+    resultado = await db.execute(update(TipoPago).where(TipoPago.id == id).values(descripcion=tipo_pago.descripcion))
+    if resultado.rowcount == 0:
+        raise HTTPException(status_code=404, detail="Tipo de pago no encontrado")
+    await db.commit()
+    return {"message": "Tipo de pago actualizado correctamente"}
+
+@app.delete("/tipo_pago/{id}")
+async def eliminar_tipo_pago(id: int, db: AsyncSession = Depends(get_async_db)):
+    try:
+        resultado = await db.execute(delete(TipoPago).where(TipoPago.id == id))
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(status_code=409, detail="El tipo de pago está en uso en pedidos")
+    if resultado.rowcount == 0:
+        raise HTTPException(status_code=404, detail="Tipo de pago no encontrado")
+    await db.commit()
+    return {"message": "Tipo de pago eliminado correctamente"}
+
+@app.post("/pagos/liquidar")
+async def liquidar_pedidos(liquidacion: LiquidacionSchema, db: AsyncSession = Depends(get_async_db)):
+    # Cierra una mesa o el turno en una sola solicitud y una sola transaccion
+    if not liquidacion.pedidos or not liquidacion.pagos:
+        raise HTTPException(status_code=400, detail="Se requieren pedidos y pagos")
+    if any(pago.monto < 0 or pago.propina < 0 for pago in liquidacion.pagos):
+        raise HTTPException(status_code=400, detail="Los montos y propinas no pueden ser negativos")
+    return await pagos.liquidar(db, liquidacion.pedidos, [pago.dict() for pago in liquidacion.pagos])
 
 
 
@@ -669,40 +1122,6 @@ def obtener_productos(db: Session = Depends(get_db)):
 
     return categorias
 
-@app.get("/mesas/{nit}")
-async def obtener_mesas(nit: str,db: Session = Depends(get_db)):
-    # Consulta para obtener todas las mesas
-    sql = text("SELECT * FROM mesa where estado='Fisica' AND id_sucursal = :nit")
-    resultados = db.execute(sql, {"nit": nit}).fetchall()
-  # Obtiene todas las mesas
-
-    # Convierte los resultados en una lista de diccionarios
-    mesas = [{
-        "id": resultado.id,
-        "nombre": resultado.nombre,
-        "estado": resultado.estado,
-        "id_sucursal": resultado.id_sucursal
-    } for resultado in resultados]
-
-    return mesas
-
-@app.get("/mesarapida/{nit}")
-async def obtener_mesa_rapida(nit: str,db: Session = Depends(get_db)):
-    # Consulta para obtener todas las mesas
-    sql = text("SELECT * FROM mesa where estado='Rapida' AND id_sucursal = :nit")
-    resultados = db.execute(sql, {"nit": nit}).fetchall()
-  # Obtiene todas las mesas
-
-    # Convierte los resultados en una lista de diccionarios
-    mesas = [{
-        "id": resultado.id,
-        "nombre": resultado.nombre,
-        "estado": resultado.estado,
-        "id_sucursal": resultado.id_sucursal
-    } for resultado in resultados]
-
-    return mesas
-
 @app.get("/sucursales/{documento}")
 def obtener_sucursales(documento: int, db: Session = Depends(get_db)):
     # Consulta para verificar si existen sucursales con el documento dado
@@ -830,41 +1249,6 @@ async def registrar_categoria(categoria: cat, db: Session = Depends(get_db)):
         "nombre": categoria.nombre
     }
 
-@app.post("/registrar_mesa")
-async def registrar_mesa(mesa: me, db: Session = Depends(get_db)):
-    # Verificar si ya existe una mesa con el mismo nombre
-    sql = text("SELECT * FROM mesa WHERE nombre = :nombre and id_sucursal = :id_sucursal")
-    nombre_existente = db.execute(sql, {'nombre': mesa.nombre, 'id_sucursal': mesa.id_sucursal}).fetchone()
-
-    if nombre_existente:
-        raise HTTPException(status_code=400, detail="El nombre de la mesa ya existe")
-
-    # Insertar nueva mesa
-    sqlingresar = text("""
-                        INSERT INTO mesa (nombre,estado, id_sucursal)
-                        VALUES (:nombre, :estado, :id_sucursal)
-                       """)
-
-    values = {
-        'nombre': mesa.nombre,
-        'estado': mesa.estado,
-        'id_sucursal': mesa.id_sucursal,
-    }
-
-    result = db.execute(sqlingresar, values)
-    db.commit()
-
-    # Obtener el ID generado automáticamente
-    nuevo_id = result.lastrowid
-
-    return {
-        "id": nuevo_id,
-        "nombre": mesa.nombre,
-        "estado": mesa.estado,
-        "id_sucursal": mesa.id_sucursal
-    }
-
-
 @app.post("/registrar_producto")
 async def registrar_producto(producto: pro, db: Session = Depends(get_db)):
 
@@ -898,36 +1282,6 @@ async def registrar_producto(producto: pro, db: Session = Depends(get_db)):
         "id_sucursal": producto.id_sucursal
     }
 
-@app.put("/actualizar_mesa/")
-async def actualizar_mesa(mesa: meas, db: Session = Depends(get_db)):
-
-    # Verifica si la mesa con el ID proporcionado existe
-    sql = text("SELECT * FROM mesa WHERE id = :id")
-    id_existente = db.execute(sql, {'id': mesa.id}).fetchone()
-
-    if not id_existente:
-        raise HTTPException(status_code=404, detail="Mesa no encontrada")
-
-    # Actualiza los datos de la mesa
-    sql1 = text("""
-    UPDATE mesa 
-    SET nombre = :nombre
-    WHERE id = :id
-    """)
-
-    values = {
-        'id': mesa.id,
-        'nombre': mesa.nombre,
-    }
-
-    db.execute(sql1, values)
-    db.commit()
-
-    return {
-        "id": mesa.id,
-        "nombre": mesa.nombre
-    }
-
 @app.put("/actualizar_categoria/")
 async def actualizar_categoria(categoria: cat, db: Session = Depends(get_db)):
 
@@ -987,30 +1341,6 @@ async def actualizar_producto(producto: proedi, db: Session = Depends(get_db)):
         "id_categoria": producto.id_categoria
     }
 
-@app.delete("/eliminar_mesa/{id}")
-async def eliminar_mesa(id: int, db: Session = Depends(get_db)):
-
-    # Verifica si la mesa con el ID proporcionado existe
-    sql = text("SELECT * FROM mesa WHERE id = :id")
-    id_existente = db.execute(sql, {'id': id}).fetchone()
-
-    if not id_existente:
-        raise HTTPException(status_code=404, detail="Mesa no encontrada")
-
-    # Elimina la mesa
-    sql1 = text("""
-    DELETE FROM mesa
-    WHERE id = :id
-    """)
-
-    db.execute(sql1, {'id': id})
-    db.commit()
-
-    return {
-        "detail": "Mesa eliminada exitosamente"
-    }
-
-
 @app.delete("/eliminar_categoria/{id}")
 async def eliminar_categoria(id: int, db: Session = Depends(get_db)):
 
@@ -1050,189 +1380,6 @@ async def eliminar_producto(id: int, db: Session = Depends(get_db)):
         "detail": "Producto eliminado exitosamente"
     }
 
-@app.get("/ventas")
-def obtener_ventas(db: Session = Depends(get_db)):
-    # Ajusta la consulta SQL según la estructura de tu base de datos
-    sql = text("""
-        SELECT 
-            v.fecha_hora, 
-            v.cantidad, 
-            v.total 
-        FROM 
-            venta v
-    """)
-    resultados = db.execute(sql).fetchall()
-
-    # Procesar los resultados
-    ventas = [{
-        "fecha_hora": resultado.fecha_hora.strftime("%Y-%m-%d %H:%M:%S"),  # Convertir a string si es necesario
-        "cantidad": resultado.cantidad,
-        "total": resultado.total,
-    } for resultado in resultados]
-
-    return ventas
-
-@app.get("/mayorproductodia")
-def obtener_ventas(db: Session = Depends(get_db)):
-    # Consulta SQL ajustada para obtener los productos más vendidos
-    sql = text("""
-        SELECT 
-            p.id AS id_producto, 
-            p.nombre, 
-            SUM(v.cantidad) AS cantidad
-        FROM 
-            venta v
-        JOIN 
-            producto p ON v.id_producto = p.id
-        GROUP BY 
-            p.id, p.nombre
-        ORDER BY 
-            cantidad DESC
-        LIMIT 5
-    """)
-    resultados = db.execute(sql).fetchall()
-
-    # Procesar los resultados
-    ventas = [{
-        "id_producto": resultado.id_producto,
-        "nombre": resultado.nombre,
-        "cantidad": resultado.cantidad,
-    } for resultado in resultados]
-
-    return ventas
-@app.get("/productocategoria") 
-def obtener_ventas(db: Session = Depends(get_db)):
-    try:
-        # Consulta SQL ajustada para obtener los productos más vendidos, incluyendo la categoría
-        sql = text(""" 
-            SELECT 
-                p.id AS id_producto, 
-                p.nombre, 
-                SUM(v.cantidad) AS cantidad,
-                c.nombre AS categoria  -- Cambiado para referirse a la tabla 'categoria'
-            FROM 
-                venta v
-            JOIN 
-                producto p ON v.id_producto = p.id
-            JOIN 
-                categoria c ON p.id_categoria = c.id  -- Agregar JOIN con la tabla categoria
-            GROUP BY 
-                p.id, p.nombre, c.nombre  -- Cambiado para usar 'c.nombre' en lugar de 'p.categoria'
-            ORDER BY 
-                cantidad DESC
-            LIMIT 5
-        """)
-        resultados = db.execute(sql).fetchall()
-
-        # Procesar los resultados
-        ventas = [{
-            "id_producto": resultado.id_producto,
-            "nombre": resultado.nombre,
-            "cantidad": resultado.cantidad,
-            "categoria": resultado.categoria,  # Incluir la categoría
-        } for resultado in resultados]
-
-        return ventas
-    except Exception as e:
-        return {"error": str(e)}, 500
-
-
-#-----------------------------pagos---------------------------
-@app.get("/tipo_pago")
-async def obtener_tipos_pago(db: Session = Depends(get_db)):
-   
-    sql = text("SELECT * FROM tipo_pago")
-    resultados = db.execute(sql).fetchall() 
-
-  
-    tipos_pago = [{
-        "id": resultado.id,
-        "descripcion": resultado.descripcion,
-    } for resultado in resultados]
-
-    return tipos_pago
-
-@app.get("/tipo_pago/{id}")
-async def obtener_tipo_pago(id: int, db: Session = Depends(get_db)):
-    
-    sql = text("SELECT * FROM tipo_pago WHERE id = :id")
-    resultado = db.execute(sql, {"id": id}).fetchone()  
-
-    if not resultado:
-        raise HTTPException(status_code=404, detail="Tipo de pago no encontrado")
-
-    tipo_pago = {
-        "id": resultado.id,
-        "descripcion": resultado.descripcion
-    }
-
-    return tipo_pago
-
-@app.post("/registrar_tipo_pago")
-async def registrar_tipo_pago(tipo_pago: TipoPago, db: Session = Depends(get_db)):
-   
-    sql = text("SELECT * FROM tipo_pago WHERE id = :id")
-    id_existente = db.execute(sql, {'id': tipo_pago.id}).fetchone()
-
-    if id_existente:
-        raise HTTPException(status_code=400, detail="El id de este tipo de pago ya existe")
-
-    
-    sql1 = text("""
-    INSERT INTO tipo_pago (id, descripcion) 
-    VALUES (:id, :descripcion)
-    """)
-
-    values = {
-        'id': tipo_pago.id,
-        'descripcion': tipo_pago.descripcion
-    }
-
-    db.execute(sql1, values)
-    db.commit()
-
-    return {
-        "id": tipo_pago.id,
-        "descripcion": tipo_pago.descripcion
-    }
-
-
-@app.put("/tipo_pago/{id}")
-async def actualizar_tipo_pago(id: int, tipo_pago: TipoPago, db: Session = Depends(get_db)):
-    
-    sql_select = text("SELECT * FROM tipo_pago WHERE id = :id")
-    resultado = db.execute(sql_select, {"id": id}).fetchone()
-
-    if not resultado:
-        raise HTTPException(status_code=404, detail="Tipo de pago no encontrado")
-
- 
-    sql_update = text("UPDATE tipo_pago SET descripcion = :descripcion WHERE id = :id")
-    db.execute(sql_update, {"descripcion": tipo_pago.descripcion, "id": id})
-    db.commit()
-
-    return {"message": "Tipo de pago actualizado correctamente"}
-
-
-@app.delete("/tipo_pago/{id}")
-async def eliminar_tipo_pago(id: int, db: Session = Depends(get_db)):
-    
-    sql_select = text("SELECT * FROM tipo_pago WHERE id = :id")
-    resultado = db.execute(sql_select, {"id": id}).fetchone()
-
-    if not resultado:
-        raise HTTPException(status_code=404, detail="Tipo de pago no encontrado")
-
-    
-    sql_delete = text("DELETE FROM tipo_pago WHERE id = :id")
-    db.execute(sql_delete, {"id": id})
-    db.commit()
-
-    return {"message": "Tipo de pago eliminado correctamente"}
-
-
-
-
 @app.post("/insertardos")
 async def registrar_cliente(producto: pro, db: Session = Depends(get_db)):
 